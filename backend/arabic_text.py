@@ -0,0 +1,126 @@
+"""
+Arabic Text Normalization
+
+One normalization for both sides of Arabic search: create_fts_tables.py
+applies it when building fts_arabic.text_normalized (and its triggers apply
+the equivalent SQL expression), and search_quran applies it to queries.
+
+Folding rules:
+    - tashkeel (harakat, shadda, sukun, superscript alef) removed
+    - Quranic annotation marks (small high letters, pause marks) removed
+    - tatweel removed
+    - alef variants أ إ آ ٱ -> ا
+    - ta marbuta ة -> ه
+    - alef maqsura ى -> ي
+"""
+
+from typing import List
+
+# Characters dropped entirely
+ARABIC_TASHKEEL = [chr(c) for c in range(0x064B, 0x0660)] + ["\u0670"]
+QURANIC_MARKS = [chr(c) for c in range(0x06D6, 0x06EE)]
+TATWEEL = "\u0640"
+
+# Letter variants folded onto one form
+ARABIC_FOLDS = {
+    "\u0623": "\u0627",  # alef with hamza above -> alef
+    "\u0625": "\u0627",  # alef with hamza below -> alef
+    "\u0622": "\u0627",  # alef with madda -> alef
+    "\u0671": "\u0627",  # alef wasla -> alef
+    "\u0629": "\u0647",  # ta marbuta -> ha
+    "\u0649": "\u064A",  # alef maqsura -> ya
+}
+
+# Nested replace() calls per SQL expression (SQLite overflows past ~30)
+SQL_REPLACE_DEPTH = 24
+
+_REMOVED = ARABIC_TASHKEEL + QURANIC_MARKS + [TATWEEL]
+_TRANSLATION = str.maketrans({**{c: None for c in _REMOVED}, **ARABIC_FOLDS})
+
+
+def normalize_arabic(text: str) -> str:
+    """Fold Arabic text to the form stored in fts_arabic.text_normalized."""
+    return text.translate(_TRANSLATION)
+
+
+def normalize_arabic_sql(expression: str) -> List[str]:
+    """
+    The same normalization as pure SQL, for triggers (which cannot call Python).
+
+    SQLite's parser caps expression nesting, so the nested replace() calls are
+    split into stages: the first stage applies to `expression`, each later
+    stage is a template whose "{}" is replaced by the column holding the
+    previous stage's result.
+    """
+    replacements = [(char, "") for char in _REMOVED] + list(ARABIC_FOLDS.items())
+    stages = []
+    for start in range(0, len(replacements), SQL_REPLACE_DEPTH):
+        stage = "{}" if stages else expression
+        for char, folded in replacements[start:start + SQL_REPLACE_DEPTH]:
+            stage = f"replace({stage}, '{char}', '{folded}')"
+        stages.append(stage)
+    return stages
+
+
+# =============================================================================
+# LIGHT STEMMING AND ROOT EXTRACTION
+# =============================================================================
+# Operate on normalize_arabic() output. Stemming follows the Light10 scheme
+# (strip the article/conjunction prefixes and common suffixes, here extended
+# with the attached pronouns frequent in Quranic text); roots are then
+# approximated by removing verb prefixes and pattern letters down to three
+# radicals. The offline root index stores these per token, so a curated
+# morphology source can replace the heuristic without touching the API.
+
+STEM_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال", "و")
+STEM_SUFFIXES = (
+    "هما", "كما", "ها", "هم", "هن", "كم", "نا",   # attached pronouns
+    "ان", "ات", "ون", "ين", "وا", "تم", "يه", "ه", "ي",
+)
+
+# Imperfect-verb prefixes and the mim of participles / place nouns
+ROOT_PREFIXES = "يتنام"
+# Long vowels that appear inside patterns (فاعل, فعيل, فعول, مفعول)
+ROOT_INFIXES = "اوي"
+# Extra radicals from common derived endings (فعلان, فعلت)
+ROOT_SUFFIXES = "نت"
+# Hamza carriers are all radical hamza for root purposes
+ROOT_HAMZA = str.maketrans({"\u0624": "\u0627", "\u0626": "\u0627", "\u0621": "\u0627"})
+
+# The divine name and its prefixed forms (لله, بالله, والله) are not derived words
+DIVINE_NAME = "\u0627\u0644\u0644\u0647"
+
+
+def light_stem(word: str) -> str:
+    """Strip article/conjunction prefixes and common suffixes from a normalized word."""
+    if word.endswith(DIVINE_NAME[1:]):
+        return DIVINE_NAME
+    for prefix in STEM_PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= 2 + (prefix == "و"):
+            word = word[len(prefix):]
+            break
+    for suffix in STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            word = word[:-len(suffix)]
+    return word
+
+
+def arabic_root(word: str) -> str:
+    """Approximate the (usually tri-literal) root of a normalized word."""
+    root = light_stem(word)
+    if root == DIVINE_NAME:
+        return root
+    root = root.translate(ROOT_HAMZA)
+    if len(root) > 3 and root[0] in ROOT_PREFIXES:
+        root = root[1:]
+    while len(root) > 3:
+        infix = next((i for i in range(len(root) - 1, 0, -1) if root[i] in ROOT_INFIXES), None)
+        if infix is None:
+            break
+        root = root[:infix] + root[infix + 1:]
+    # افتعل: a ta right after the first radical is a pattern letter
+    if len(root) > 3 and root[1] == "ت":
+        root = root[0] + root[2:]
+    if len(root) > 3 and root[-1] in ROOT_SUFFIXES:
+        root = root[:-1]
+    return root
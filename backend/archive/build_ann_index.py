@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Build the IVF approximate-nearest-neighbour index for ayah embeddings.
+
+Clusters the vectors in ayah_embeddings with spherical k-means and writes the
+index next to quran.db (<stem>.ivf.json plus memory-mappable .npy arrays),
+where semantic_index.load_semantic_index() picks it up. Run it again after
+regenerating embeddings; a stale index is ignored by the server.
+
+Then benchmarks recall@k against exact search for a range of nprobe values,
+using stored vectors with added noise as queries.
+
+Usage:
+    python3 build_ann_index.py [--db path/to/quran.db] [--lists N] [--nprobe 8]
+                               [--queries 200] [--k 10]
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from embeddings import EMBEDDING_MODEL
+from quran_corpus import database_digest
+from semantic_index import IVFIndex, SemanticIndex, normalize_rows, recall_at_k, KMEANS_ITERATIONS, DEFAULT_NPROBE
+
+# Database path
+DB_PATH = Path(__file__).resolve().parent.parent.parent / "quran-dump" / "quran.db"
+
+# Noise added to stored vectors to make benchmark queries (relative to unit length)
+QUERY_NOISE = 0.5
+
+
+def benchmark(index: SemanticIndex, queries: int, k: int):
+    """Print recall@k and per-query latency for increasing nprobe."""
+    rng = np.random.default_rng(1)
+    sample = np.asarray(index.vectors[rng.choice(len(index), min(queries, len(index)), replace=False)])
+    noise = rng.standard_normal(sample.shape).astype(np.float32) * QUERY_NOISE / np.sqrt(index.dimensions)
+    queries = normalize_rows(sample + noise)
+
+    print(f"\nRecall@{k} over {len(queries)} queries (exact search as ground truth):")
+    print(f"  {'nprobe':>6}  {'recall':>7}  {'exact ms':>9}  {'ivf ms':>7}")
+    nprobe = 1
+    while nprobe <= index.ann.nlist:
+        recall, exact_ms, approx_ms = recall_at_k(index, queries, k, nprobe)
+        marker = "  <- default" if nprobe == index.ann.nprobe else ""
+        print(f"  {nprobe:>6}  {recall:>7.3f}  {exact_ms:>9.2f}  {approx_ms:>7.2f}{marker}")
+        nprobe *= 2
+
+
+def main():
+    """Build, save and benchmark the index."""
+    parser = argparse.ArgumentParser(description="Build the IVF index for ayah embeddings")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help=f"SQLite database (default: {DB_PATH})")
+    parser.add_argument("--lists", type=int, default=None, help="Number of clusters (default: ~2*sqrt(N))")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE, help="Clusters searched per query")
+    parser.add_argument("--iterations", type=int, default=KMEANS_ITERATIONS, help="k-means iterations")
+    parser.add_argument("--queries", type=int, default=200, help="Benchmark queries (0 to skip)")
+    parser.add_argument("--k", type=int, default=10, help="k for recall@k")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("IVF Index for Ayah Embeddings")
+    print("=" * 60)
+
+    if not args.db.exists():
+        print(f"Error: Database not found at {args.db}")
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    try:
+        version = database_digest(args.db)
+        index = SemanticIndex.from_database(conn, version, EMBEDDING_MODEL)
+    finally:
+        conn.close()
+    if not len(index):
+        print("Error: ayah_embeddings is empty; run generate_embeddings.py first")
+        return 1
+    print(f"Loaded {len(index)} vectors ({index.dimensions}-d, {index.model or 'unknown model'})")
+
+    started = time.perf_counter()
+    index.ann = IVFIndex.build(index.vectors, args.lists, args.iterations, version, args.nprobe, index.model)
+    sizes = np.diff(index.ann.offsets)
+    print(f"✓ Clustered into {index.ann.nlist} lists in {time.perf_counter() - started:.1f}s "
+          f"(sizes: min {sizes.min()}, median {int(np.median(sizes))}, max {sizes.max()})")
+
+    index.ann.save(args.db)
+    print(f"✓ Wrote index next to {args.db} ({index.ann.stats()['bytes'] / 1024 / 1024:.1f} MB)")
+
+    if args.queries > 0:
+        benchmark(index, args.queries, args.k)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
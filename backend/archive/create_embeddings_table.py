@@ -12,9 +12,11 @@ from pathlib import Path
 DB_PATH = Path(__file__).parent.parent.parent / "quran.db"
 
 
-def migrate():
-    """Create the ayah_embeddings table."""
-    conn = sqlite3.connect(DB_PATH)
+def migrate(conn: sqlite3.Connection = None):
+    """Create the ayah_embeddings table (on DB_PATH unless a connection is given)."""
+    owns_connection = conn is None
+    if owns_connection:
+        conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     print("Creating ayah_embeddings table...")
@@ -27,9 +29,24 @@ def migrate():
             edition_id INTEGER NOT NULL,
             language TEXT NOT NULL,
             embedding BLOB NOT NULL,
+            dtype TEXT NOT NULL DEFAULT 'float32',
+            model TEXT,
+            content_hash TEXT,
             FOREIGN KEY (ayah_id) REFERENCES ayahs(id)
         )
     """)
+
+    # Add columns missing from tables created by earlier versions: dtype
+    # (quantized storage), model and content_hash (incremental regeneration)
+    cursor.execute("PRAGMA table_info(ayah_embeddings)")
+    columns = {row[1] for row in cursor.fetchall()}
+    for column, definition in (
+        ("dtype", "TEXT NOT NULL DEFAULT 'float32'"),
+        ("model", "TEXT"),
+        ("content_hash", "TEXT"),
+    ):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE ayah_embeddings ADD COLUMN {column} {definition}")
     
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_embeddings_language 
@@ -42,7 +59,8 @@ def migrate():
     """)
     
     conn.commit()
-    conn.close()
+    if owns_connection:
+        conn.close()
     
     print("✓ ayah_embeddings table created successfully")
 
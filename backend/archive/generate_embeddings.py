@@ -1,125 +1,251 @@
 #!/usr/bin/env python3
 """
-Generate embeddings for all Quran ayahs.
+Generate embeddings for Quran ayahs, incrementally.
 
-This script generates semantic embeddings for:
+By default embeds:
 - Uthmani Arabic text (quran-uthmani)
 - Saheeh International English translation (en.sahih)
 
-Uses all-MiniLM-L6-v2 model (~80MB, English-optimized but works for search).
+Every stored embedding records the model and a content hash of the model
+name plus the ayah text. A run only embeds ayahs whose row is missing, whose
+hash no longer matches (text edited, or a different --model), or whose
+storage --dtype differs, so an interrupted run resumes where it stopped and a
+model change redoes exactly what changed.
+
+Work flows through a producer/consumer pipeline: a producer thread hands out
+length-sorted batches (less padding per batch), the encoder turns them into
+vectors (optionally across several processes), and a writer thread stores
+them with executemany in large transactions while encoding continues.
+
+Usage:
+    python3 generate_embeddings.py [--db path/to/quran.db] [--model all-MiniLM-L6-v2]
+        [--editions quran-uthmani,en.sahih] [--dtype float32|float16|int8]
+        [--batch-size 64] [--processes N] [--commit-every 2048]
 """
 
+import argparse
+import hashlib
+import queue
 import sqlite3
 import sys
-import gc
+import threading
+import time
 from pathlib import Path
 
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from embeddings import generate_embeddings_batch, embedding_to_bytes
+from embeddings import EMBEDDING_MODEL, EMBEDDING_DTYPES, embedding_to_bytes
+from create_embeddings_table import migrate
 
 # Database path
-DB_PATH = Path(__file__).parent.parent.parent / "quran.db"
+DB_PATH = Path(__file__).resolve().parent.parent.parent / "quran-dump" / "quran.db"
 
-# Editions to embed
-EDITIONS = [
-    ("quran-uthmani", "ar"),
-    ("en.sahih", "en"),
-]
+# Editions to embed unless --editions is given
+EDITIONS = ["quran-uthmani", "en.sahih"]
 
-BATCH_SIZE = 32
+BATCH_SIZE = 64
+COMMIT_EVERY = 2048
+# Texts handed to the multi-process pool per call
+PROCESS_CHUNK = 4096
+# Encoded batches buffered between the encoder and the writer
+QUEUE_DEPTH = 8
 
+_DONE = object()
 
-def generate_all_embeddings():
-    """Generate and store embeddings for all ayahs."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # First run the table migration
-    from create_embeddings_table import migrate
-    migrate()
-    
-    total_inserted = 0
-    
-    for edition_identifier, language in EDITIONS:
-        print(f"\nProcessing {edition_identifier} ({language})...")
-        
-        # Get edition ID
-        cursor.execute("SELECT id FROM editions WHERE identifier = ?", (edition_identifier,))
-        edition_row = cursor.fetchone()
-        if not edition_row:
-            print(f"  ✗ Edition {edition_identifier} not found, skipping")
-            continue
-        edition_id = edition_row[0]
-        
-        # Check if already embedded
-        cursor.execute("""
-            SELECT COUNT(*) FROM ayah_embeddings 
-            WHERE edition_id = ?
-        """, (edition_id,))
-        existing_count = cursor.fetchone()[0]
-        
-        if existing_count > 0:
-            print(f"  ℹ {existing_count} embeddings already exist for this edition, skipping")
-            continue
-        
-        # Get all ayahs for this edition
-        cursor.execute("""
-            SELECT id, number, surah_id, number_in_surah, text
-            FROM ayahs
-            WHERE edition_id = ?
-            ORDER BY number
-        """, (edition_id,))
-        ayahs = cursor.fetchall()
-        
-        print(f"  Found {len(ayahs)} ayahs to embed")
-        
-        # Process in batches
-        for i in range(0, len(ayahs), BATCH_SIZE):
-            batch = ayahs[i:i + BATCH_SIZE]
-            texts = [row["text"] for row in batch]
-            
-            # Generate embeddings
-            embeddings = generate_embeddings_batch(texts, batch_size=BATCH_SIZE)
-            
-            # Insert into database
-            for j, row in enumerate(batch):
-                embedding_bytes = embedding_to_bytes(embeddings[j])
-                cursor.execute("""
-                    INSERT OR REPLACE INTO ayah_embeddings 
-                    (ayah_id, surah_id, ayah_number, edition_id, language, embedding)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    row["id"],
-                    row["surah_id"],
-                    row["number_in_surah"],
-                    edition_id,
-                    language,
-                    embedding_bytes
-                ))
-
-            # Commit every batch to free memory
-            conn.commit()
-
-            total_inserted += len(batch)
-            progress = min(i + BATCH_SIZE, len(ayahs))
-            print(f"  Progress: {progress}/{len(ayahs)} ({100*progress//len(ayahs)}%)")
-
-            # Free memory periodically
-            if progress % 500 == 0:
-                gc.collect()
-
-        print(f"  ✓ Completed {edition_identifier}")
-    
-    conn.close()
-    print(f"\n✓ Total embeddings generated: {total_inserted}")
 
+def content_hash(model: str, text: str) -> str:
+    """Identity of an embedding's input: which model saw which text."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def plan(conn, editions, model: str, dtype: str):
+    """Return the ayahs needing a (re-)embedding, plus per-edition counts."""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT a.id, a.surah_id, a.number_in_surah, a.text, e.id, e.identifier, e.language,
+               em.content_hash, em.dtype
+        FROM ayahs a
+        JOIN editions e ON a.edition_id = e.id
+        LEFT JOIN ayah_embeddings em ON em.ayah_id = a.id
+        WHERE e.identifier IN ({', '.join('?' * len(editions))})
+        ORDER BY a.id
+    """, editions)
+
+    todo = []
+    counts = {identifier: [0, 0] for identifier in editions}  # [total, stale]
+    for ayah_id, surah_id, number_in_surah, text, edition_id, identifier, language, stored, stored_dtype in cursor:
+        digest = content_hash(model, text)
+        counts[identifier][0] += 1
+        if stored != digest or stored_dtype != dtype:
+            counts[identifier][1] += 1
+            todo.append((ayah_id, surah_id, number_in_surah, edition_id, language, text, digest))
+    return todo, counts
+
+
+def produce(todo, batch_size: int, batches: queue.Queue):
+    """Producer: length-sorted batches, so each batch pads to similar lengths."""
+    ordered = sorted(todo, key=lambda row: len(row[5]))
+    for start in range(0, len(ordered), batch_size):
+        batches.put(ordered[start:start + batch_size])
+    batches.put(_DONE)
+
+
+def write(conn, model: str, dtype: str, commit_every: int, results: queue.Queue, progress: dict):
+    """
+    Consumer: store encoded batches, committing every `commit_every` rows.
+
+    A failure rolls back the open transaction and is recorded in
+    progress["error"], for run_pipeline() to raise.
+    """
+    cursor = conn.cursor()
+    pending = []
+
+    def flush():
+        cursor.execute("BEGIN")
+        try:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO ayah_embeddings
+                (ayah_id, surah_id, ayah_number, edition_id, language, embedding, dtype, model, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, pending)
+            cursor.execute("COMMIT")
+        except BaseException:
+            # SQLite may already have rolled back (e.g. disk full)
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        progress["written"] += len(pending)
+        pending.clear()
+
+    while True:
+        item = results.get()
+        if item is _DONE:
+            break
+        if "error" in progress:
+            continue  # keep draining so the encoder never blocks
+        try:
+            batch, vectors = item
+            for (ayah_id, surah_id, number_in_surah, edition_id, language, _, digest), vector in zip(batch, vectors):
+                pending.append((ayah_id, surah_id, number_in_surah, edition_id, language,
+                                embedding_to_bytes(vector, dtype), dtype, model, digest))
+            if len(pending) >= commit_every:
+                flush()
+        except Exception as e:
+            progress["error"] = e
+    if pending and "error" not in progress:
+        try:
+            flush()
+        except Exception as e:
+            progress["error"] = e
+
+
+def run_pipeline(conn, todo, model_name: str, dtype: str, batch_size: int,
+                 processes: int, commit_every: int):
+    """Encode and store `todo`; returns the number of rows written."""
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+    print(f"✓ Model loaded: {model_name} ({model.get_sentence_embedding_dimension()}-d)")
+    pool = model.start_multi_process_pool(["cpu"] * processes) if processes > 1 else None
+
+    # Multi-process encoding works on larger chunks, split back into batches
+    chunk = PROCESS_CHUNK if pool else batch_size
+    batches: queue.Queue = queue.Queue(maxsize=QUEUE_DEPTH)
+    results: queue.Queue = queue.Queue(maxsize=QUEUE_DEPTH)
+    progress = {"written": 0}
+    conn.isolation_level = None
+
+    producer = threading.Thread(target=produce, args=(todo, chunk, batches), daemon=True)
+    writer = threading.Thread(target=write, args=(conn, model_name, dtype, commit_every, results, progress))
+    producer.start()
+    writer.start()
+
+    started = time.monotonic()
+    encoded = 0
+    try:
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                break
+            if "error" in progress:
+                raise progress["error"]
+            texts = [row[5] for row in batch]
+            if pool:
+                vectors = model.encode_multi_process(texts, pool, batch_size=batch_size)
+            else:
+                vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+            results.put((batch, vectors))
+            encoded += len(batch)
+            rate = encoded / max(time.monotonic() - started, 1e-9)
+            print(f"  Encoded {encoded}/{len(todo)} ({rate:.0f}/s, "
+                  f"{progress['written']} stored)", end="\r")
+    finally:
+        # Let the writer store everything already encoded, even when interrupted
+        results.put(_DONE)
+        writer.join()
+        if pool:
+            model.stop_multi_process_pool(pool)
+    print()
+    if "error" in progress:
+        # Including a failure of the final flush after encoding finished
+        raise progress["error"]
+    return progress["written"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate embeddings for Quran ayahs (incremental)")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help=f"SQLite database (default: {DB_PATH})")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help=f"sentence-transformers model (default: {EMBEDDING_MODEL})")
+    parser.add_argument("--editions", default=",".join(EDITIONS), help="Comma-separated edition identifiers")
+    parser.add_argument("--dtype", choices=EMBEDDING_DTYPES, default="float32",
+                        help="Storage format of the embedding BLOBs (default: float32)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Texts per model batch")
+    parser.add_argument("--processes", type=int, default=1, help="Encoder processes (for many-core machines)")
+    parser.add_argument("--commit-every", type=int, default=COMMIT_EVERY, help="Rows per write transaction")
+    args = parser.parse_args()
 
-if __name__ == "__main__":
     print("=" * 60)
     print("Quran Embeddings Generator")
-    print("Model: all-MiniLM-L6-v2")
+    print(f"Model: {args.model}")
     print("=" * 60)
-    generate_all_embeddings()
+
+    if not args.db.exists():
+        print(f"Error: Database not found at {args.db}")
+        return 1
+
+    editions = [e.strip() for e in args.editions.split(",") if e.strip()]
+    conn = sqlite3.connect(args.db, check_same_thread=False)
+    try:
+        migrate(conn)
+        # Drop embeddings of ayahs that no longer exist
+        conn.execute("DELETE FROM ayah_embeddings WHERE ayah_id NOT IN (SELECT id FROM ayahs)")
+        conn.commit()
+
+        todo, counts = plan(conn, editions, args.model, args.dtype)
+        for identifier in editions:
+            total, stale = counts[identifier]
+            if not total:
+                print(f"  ✗ Edition {identifier} not found, skipping")
+            else:
+                print(f"  {identifier}: {total - stale}/{total} up to date, {stale} to embed")
+        if not todo:
+            print("\n✓ All embeddings are up to date")
+            return 0
+
+        written = run_pipeline(conn, todo, args.model, args.dtype, args.batch_size,
+                               args.processes, args.commit_every)
+        print(f"\n✓ Total embeddings generated: {written}")
+        return 0
+    except KeyboardInterrupt:
+        print("\n⚠ Interrupted; committed batches are kept, re-run to resume")
+        return 130
+    except sqlite3.Error as e:
+        print(f"\n✗ Storing embeddings failed: {e}; committed batches are kept, re-run to resume")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    exit(main())
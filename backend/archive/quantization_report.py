@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Report memory saved versus recall lost by quantized embedding scoring.
+
+For each scoring format (float32, float16, int8) prints the size of the matrix
+scanned per query, recall@k against exact float32 search with and without the
+float32 re-rank of the top candidates, and per-query latency. Queries are
+stored vectors with added noise. Pick a format with SEMANTIC_QUANTIZATION.
+
+Usage:
+    python3 quantization_report.py [--db path/to/quran.db] [--queries 200] [--k 10]
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from embeddings import EMBEDDING_MODEL
+from semantic_index import SemanticIndex, QUANTIZATIONS, normalize_rows
+
+# Database path
+DB_PATH = Path(__file__).resolve().parent.parent.parent / "quran-dump" / "quran.db"
+
+# Noise added to stored vectors to make benchmark queries (relative to unit length)
+QUERY_NOISE = 0.5
+
+
+def recall(index: SemanticIndex, queries: np.ndarray, truth, k: int, rerank: bool):
+    """Mean recall@k against `truth` and mean milliseconds per query."""
+    found = 0
+    started = time.perf_counter()
+    for query, expected in zip(queries, truth):
+        hits = index.top_k(query, limit=k, exact=True, rerank=rerank)
+        found += len(expected & {ayah_id for ayah_id, _ in hits})
+    elapsed = time.perf_counter() - started
+    return found / (len(queries) * k), 1000 * elapsed / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized embedding memory/recall report")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help=f"SQLite database (default: {DB_PATH})")
+    parser.add_argument("--queries", type=int, default=200, help="Benchmark queries")
+    parser.add_argument("--k", type=int, default=10, help="k for recall@k")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"Error: Database not found at {args.db}")
+        return 1
+    conn = sqlite3.connect(args.db)
+    try:
+        index = SemanticIndex.from_database(conn, model=EMBEDDING_MODEL)
+    finally:
+        conn.close()
+    if not len(index):
+        print("Error: ayah_embeddings is empty; run generate_embeddings.py first")
+        return 1
+
+    rng = np.random.default_rng(1)
+    sample = index.vectors[rng.choice(len(index), min(args.queries, len(index)), replace=False)]
+    noise = rng.standard_normal(sample.shape).astype(np.float32) * QUERY_NOISE / np.sqrt(index.dimensions)
+    queries = normalize_rows(sample + noise)
+    truth = [{ayah_id for ayah_id, _ in index.top_k(query, limit=args.k, exact=True)} for query in queries]
+
+    print("=" * 72)
+    print(f"Quantized scoring: {len(index)} vectors ({index.dimensions}-d), "
+          f"recall@{args.k} over {len(queries)} queries")
+    print("=" * 72)
+    print(f"  {'format':<8} {'matrix MB':>10} {'saved':>7} {'recall':>8} {'no re-rank':>11} {'ms/query':>9}")
+    baseline = None
+    for quantization in QUANTIZATIONS:
+        index.quantize(quantization)
+        size = index.scoring_bytes()
+        baseline = baseline or size
+        with_rerank, ms = recall(index, queries, truth, args.k, rerank=True)
+        without_rerank, _ = recall(index, queries, truth, args.k, rerank=False)
+        print(f"  {quantization:<8} {size / 1024 / 1024:>10.1f} {1 - size / baseline:>7.0%} "
+              f"{with_rerank:>8.3f} {without_rerank:>11.3f} {ms:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Rebuild the materialized user_stats rows from the source tables.
+
+user_stats is kept up to date by triggers (migrations/010_create_user_stats.sql).
+This repair job recomputes it with rebuild_user_stats() for one user or for
+everyone, e.g. after bulk edits made with triggers disabled, and reports how
+many rows had drifted from the source tables.
+
+Usage:
+    SUPABASE_SERVICE_ROLE_KEY=your-key python3 rebuild_user_stats.py [--user UUID]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add parent to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from supabase_data import create_data_client
+
+SUPABASE_URL = "https://zxmyoojcuihavbhiblwc.supabase.co"
+REST_URL = os.environ.get("SUPABASE_REST_URL", f"{SUPABASE_URL}/rest/v1")
+
+# Rows fetched per request when snapshotting user_stats
+PAGE_SIZE = 1000
+# Columns compared to detect drift (updated_at always changes)
+STAT_COLUMNS = (
+    "total_ayahs_read", "total_surahs_read", "total_bookmarks", "ayahs_completed",
+    "completed_by_surah", "last_read_date", "streak_days", "total_plays", "total_listening_seconds",
+)
+
+
+async def snapshot(client, user_id=None) -> dict:
+    """user_id -> stat columns, for one user or all of them."""
+    rows = {}
+    start = 0
+    while True:
+        query = client.table("user_stats").select("user_id", *STAT_COLUMNS).order("user_id")
+        if user_id:
+            query = query.eq("user_id", user_id)
+        response = await query.range(start, start + PAGE_SIZE - 1).execute()
+        for row in response.data:
+            rows[row.pop("user_id")] = row
+        if len(response.data) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+async def rebuild(user_id=None) -> int:
+    client = create_data_client(REST_URL, os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+    try:
+        before = await snapshot(client, user_id)
+        response = await client.rpc("rebuild_user_stats", {"p_user_id": user_id}).execute()
+        after = await snapshot(client, user_id)
+    finally:
+        await client.aclose()
+
+    missing = [uid for uid in after if uid not in before]
+    drifted = [uid for uid in after if uid in before and before[uid] != after[uid]]
+    print(f"✓ Rebuilt {response.data} user_stats rows")
+    print(f"  {len(missing)} were missing, {len(drifted)} had drifted from the source tables")
+    for uid in drifted[:20]:
+        changed = [column for column in STAT_COLUMNS if before[uid][column] != after[uid][column]]
+        print(f"    {uid}: {', '.join(changed)}")
+    if len(drifted) > 20:
+        print(f"    ... and {len(drifted) - 20} more")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild user_stats from the source tables")
+    parser.add_argument("--user", default=None, help="Only rebuild this user id (default: all users)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("User Stats Rebuild")
+    print("=" * 60)
+
+    if not os.environ.get("SUPABASE_SERVICE_ROLE_KEY"):
+        print("Error: SUPABASE_SERVICE_ROLE_KEY environment variable not set")
+        return 1
+    return asyncio.run(rebuild(args.user))
+
+
+if __name__ == "__main__":
+    exit(main())
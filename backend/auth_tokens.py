@@ -0,0 +1,302 @@
+"""
+Local Supabase JWT Verification
+
+Supabase access tokens are JWTs, so they can be checked in-process instead of
+calling `supabase.auth.get_user(token)` (a network round-trip) on every
+authenticated request:
+
+    - HS256 tokens (legacy projects) with the project's JWT secret
+      (SUPABASE_JWT_SECRET)
+    - ES256 / RS256 tokens with the public keys from the project's JWKS
+      endpoint, cached for JWKS_TTL_SECONDS
+
+The signature, expiry and audience are verified locally. A token signed by a
+key missing from the cached JWKS (key rotation) refetches the JWKS first; the
+auth server is only called when that still finds no key, when no local key
+material exists (HS256 without a configured secret), and, at most once per
+SESSION_RECHECK_SECONDS per session, to notice sessions revoked by sign-out.
+
+Only an explicit rejection by the auth server marks a session revoked. When
+the server cannot be reached, a token whose signature checked out locally is
+still accepted (the recheck is retried after SESSION_RETRY_SECONDS); tokens
+that could not be checked locally raise AuthUnavailable.
+
+verify_local() never touches the network; callers run verify_remote() off the
+event loop when it asks for it. Latency and outcome counters are in stats().
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+import httpx
+import jwt
+
+JWT_AUDIENCE = "authenticated"
+JWT_LEEWAY_SECONDS = 30
+JWKS_TTL_SECONDS = 600
+# An unknown `kid` refetches the JWKS at most this often
+JWKS_MIN_REFRESH_SECONDS = 30
+JWKS_TIMEOUT_SECONDS = 5.0
+SESSION_RECHECK_SECONDS = float(os.environ.get("AUTH_SESSION_RECHECK_SECONDS", "300"))
+# A recheck that could not reach the auth server is retried after this long
+SESSION_RETRY_SECONDS = 30
+ASYMMETRIC_ALGORITHMS = ("ES256", "RS256", "EdDSA")
+# Recent verification durations kept for percentiles
+LATENCY_SAMPLES = 1024
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class AuthUnavailable(RuntimeError):
+    """The auth server could not be asked about a token that needed it."""
+
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens locally, falling back to the auth server.
+
+    `remote_user_id(token)` asks the auth server: it returns the user id, None
+    when the server rejects the token or its session, and raises when the
+    server cannot be asked (timeouts, outages).
+    """
+
+    def __init__(
+        self,
+        jwks_url: Optional[str],
+        remote_user_id: Callable[[str], Optional[str]],
+        jwt_secret: Optional[str] = None,
+        audience: str = JWT_AUDIENCE,
+        session_recheck: float = SESSION_RECHECK_SECONDS,
+    ):
+        self.jwks_url = jwks_url
+        self.remote_user_id = remote_user_id
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.session_recheck = session_recheck
+
+        self._keys: Dict[str, object] = {}
+        self._keys_fetched = 0.0
+        self._lock = threading.Lock()
+        # session_id -> monotonic time of the last successful remote check
+        self._sessions_checked: Dict[str, float] = {}
+        # session_id -> token expiry, for sessions the auth server rejected
+        self._sessions_revoked: Dict[str, float] = {}
+
+        # Stats
+        self.counts = {
+            "local_ok": 0, "local_rejected": 0, "expired": 0,
+            "remote_calls": 0, "remote_ok": 0, "remote_rejected": 0, "remote_errors": 0,
+            "jwks_fetches": 0, "session_rechecks": 0,
+        }
+        self._local_ms = deque(maxlen=LATENCY_SAMPLES)
+        self._remote_ms = deque(maxlen=LATENCY_SAMPLES)
+
+    # -------------------------------------------------------------------------
+    # Verification
+    # -------------------------------------------------------------------------
+
+    def verify_local(self, token: str, revalidate: bool = False) -> Tuple[Optional[str], bool]:
+        """
+        Check a token without network access.
+
+        Returns (user_id, needs_remote): user_id is None for a rejected token;
+        needs_remote means the caller must use verify_remote() instead (no key
+        for the token, session recheck due, or `revalidate` requested).
+        """
+        started = time.perf_counter()
+        try:
+            claims = self._decode(token)
+        except jwt.ExpiredSignatureError:
+            self.counts["expired"] += 1
+            return None, False
+        except LookupError:
+            return None, True
+        except jwt.InvalidTokenError:
+            self.counts["local_rejected"] += 1
+            return None, False
+        finally:
+            self._local_ms.append((time.perf_counter() - started) * 1000)
+
+        user_id = claims.get("sub")
+        if not user_id:
+            self.counts["local_rejected"] += 1
+            return None, False
+        session_id = claims.get("session_id")
+        if session_id and session_id in self._sessions_revoked:
+            self.counts["local_rejected"] += 1
+            return None, False
+        if revalidate or self._recheck_due(session_id):
+            return user_id, True
+        self.counts["local_ok"] += 1
+        return user_id, False
+
+    def verify_remote(self, token: str, revalidate: bool = False) -> Optional[str]:
+        """
+        Blocking fallback: refresh the JWKS if the token's key is unknown (and
+        verify locally again with the new keys), otherwise confirm the token
+        and its session with the auth server.
+
+        Raises AuthUnavailable if the auth server cannot be reached and the
+        token could not be accepted on its local verification alone.
+        """
+        session_id = None
+        expires = 0.0
+        local_user_id = None
+        try:
+            header = jwt.get_unverified_header(token)
+            if header.get("alg") in ASYMMETRIC_ALGORITHMS and header.get("kid") not in self._keys:
+                self._refresh_keys()
+                if header.get("kid") in self._keys:
+                    user_id, needs_remote = self.verify_local(token, revalidate)
+                    if not needs_remote:
+                        return user_id
+            claims = jwt.decode(token, options={"verify_signature": False})
+            session_id = claims.get("session_id")
+            expires = float(claims.get("exp", 0))
+            try:
+                local_user_id = self._decode(token).get("sub")
+            except LookupError:
+                pass
+        except jwt.InvalidTokenError:
+            pass
+
+        self.counts["remote_calls"] += 1
+        started = time.perf_counter()
+        try:
+            user_id = self.remote_user_id(token)
+        except Exception as e:
+            self.counts["remote_errors"] += 1
+            print(f"⚠ Remote token verification failed: {e}")
+            if local_user_id and not revalidate:
+                # A due session recheck: the signature is valid, so keep the
+                # session and retry the recheck shortly instead of revoking it
+                if session_id:
+                    with self._lock:
+                        self._sessions_checked[session_id] = (
+                            time.monotonic() - self.session_recheck + SESSION_RETRY_SECONDS
+                        )
+                return local_user_id
+            raise AuthUnavailable(str(e)) from e
+        finally:
+            self._remote_ms.append((time.perf_counter() - started) * 1000)
+
+        with self._lock:
+            if user_id:
+                self.counts["remote_ok"] += 1
+                if session_id:
+                    self._sessions_checked[session_id] = time.monotonic()
+            else:
+                self.counts["remote_rejected"] += 1
+                if session_id:
+                    self._sessions_checked.pop(session_id, None)
+                    self._sessions_revoked[session_id] = expires
+            self._prune_sessions()
+        return user_id
+
+    def _decode(self, token: str) -> dict:
+        """Verify signature/expiry/audience; LookupError when no key is available."""
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        if algorithm == "HS256":
+            if not self.jwt_secret:
+                raise LookupError("No JWT secret configured")
+            key = self.jwt_secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            self._refresh_keys_if_stale()
+            key = self._keys.get(header.get("kid"))
+            if key is None:
+                raise LookupError(f"Unknown signing key {header.get('kid')}")
+        else:
+            raise jwt.InvalidAlgorithmError(f"Unsupported algorithm {algorithm}")
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=self.audience,
+            leeway=JWT_LEEWAY_SECONDS,
+            options={"require": ["exp", "sub"]},
+        )
+
+    def _recheck_due(self, session_id: Optional[str]) -> bool:
+        if not session_id or self.session_recheck <= 0:
+            return False
+        last = self._sessions_checked.get(session_id)
+        if last is None or time.monotonic() - last > self.session_recheck:
+            self.counts["session_rechecks"] += 1
+            return True
+        return False
+
+    def _prune_sessions(self):
+        now = time.time()
+        for session_id, expires in list(self._sessions_revoked.items()):
+            if expires + JWT_LEEWAY_SECONDS < now:
+                del self._sessions_revoked[session_id]
+        if len(self._sessions_checked) > 10000:
+            cutoff = time.monotonic() - self.session_recheck
+            for session_id, checked in list(self._sessions_checked.items()):
+                if checked < cutoff:
+                    del self._sessions_checked[session_id]
+
+    # -------------------------------------------------------------------------
+    # Signing keys
+    # -------------------------------------------------------------------------
+
+    def _refresh_keys_if_stale(self):
+        # Expired keys are only refetched on the remote path, so the event
+        # loop never waits for the JWKS endpoint; until then they stay valid.
+        if self._keys and time.monotonic() - self._keys_fetched > JWKS_TTL_SECONDS:
+            threading.Thread(target=self._refresh_keys, daemon=True).start()
+            self._keys_fetched = time.monotonic()
+
+    def _refresh_keys(self):
+        """Fetch the JWKS (rate limited) and replace the cached keys."""
+        if not self.jwks_url:
+            return
+        with self._lock:
+            if self._keys and time.monotonic() - self._keys_fetched < JWKS_MIN_REFRESH_SECONDS:
+                return
+            self._keys_fetched = time.monotonic()
+        try:
+            response = httpx.get(self.jwks_url, timeout=JWKS_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            keys = {}
+            for jwk in response.json().get("keys", []):
+                try:
+                    keys[jwk.get("kid")] = jwt.PyJWK.from_dict(jwk).key
+                except jwt.PyJWKError as e:
+                    print(f"⚠ Skipping unusable JWKS key {jwk.get('kid')}: {e}")
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"⚠ Failed to fetch JWKS from {self.jwks_url}: {e}")
+            return
+        self.counts["jwks_fetches"] += 1
+        self._keys = keys
+
+    # -------------------------------------------------------------------------
+    # Stats
+    # -------------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        local, remote = list(self._local_ms), list(self._remote_ms)
+        return {
+            **self.counts,
+            "signing_keys": len(self._keys),
+            "hs256_secret": bool(self.jwt_secret),
+            "local_ms": {
+                "avg": round(sum(local) / len(local), 3) if local else 0.0,
+                "p50": round(_percentile(local, 0.50), 3),
+                "p95": round(_percentile(local, 0.95), 3),
+            },
+            "remote_ms": {
+                "avg": round(sum(remote) / len(remote), 1) if remote else 0.0,
+                "p50": round(_percentile(remote, 0.50), 1),
+                "p95": round(_percentile(remote, 0.95), 1),
+            },
+        }
@@ -0,0 +1,216 @@
+"""
+SQLite Connection Pool
+
+Read-only connection pool for quran.db. Sync FastAPI endpoints run in a
+threadpool, so instead of opening and closing a connection per request each
+thread reuses a warm connection: the pool remembers the connection a thread
+used last and hands the same one back when it is idle, falling back to any
+idle connection, then to opening a new one up to `max_connections`, and
+finally to waiting for one to be released.
+
+Connections are opened in read-only, immutable URI mode with mmap and page
+cache tuning, and sqlite3's per-connection prepared statement cache is enlarged
+so repeated queries skip re-parsing.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Tuning defaults for a ~50MB read-only database
+DEFAULT_MAX_CONNECTIONS = 16
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024      # Map the whole DB file
+DEFAULT_CACHE_SIZE_KB = 16 * 1024          # Page cache per connection (negative PRAGMA = KiB)
+DEFAULT_CACHED_STATEMENTS = 256            # Prepared statements kept per connection
+DEFAULT_ACQUIRE_TIMEOUT = 30.0
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled sqlite3 connection.
+
+    Behaves like a normal connection, but close() returns it to the pool
+    instead of closing it, so existing `conn.close()` call sites keep working.
+    """
+
+    __slots__ = ("_pool", "_conn", "_generation")
+
+    def __init__(self, pool: "SQLitePool", conn: sqlite3.Connection, generation: int):
+        self._pool = pool
+        self._conn = conn
+        self._generation = generation
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._conn is not None:
+            self._pool._release(self._conn, self._generation)
+            self._conn = None
+
+
+class SQLitePool:
+    """Thread-affine pool of read-only SQLite connections."""
+
+    def __init__(
+        self,
+        db_path,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        mmap_size: int = DEFAULT_MMAP_SIZE,
+        cache_size_kb: int = DEFAULT_CACHE_SIZE_KB,
+        cached_statements: int = DEFAULT_CACHED_STATEMENTS,
+        acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT,
+    ):
+        self.db_path = Path(db_path)
+        self.max_connections = max_connections
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = []
+        self._open = 0
+        self._generation = 0
+        self._local = threading.local()
+        self._cond = threading.Condition(threading.Lock())
+
+        # Stats
+        self.hits = 0
+        self.affinity_hits = 0
+        self.opened = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    # -------------------------------------------------------------------------
+    # Connection lifecycle
+    # -------------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a tuned, read-only connection."""
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro&immutable=1"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """Check out a connection, preferring the one this thread used last."""
+        last = getattr(self._local, "conn", None)
+        conn = None
+        with self._cond:
+            deadline = None
+            while True:
+                if self._idle:
+                    if last is not None and last in self._idle:
+                        self._idle.remove(last)
+                        conn = last
+                        self.affinity_hits += 1
+                    else:
+                        conn = self._idle.pop()
+                    self.hits += 1
+                    break
+                if self._open < self.max_connections:
+                    # Reserve the slot, then connect outside the lock
+                    self._open += 1
+                    break
+                if deadline is None:
+                    self.waits += 1
+                    deadline = time.monotonic() + self.acquire_timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError("SQLite connection pool exhausted")
+                started = time.monotonic()
+                self._cond.wait(remaining)
+                self.wait_seconds += time.monotonic() - started
+            generation = self._generation
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.opened += 1
+
+        self._local.conn = conn
+        return PooledConnection(self, conn, generation)
+
+    def _release(self, conn: sqlite3.Connection, generation: int):
+        """Return a connection to the pool (or close it if the pool was reset)."""
+        with self._cond:
+            if generation != self._generation:
+                self._open -= 1
+                stale = True
+            else:
+                self._idle.append(conn)
+                stale = False
+            self._cond.notify()
+        if stale:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def reset(self, db_path=None):
+        """
+        Close idle connections and retire checked-out ones on release.
+
+        Used when quran.db is replaced on disk, since immutable connections
+        never notice changes to the underlying file.
+        """
+        with self._cond:
+            if db_path is not None:
+                self.db_path = Path(db_path)
+            self._generation += 1
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def close(self):
+        """Close every idle connection."""
+        self.reset()
+
+    # -------------------------------------------------------------------------
+    # Stats
+    # -------------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "open_connections": self._open,
+                "idle_connections": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "max_connections": self.max_connections,
+                "opened_total": self.opened,
+                "hits": self.hits,
+                "affinity_hits": self.affinity_hits,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 4),
+            }
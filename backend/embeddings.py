@@ -0,0 +1,210 @@
+"""
+Embeddings module for semantic search over Quran ayahs.
+
+Uses sentence-transformers (all-MiniLM-L6-v2 unless EMBEDDING_MODEL says
+otherwise) for generating text embeddings. Embeddings are stored as binary
+blobs in SQLite; queries must be encoded with the model the ayahs were.
+"""
+
+import asyncio
+import numpy as np
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import struct
+
+# Model is loaded lazily to avoid startup delay
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+_model = None
+
+
+def get_model():
+    """Lazy-load the sentence transformer model."""
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer(EMBEDDING_MODEL)
+    return _model
+
+
+def model_dimensions() -> Optional[int]:
+    """Embedding size of the loaded model, or None if it is not loaded."""
+    return _model.get_sentence_embedding_dimension() if _model is not None else None
+
+
+def generate_embedding(text: str) -> np.ndarray:
+    """Generate embedding vector for a single text."""
+    model = get_model()
+    embedding = model.encode(text, convert_to_numpy=True)
+    return embedding.astype(np.float32)
+
+
+def generate_embeddings_batch(texts: List[str], batch_size: int = 32) -> np.ndarray:
+    """Generate embeddings for multiple texts efficiently."""
+    model = get_model()
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return embeddings.astype(np.float32)
+
+
+# Storage formats for ayah_embeddings.embedding (recorded in ayah_embeddings.dtype):
+#   float32  raw little-endian floats
+#   float16  raw half floats (half the size, ~3 significant digits)
+#   int8     float32 scale, then one signed byte per dimension (x ≈ code * scale)
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+INT8_SCALE = struct.Struct("<f")
+
+
+def quantize_int8(vectors: np.ndarray):
+    """Symmetric per-vector int8 quantization: returns (codes, scales)."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def embedding_to_bytes(embedding: np.ndarray, dtype: str = "float32") -> bytes:
+    """Serialize numpy array to bytes for SQLite BLOB storage."""
+    if dtype == "float16":
+        return embedding.astype(np.float16).tobytes()
+    if dtype == "int8":
+        codes, scales = quantize_int8(embedding)
+        return INT8_SCALE.pack(scales[0]) + codes[0].tobytes()
+    return embedding.astype(np.float32).tobytes()
+
+
+def bytes_to_embedding(data: bytes, dtype: str = "float32") -> np.ndarray:
+    """Deserialize bytes from SQLite BLOB to a float32 numpy array."""
+    if dtype == "float16":
+        return np.frombuffer(data, dtype=np.float16).astype(np.float32)
+    if dtype == "int8":
+        scale = INT8_SCALE.unpack_from(data)[0]
+        return np.frombuffer(data, dtype=np.int8, offset=INT8_SCALE.size).astype(np.float32) * scale
+    return np.frombuffer(data, dtype=np.float32)
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Calculate cosine similarity between two vectors."""
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+# =============================================================================
+# QUERY ENCODER
+# =============================================================================
+# model.encode dominates semantic search latency, so query embeddings are
+# cached by normalized query text, and concurrent cache misses are collected
+# for a few milliseconds and encoded together in one batch on a worker thread,
+# keeping the event loop free.
+
+QUERY_CACHE_SIZE = 4096
+BATCH_WINDOW_SECONDS = 0.005
+MAX_BATCH_SIZE = 64
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: NFC form with collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class QueryEncoder:
+    """LRU-cached, micro-batched query embedding."""
+
+    def __init__(
+        self,
+        max_entries: int = QUERY_CACHE_SIZE,
+        window: float = BATCH_WINDOW_SECONDS,
+        max_batch: int = MAX_BATCH_SIZE,
+    ):
+        self.max_entries = max_entries
+        self.window = window
+        self.max_batch = max_batch
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_handle = None
+        # Running batch tasks; the loop only keeps weak references to tasks
+        self._tasks = set()
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.batched_queries = 0
+
+    def cached(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+            return embedding
+
+    def _store(self, key: str, embedding: np.ndarray):
+        with self._lock:
+            self._cache[key] = embedding
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Embedding for one query; cache hits never touch the model."""
+        key = normalize_query(text)
+        embedding = self.cached(key)
+        if embedding is not None:
+            self.hits += 1
+            return embedding
+        self.misses += 1
+
+        loop = asyncio.get_running_loop()
+        future = self._pending.get(key)
+        if future is None:
+            # Identical queries in the same window share one encode
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._flush(loop)
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.window, self._flush, loop)
+        return await asyncio.shield(future)
+
+    def _flush(self, loop):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = loop.create_task(self._encode_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _encode_batch(self, batch: Dict[str, asyncio.Future]):
+        keys = list(batch)
+        self.batches += 1
+        self.batched_queries += len(keys)
+        try:
+            embeddings = await asyncio.get_running_loop().run_in_executor(
+                None, generate_embeddings_batch, keys, len(keys)
+            )
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, embedding in zip(keys, embeddings):
+            self._store(key, embedding)
+            if not batch[key].done():
+                batch[key].set_result(embedding)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._cache)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_queries / self.batches, 2) if self.batches else 0.0,
+        }
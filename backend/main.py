@@ -10,23 +10,43 @@ bookmarks, and progress tracking.
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, Query, Header, Depends
+from fastapi import FastAPI, HTTPException, Query, Header, Depends, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Callable, Optional, List, Tuple
+import asyncio
 import sqlite3
 import os
 import hashlib
 import secrets
 import json
-from datetime import datetime, timedelta
+import unicodedata
+from datetime import datetime
 from pathlib import Path
 from share_image import generate_ayah_image_bytes
+from quran_corpus import QuranCorpus, load_corpus, get_corpus, add_reload_listener, PARALLEL_FIELDS
+from response_cache import ResponseCache, SearchResultCache, encode_json, etag_matches
+from quran_export import EXPORT_FORMATS, export_etag, export_chunk_sizes, iter_export, iter_export_range, parse_range
+from db_pool import SQLitePool
+from semantic_index import SemanticIndex, load_semantic_index
+from embeddings import EMBEDDING_MODEL, QueryEncoder, model_dimensions
+from starlette.concurrency import run_in_threadpool
+from auth_tokens import AuthUnavailable, TokenVerifier
+from profile_cache import ProfileCache
+from supabase_data import create_data_client
+from user_stats import UserStatsStore, TOTAL_QURAN_AYAHS
+from arabic_text import normalize_arabic
+from quran_search import (
+    SORT_OPTIONS, SEARCH_MODES, MORPHOLOGY_MODES, SearchQueryError, SearchIndexMissing,
+    search_fts, search_fuzzy, search_roots, search_editions, search_merged, fuzzy_expression,
+    searchable_edition, match_lists, MERGED_LANGUAGES,
+)
 
 # Supabase integration
-from supabase import create_client, Client
+from supabase import create_client, Client, AuthApiError
+from postgrest import AsyncPostgrestClient
 
 # Database paths
 DB_PATH = Path(os.environ.get("DB_PATH", Path(__file__).parent.parent / "quran-dump" / "quran.db"))
@@ -47,9 +67,52 @@ else:
 # Create Supabase client for public operations
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-# Create Supabase client with service role key for admin operations (bypasses RLS)
-supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY) if SUPABASE_SERVICE_ROLE_KEY else None
-print(f"DEBUG: supabase_admin client created: {supabase_admin is not None}")
+# Async PostgREST client for user data. Uses the service role key when set,
+# which bypasses RLS for admin operations.
+db = create_data_client(
+    os.environ.get("SUPABASE_REST_URL", f"{SUPABASE_URL}/rest/v1"),
+    SUPABASE_SERVICE_ROLE_KEY or SUPABASE_KEY,
+)
+
+
+def remote_user_id(token: str) -> Optional[str]:
+    """
+    Ask Supabase Auth who a token belongs to (network round-trip).
+
+    Returns None only when Supabase rejects the token or its session; other
+    errors (timeouts, outages, rate limits) propagate so they are not taken
+    for a sign-out.
+    """
+    try:
+        user = supabase.auth.get_user(token)
+    except AuthApiError as e:
+        if e.status in (401, 403):
+            return None
+        raise
+    return user.user.id if user and user.user else None
+
+
+# Local JWT verification: signatures/expiry checked in-process, Supabase Auth
+# only consulted on key rotation and periodic session (revocation) checks.
+# SUPABASE_JWKS_URL / SUPABASE_JWT_SECRET can point at any compatible issuer.
+token_verifier = TokenVerifier(
+    jwks_url=os.environ.get("SUPABASE_JWKS_URL", f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json"),
+    remote_user_id=remote_user_id,
+    jwt_secret=os.environ.get("SUPABASE_JWT_SECRET"),
+)
+
+
+async def fetch_profile(user_id: str) -> Optional[dict]:
+    """Load a user's profile row."""
+    response = await db.table("profiles").select("*").eq("id", user_id).execute()
+    return response.data[0] if response.data else None
+
+
+# Profiles of authenticated callers, shared by concurrent requests
+profile_cache = ProfileCache(fetch_profile)
+
+# Stats endpoints: one materialized user_stats row per user
+stats_store = UserStatsStore(db)
 
 app = FastAPI(title="Quran Reader API")
 
@@ -68,6 +131,78 @@ try:
 except Exception as e:
     print(f"⚠ Failed to preload embeddings model: {e}")
 
+# =============================================================================
+# PRELOAD QURAN CORPUS
+# =============================================================================
+# The Quran text never changes at runtime, so it is loaded once into compact
+# columnar arrays. With gunicorn --preload this happens in the parent process
+# and the buffers are shared copy-on-write across workers.
+# =============================================================================
+print("Loading Quran corpus...")
+try:
+    _corpus_stats = load_corpus(DB_PATH).stats()
+    print(f"✓ Quran corpus loaded: {_corpus_stats['ayah_rows']} ayahs, "
+          f"{_corpus_stats['corpus_bytes'] / 1024 / 1024:.1f} MB")
+    # Move everything loaded so far out of the GC's tracked generations so
+    # collections in forked workers don't dirty the shared pages.
+    import gc
+    gc.freeze()
+except Exception as e:
+    print(f"⚠ Failed to load Quran corpus: {e}")
+
+# =============================================================================
+# PRELOAD SEMANTIC INDEX
+# =============================================================================
+# Ayah embeddings are memory-mapped from the .npy cache next to quran.db (built
+# from the ayah_embeddings table when missing or stale) and shared by workers.
+# =============================================================================
+semantic_index: Optional[SemanticIndex] = None
+
+
+def load_semantic(corpus):
+    """(Re)load the semantic index for a corpus version; None without embeddings."""
+    global semantic_index
+    conn = sqlite3.connect(f"{corpus.db_path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        index = load_semantic_index(conn, corpus.db_path, corpus.version, model=EMBEDDING_MODEL)
+    except (sqlite3.OperationalError, ValueError) as e:
+        print(f"⚠ Semantic index unavailable: {e}")
+        index = None
+    finally:
+        conn.close()
+    semantic_index = index if index is not None and len(index) else None
+    if index is not None and not len(index):
+        print(f"⚠ Semantic index unavailable: no ayah embeddings for {EMBEDDING_MODEL}")
+    if semantic_index is not None:
+        print(f"✓ Semantic index loaded: {len(semantic_index)} vectors")
+        problem = embedding_mismatch(semantic_index, model_dimensions())
+        if problem:
+            print(f"⚠ {problem}; semantic search will return 503")
+
+
+def embedding_mismatch(index: SemanticIndex, dimensions: Optional[int]) -> Optional[str]:
+    """Why queries from EMBEDDING_MODEL cannot be scored against the index, if they can't."""
+    if index.model and index.model != EMBEDDING_MODEL:
+        return f"Semantic index was built with {index.model}, but EMBEDDING_MODEL is {EMBEDDING_MODEL}"
+    if dimensions is not None and dimensions != index.dimensions:
+        return (f"{EMBEDDING_MODEL} embeddings are {dimensions}-d, "
+                f"but the semantic index is {index.dimensions}-d")
+    return None
+
+
+try:
+    load_semantic(get_corpus())
+except Exception as e:
+    print(f"⚠ Failed to load semantic index: {e}")
+add_reload_listener(load_semantic)
+
+# Cached, micro-batched query embeddings for /api/quran/semantic-search
+query_encoder = QueryEncoder()
+
+# Pre-serialized JSON bodies for the static Quran endpoints, keyed by
+# (endpoint, surah, edition) and versioned by the quran.db content hash
+response_cache = ResponseCache()
+
 # CORS middleware - allows localhost, Tailscale, and production domain
 app.add_middleware(
     CORSMiddleware,
@@ -90,40 +225,96 @@ if AUDIO_PATH.exists():
     app.mount("/audio", StaticFiles(directory=str(AUDIO_PATH)), name="audio")
 
 
+def cached_quran_response(request: Request, key: tuple, build, corpus: QuranCorpus):
+    """Serve a static Quran payload built from `corpus` from the pre-serialized response cache."""
+    return response_cache.response(request, key, build, corpus.version)
+
+
+# Read-only pool of tuned SQLite connections shared by all request threads
+db_pool = SQLitePool(DB_PATH)
+
+
 def get_db_connection():
-    """Create a database connection for Quran data."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """
+    Check out a pooled, read-only database connection for Quran data.
+
+    Callers keep using `conn.close()`, which returns the connection to the pool.
+    """
+    return db_pool.acquire()
+
+
+def quran_query(work: Callable):
+    """
+    Run work(cursor) on a pooled connection and return its result.
+
+    acquire() blocks while the pool is exhausted, so async endpoints call this
+    through run_in_threadpool() instead of on the event loop.
+    """
+    conn = get_db_connection()
+    try:
+        return work(conn.cursor())
+    finally:
+        conn.close()
+
+
+# Immutable connections never see a swapped quran.db, so recycle them on reload
+add_reload_listener(lambda corpus: db_pool.reset(corpus.db_path))
+add_reload_listener(lambda corpus: match_lists.clear())
+
+
+def resolve_edition(identifier: str, corpus: Optional[QuranCorpus] = None) -> dict:
+    """
+    Resolve a text edition identifier to its metadata (including id), or 404.
+
+    Handlers that go on to read the corpus pass the snapshot they read from,
+    so a hot reload in between cannot resolve against a different one.
+    """
+    edition = (corpus or get_corpus()).editions.get(identifier)
+    if edition is None:
+        raise HTTPException(status_code=404, detail=f"Edition '{identifier}' not found")
+    return edition
+
+
+def resolve_audio_edition(identifier: str) -> dict:
+    """Resolve an audio edition identifier to its metadata (including id), or 404."""
+    edition = get_corpus().audio_editions.get(identifier)
+    if edition is None:
+        raise HTTPException(status_code=404, detail=f"Audio edition '{identifier}' not found")
+    return edition
+
+
+def surah_sizes() -> dict:
+    """Number of ayahs per surah id, for completion stats."""
+    return {s["id"]: s["number_of_ayahs"] for s in get_corpus().surah_list}
+
+
+def find_edition_id(identifier: str) -> Optional[int]:
+    """Look up a text edition id without raising, for optional editions."""
+    edition = get_corpus().editions.get(identifier)
+    return edition["id"] if edition else None
+
+
+async def authenticate(token: str, revalidate: bool = False) -> Optional[str]:
+    """Return the token's user_id, verifying locally and remotely only when needed."""
+    user_id, needs_remote = token_verifier.verify_local(token, revalidate)
+    if needs_remote:
+        try:
+            user_id = await run_in_threadpool(token_verifier.verify_remote, token, revalidate)
+        except AuthUnavailable:
+            raise HTTPException(status_code=503, detail="Authentication service unavailable")
+    return user_id
 
 
 async def verify_token(authorization: str = Header(None)) -> Optional[str]:
     """Verify Supabase JWT token and return user_id (UUID)."""
     if not authorization:
-        print("DEBUG: verify_token - No authorization header")
         return None
 
     if not authorization.startswith("Bearer "):
-        print("DEBUG: verify_token - Invalid authorization format")
         return None
 
     token = authorization[7:]  # Remove "Bearer " prefix
-    print(f"DEBUG: verify_token - Token length: {len(token)}, starts with: {token[:20]}...")
-
-    try:
-        # Verify the JWT token with Supabase
-        print("DEBUG: verify_token - Calling supabase.auth.get_user()...")
-        user = supabase.auth.get_user(token)
-        print(f"DEBUG: verify_token - Supabase response: {user}")
-
-        if user and user.user:
-            print(f"DEBUG: verify_token - SUCCESS: user_id={user.user.id}")
-            return user.user.id
-        print("DEBUG: verify_token - FAILED: No user in response")
-        return None
-    except Exception as e:
-        print(f"DEBUG: verify_token - Exception: {e}")
-        return None
+    return await authenticate(token)
 
 
 async def get_current_user_with_token(authorization: str = Header(None)):
@@ -137,24 +328,22 @@ async def get_current_user_with_token(authorization: str = Header(None)):
     token = authorization[7:]  # Remove "Bearer " prefix
 
     try:
-        # Verify the JWT token with Supabase
-        user = supabase.auth.get_user(token)
-        if not user or not user.user:
+        # Password changes always confirm the session with Supabase
+        user_id = await authenticate(token, revalidate=True)
+        if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        user_id = user.user.id
-
         # Get user profile
-        response = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
+        profile = await profile_cache.get(user_id)
 
-        if not response.data:
+        if not profile:
             raise HTTPException(status_code=401, detail="User not found")
 
         return {
-            "id": response.data["id"],
-            "name": response.data.get("name", ""),
-            "email": response.data.get("email", ""),
-            "created_at": response.data.get("created_at", ""),
+            "id": profile["id"],
+            "name": profile.get("name", ""),
+            "email": profile.get("email", ""),
+            "created_at": profile.get("created_at", ""),
             "access_token": token
         }
     except HTTPException:
@@ -169,19 +358,19 @@ async def get_current_user(user_id: str = Depends(verify_token)):
         raise HTTPException(status_code=401, detail="Invalid or missing token")
 
     try:
-        # Use admin client for profile fetching to bypass RLS
-        client = supabase_admin if supabase_admin else supabase
-        response = client.table("profiles").select("*").eq("id", user_id).single().execute()
+        profile = await profile_cache.get(user_id)
 
-        if not response.data:
+        if not profile:
             raise HTTPException(status_code=401, detail="User not found")
 
         return {
-            "id": response.data["id"],
-            "name": response.data.get("name", ""),
-            "email": response.data.get("email", ""),
-            "created_at": response.data.get("created_at", "")
+            "id": profile["id"],
+            "name": profile.get("name", ""),
+            "email": profile.get("email", ""),
+            "created_at": profile.get("created_at", "")
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"User not found: {str(e)}")
 
@@ -193,7 +382,22 @@ async def get_current_user(user_id: str = Depends(verify_token)):
 @app.get("/api/health")
 def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "database": "connected" if DB_PATH.exists() else "not found"}
+    result = {"status": "healthy", "database": "connected" if DB_PATH.exists() else "not found"}
+    try:
+        result["corpus"] = get_corpus().stats()
+    except Exception:
+        result["corpus"] = None
+    result["response_cache"] = response_cache.stats()
+    result["db_pool"] = db_pool.stats()
+    result["search_match_lists"] = match_lists.stats()
+    result["search_cache"] = search_cache.stats()
+    result["semantic_index"] = semantic_index.stats() if semantic_index is not None else None
+    result["query_encoder"] = query_encoder.stats()
+    result["auth"] = token_verifier.stats()
+    result["profile_cache"] = profile_cache.stats()
+    result["supabase"] = db.request_stats.stats()
+    result["user_stats"] = stats_store.stats()
+    return result
 
 
 # =============================================================================
@@ -201,127 +405,218 @@ def health_check():
 # =============================================================================
 
 @app.get("/api/quran/surahs")
-def get_surahs():
-    """Get all surahs (chapters)."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, name, english_name, english_name_translation,
-                   revelation_type, number_of_ayahs
-            FROM surahs
-            ORDER BY id ASC
-        """)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
-    finally:
-        conn.close()
+def get_surahs(request: Request):
+    """Get all surahs (chapters). Served from the in-memory corpus."""
+    corpus = get_corpus()
+    return cached_quran_response(request, ("surahs",), lambda: corpus.surah_list, corpus)
 
 
 @app.get("/api/quran/surahs/{surah_id}")
-def get_surah(surah_id: int, edition: str = Query("quran-uthmani")):
+def get_surah(request: Request, surah_id: int, edition: str = Query("quran-uthmani")):
     """Get a single surah by ID."""
-    conn = get_db_connection()
-    try:
-        # First get the edition ID
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM editions WHERE identifier = ?", (edition,))
-        edition_row = cursor.fetchone()
-        if not edition_row:
-            raise HTTPException(status_code=404, detail=f"Edition '{edition}' not found")
-        edition_id = edition_row[0]
+    corpus = get_corpus()
+    resolve_edition(edition, corpus)
 
-        # Get surah info
-        cursor.execute("""
-            SELECT id, name, english_name, english_name_translation,
-                   revelation_type, number_of_ayahs
-            FROM surahs
-            WHERE id = ?
-        """, (surah_id,))
-        surah = cursor.fetchone()
-        if not surah:
-            raise HTTPException(status_code=404, detail=f"Surah {surah_id} not found")
+    surah = corpus.surah(surah_id)
+    if not surah:
+        raise HTTPException(status_code=404, detail=f"Surah {surah_id} not found")
 
-        return dict(surah)
-    finally:
-        conn.close()
+    return cached_quran_response(request, ("surah", surah_id), lambda: surah, corpus)
 
 
 @app.get("/api/quran/surahs/{surah_id}/ayahs")
-def get_ayahs(surah_id: int, edition: str = Query("quran-uthmani")):
+def get_ayahs(request: Request, surah_id: int, edition: str = Query("quran-uthmani")):
     """Get all ayahs for a specific surah."""
-    conn = get_db_connection()
-    try:
-        # Get edition ID
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM editions WHERE identifier = ?", (edition,))
-        edition_row = cursor.fetchone()
-        if not edition_row:
-            raise HTTPException(status_code=404, detail=f"Edition '{edition}' not found")
-        edition_id = edition_row[0]
+    corpus = get_corpus()
+    resolve_edition(edition, corpus)
 
-        # Get ayahs
-        cursor.execute("""
-            SELECT a.id, a.number, a.number_in_surah, a.text,
-                   a.juz, a.manzil, a.page, a.ruku, a.hizb_quarter, a.sajda
-            FROM ayahs a
-            WHERE a.surah_id = ? AND a.edition_id = ?
-            ORDER BY a.number_in_surah ASC
-        """, (surah_id, edition_id))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
-    finally:
-        conn.close()
+    # Unknown surahs return an empty list; don't let them fill the cache
+    if corpus.surah(surah_id) is None:
+        return []
+
+    return cached_quran_response(
+        request, ("ayahs", surah_id, edition), lambda: corpus.surah_ayahs(edition, surah_id), corpus
+    )
+
+
+@app.get("/api/quran/surahs/{surah_id}/parallel")
+def get_parallel_ayahs(
+    request: Request,
+    surah_id: int,
+    editions: str = Query("quran-uthmani,en.sahih", description="Comma-separated edition identifiers"),
+    fields: Optional[str] = Query(None, description="Comma-separated extra fields (ids, juz, manzil, page, ruku, hizb_quarter, sajda); default all, empty for none")
+):
+    """
+    Get a surah in several editions at once, one row per ayah with all texts aligned.
+
+    Replaces one /ayahs call per edition with a single pass over the in-memory corpus.
+    """
+    identifiers = list(dict.fromkeys(e.strip() for e in editions.split(",") if e.strip()))
+    if not identifiers:
+        raise HTTPException(status_code=400, detail="At least one edition is required")
+    corpus = get_corpus()
+    for identifier in identifiers:
+        resolve_edition(identifier, corpus)
+
+    if fields is None:
+        selected = PARALLEL_FIELDS
+    else:
+        selected = tuple(f.strip() for f in fields.split(",") if f.strip())
+        unknown = [f for f in selected if f not in PARALLEL_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    surah = corpus.surah(surah_id)
+    if not surah:
+        raise HTTPException(status_code=404, detail=f"Surah {surah_id} not found")
+
+    return cached_quran_response(
+        request,
+        ("parallel", surah_id, tuple(identifiers), tuple(sorted(selected))),
+        lambda: {
+            "surah": surah,
+            "editions": identifiers,
+            "ayahs": corpus.parallel_ayahs(identifiers, surah_id, selected),
+        },
+        corpus,
+    )
+
+
+# Mushaf divisions served as contiguous slices: (ayah column, quarters per unit)
+MUSHAF_DIVISIONS = {
+    "page": ("page", 1),
+    "juz": ("juz", 1),
+    "hizb": ("hizb_quarter", 4),
+}
+
+
+def get_mushaf_range(request: Request, division: str, number: int, edition: str):
+    """Serve all ayahs of a page/juz/hizb from the corpus offset tables."""
+    corpus = get_corpus()
+    resolve_edition(edition, corpus)
+    text = corpus.edition(edition)
+
+    column, span = MUSHAF_DIVISIONS[division]
+    first = (number - 1) * span + 1
+    bounds = text.meta_range(column, first, first + span - 1) if number > 0 else None
+    if bounds is None:
+        raise HTTPException(status_code=404, detail=f"{division.capitalize()} {number} not found")
+
+    def build():
+        start, stop = bounds
+        ayahs = text.range_rows(start, stop)
+        surah_ids = list(dict.fromkeys(a["surah_id"] for a in ayahs))
+        return {
+            division: number,
+            "edition": edition,
+            "surahs": [corpus.surah(s) for s in surah_ids if corpus.surah(s)],
+            "ayahs": ayahs,
+        }
+
+    return cached_quran_response(request, (division, number, edition), build, corpus)
+
+
+@app.get("/api/quran/page/{page_number}")
+def get_page(request: Request, page_number: int, edition: str = Query("quran-uthmani")):
+    """Get all ayahs on a Madinah mushaf page (1-604)."""
+    return get_mushaf_range(request, "page", page_number, edition)
+
+
+@app.get("/api/quran/juz/{juz_number}")
+def get_juz(request: Request, juz_number: int, edition: str = Query("quran-uthmani")):
+    """Get all ayahs in a juz (1-30)."""
+    return get_mushaf_range(request, "juz", juz_number, edition)
+
+
+@app.get("/api/quran/hizb/{hizb_number}")
+def get_hizb(request: Request, hizb_number: int, edition: str = Query("quran-uthmani")):
+    """Get all ayahs in a hizb (1-60), i.e. four consecutive hizb quarters."""
+    return get_mushaf_range(request, "hizb", hizb_number, edition)
+
+
+@app.get("/api/quran/export")
+def export_quran(
+    request: Request,
+    editions: str = Query("quran-uthmani", description="Comma-separated edition identifiers"),
+    format: str = Query("ndjson", description="Export format: ndjson or pack")
+):
+    """
+    Stream complete editions for offline use, one surah per chunk.
+
+    Supports If-None-Match (304) and Range / If-Range so interrupted
+    downloads can resume from the last received byte.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'pack'")
+    identifiers = list(dict.fromkeys(e.strip() for e in editions.split(",") if e.strip()))
+    if not identifiers:
+        raise HTTPException(status_code=400, detail="At least one edition is required")
+    corpus = get_corpus()
+    for identifier in identifiers:
+        resolve_edition(identifier, corpus)
+
+    etag = export_etag(corpus.version, identifiers, format)
+    extension = "ndjson" if format == "ndjson" else "qpk"
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": response_cache.cache_control,
+        "Content-Disposition": f'attachment; filename="quran-{"+".join(identifiers)}.{extension}"',
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), {etag}):
+        return Response(status_code=304, headers=headers)
+
+    # Only resume if the client's copy is of this exact export (If-Range)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        total = sum(export_chunk_sizes(corpus, identifiers, format))
+        try:
+            byte_range = parse_range(range_header, total)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{total}"})
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                iter_export_range(corpus, identifiers, format, start, end),
+                status_code=206,
+                media_type=EXPORT_FORMATS[format],
+                headers=headers,
+            )
+
+    return StreamingResponse(
+        iter_export(corpus, identifiers, format),
+        media_type=EXPORT_FORMATS[format],
+        headers=headers,
+    )
 
 
 @app.get("/api/quran/editions")
-def get_editions():
+def get_editions(request: Request):
     """Get all available text editions."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT identifier, language, name, english_name, format, type, direction
-            FROM editions
-            ORDER BY language, type, english_name
-        """)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
-    finally:
-        conn.close()
+    corpus = get_corpus()
+    return cached_quran_response(request, ("editions",), corpus.public_editions, corpus)
 
 
 @app.get("/api/quran/audio/editions")
-def get_audio_editions():
+def get_audio_editions(request: Request):
     """Get all available audio editions (reciters)."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, identifier, bitrate
-            FROM audio_editions
-            ORDER BY identifier
-        """)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
-    finally:
-        conn.close()
+    corpus = get_corpus()
+    return cached_quran_response(request, ("audio_editions",), lambda: corpus.audio_edition_rows, corpus)
 
 
 @app.get("/api/quran/audio/{ayah_number}")
 def get_ayah_audio(ayah_number: int, edition: str = Query("ar.alafasy")):
     """Get audio file info for a specific ayah."""
+    edition_id = resolve_audio_edition(edition)["id"]
+
     conn = get_db_connection()
     try:
-        # Get audio edition ID
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM audio_editions WHERE identifier = ?", (edition,))
-        edition_row = cursor.fetchone()
-        if not edition_row:
-            raise HTTPException(status_code=404, detail=f"Audio edition '{edition}' not found")
-        edition_id = edition_row[0]
-
         # Get audio file info
+        cursor = conn.cursor()
         cursor.execute("""
             SELECT file_path, url
             FROM audio_files
@@ -350,33 +645,133 @@ def get_ayah_audio(ayah_number: int, edition: str = Query("ar.alafasy")):
         conn.close()
 
 
+# Serialized search result pages, keyed by normalized query
+search_cache = SearchResultCache()
+
+
+def fuzzy_expressions(cursor, languages, query: str):
+    """Fuzzy FTS5 expressions for several languages, plus the merged expansions."""
+    expressions, expansions = {}, {}
+    for language in sorted(languages):
+        language_query = normalize_arabic(query) if language == "ar" else query
+        expressions[language], expanded = fuzzy_expression(cursor, language, language_query)
+        expansions.update(expanded)
+    return expressions, expansions
+
+
+def search_page(language: str, query: str, surah_id: Optional[int], sort: str,
+                limit: int, offset: int = 0, after=None, mode: str = "text",
+                editions: Tuple[str, ...] = ()):
+    """
+    Return one page of search results as (results JSON bytes, meta) from the cache.
+
+    meta holds count, total_count and next_after (and, for fuzzy mode, the
+    expansions used). Only whitespace and Unicode form are normalized for the
+    key: FTS5 operators are case-sensitive. language "all" pages through the
+    merged Arabic + English stream (`after` is then a "<language>:<ayah>"
+    cursor); with `editions`, the page comes from search_editions().
+    """
+    key_query = " ".join(unicodedata.normalize("NFC", query).split())
+    key = (mode, language, key_query, surah_id or None, sort, limit, offset if after is None else None, after, editions)
+    corpus = get_corpus()
+
+    def build():
+        extra = {}
+        if language == "all":
+            queries = {lang: normalize_arabic(key_query) if lang == "ar" else key_query
+                       for lang in MERGED_LANGUAGES}
+            if mode == "fuzzy":
+                conn = get_db_connection()
+                try:
+                    queries, extra["expansions"] = fuzzy_expressions(conn.cursor(), MERGED_LANGUAGES, key_query)
+                finally:
+                    conn.close()
+            # search_merged() takes a pooled connection per language itself; none
+            # is held here meanwhile, so merged searches cannot exhaust the pool
+            results, total_count, next_after = search_merged(
+                get_db_connection, corpus, queries, surah_id, sort, limit, offset, after
+            )
+        else:
+            conn = get_db_connection()
+            try:
+                if editions:
+                    expressions = None
+                    if mode == "fuzzy":
+                        languages = {searchable_edition(corpus, e)[1]["language"] for e in editions}
+                        expressions, extra["expansions"] = fuzzy_expressions(conn.cursor(), languages, key_query)
+                    results, total_count, next_after = search_editions(
+                        conn.cursor(), corpus, list(editions), key_query, surah_id, sort, limit, offset, after,
+                        expressions,
+                    )
+                elif mode == "text":
+                    results, total_count, next_after = search_fts(
+                        conn.cursor(), corpus, language, key_query, surah_id, sort, limit, offset, after
+                    )
+                elif mode == "fuzzy":
+                    results, total_count, next_after, extra["expansions"] = search_fuzzy(
+                        conn.cursor(), corpus, language, key_query, surah_id, sort, limit, offset, after
+                    )
+                else:
+                    results, total_count, next_after = search_roots(
+                        conn.cursor(), corpus, key_query, mode, surah_id, limit, offset, after
+                    )
+            finally:
+                conn.close()
+        meta = {"count": len(results), "total_count": total_count, "next_after": next_after, **extra}
+        return encode_json(results), meta
+
+    return search_cache.get(key, build, corpus.version)
+
+
 @app.get("/api/quran/search")
 def search_quran(
     q: str = Query(..., description="Search query text", min_length=1),
     language: Optional[str] = Query(None, description="Filter by language: ar, en, or all (default: auto-detect)"),
     surah_id: Optional[int] = Query(None, description="Filter to specific surah"),
+    sort: str = Query("relevance", description="Result order: relevance (bm25) or mushaf"),
+    mode: str = Query("text", description="text (full-text), fuzzy (typo-tolerant), root or stem (Arabic morphology)"),
     limit: int = Query(50, description="Max results (default: 50, max: 200)", ge=1, le=200),
-    offset: int = Query(0, description="Pagination offset", ge=0)
+    offset: int = Query(0, description="Pagination offset", ge=0),
+    after: Optional[str] = Query(None, description="Keyset pagination: next_after from the previous page (overrides offset)"),
+    editions: Optional[str] = Query(None, description="Comma-separated edition identifiers to search together (overrides language)")
 ):
     """
     Full-text search across Quran ayahs using FTS5.
 
     Searches Uthmani Arabic text and Saheeh International English translation.
-    Auto-detects query language if not specified.
-    """
-    import re
+    Auto-detects query language if not specified. Results are ranked by bm25
+    relevance (or mushaf order with sort=mushaf) and matched terms are wrapped
+    in <mark> tags in highlighted_text and snippet.
+
+    Pass next_after from a response as `after` to fetch the following page
+    without rescanning earlier results.
 
-    # Arabic diacritics pattern
-    ARABIC_DIACRITICS = re.compile(r'[\u064B-\u065F\u0670\u0640]')
+    language=all merges Arabic and English matches into one stream, ranked by
+    bm25 normalized per language (or in mushaf order, Arabic first), with an
+    exact total_count; its next_after is a cursor like "en:255".
 
-    def remove_arabic_diacritics(text: str) -> str:
-        return ARABIC_DIACRITICS.sub('', text)
+    mode=root (or stem) matches Arabic words sharing a root (or light stem)
+    with every query word, e.g. رحم finds رحمة, الرحيم and يرحم. It is answered
+    from precomputed posting lists, always in mushaf order.
 
+    mode=fuzzy tolerates misspellings and name variants (mercifull, Musa):
+    each word is expanded to similar vocabulary terms, reported in
+    `expansions`, before the full-text search runs.
+
+    editions=quran-uthmani,en.sahih,en.pickthall searches exactly those
+    editions and groups hits by ayah: each result has a `matches` list with
+    one highlighted text and snippet per edition the ayah matched in.
+    """
     def detect_language(query: str) -> str:
         """Detect if query is Arabic or English based on character range."""
         arabic_chars = sum(1 for c in query if '\u0600' <= c <= '\u06ff')
         return 'ar' if arabic_chars > len(query) * 0.3 else 'en'
 
+    if sort not in SORT_OPTIONS:
+        raise HTTPException(status_code=400, detail="Sort must be 'relevance' or 'mushaf'")
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail="Mode must be 'text', 'fuzzy', 'root' or 'stem'")
+
     # Auto-detect language if not specified
     if language is None:
         language = detect_language(q)
@@ -384,268 +779,116 @@ def search_quran(
     # Normalize limit
     limit = min(limit, 200)
 
-    # Normalize Arabic query (remove diacritics)
-    normalized_query = remove_arabic_diacritics(q) if language == 'ar' else q
-
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-
-        results = []
-        total_count = 0
-
-        # Get edition IDs for fixed editions
-        cursor.execute("SELECT id FROM editions WHERE identifier = ?", ('quran-uthmani',))
-        uthmani_row = cursor.fetchone()
-        uthmani_id = uthmani_row[0] if uthmani_row else None
-
-        cursor.execute("SELECT id FROM editions WHERE identifier = ?", ('en.sahih',))
-        saheeh_row = cursor.fetchone()
-        saheeh_id = saheeh_row[0] if saheeh_row else None
-
-        # Build the search query based on language
-        if language == 'ar':
-            # Arabic search from Uthmani only
-            where_clause = "WHERE fts_arabic MATCH ? AND e.identifier = 'quran-uthmani'"
-            params = [normalized_query]
-
-            if surah_id:
-                where_clause += " AND f.surah_id = ?"
-                params.append(surah_id)
-
-            # Get total count
-            count_sql = f"SELECT COUNT(*) FROM fts_arabic f JOIN editions e ON f.edition_id = e.id {where_clause}"
-            cursor.execute(count_sql, params)
-            total_count = cursor.fetchone()[0]
-
-            # Get results with pagination
-            sql = f"""
-                SELECT
-                    f.ayah_id,
-                    f.ayah_number,
-                    f.surah_id,
-                    f.number_in_surah,
-                    f.text,
-                    f.edition_id,
-                    e.identifier as edition_identifier,
-                    e.language,
-                    s.name as surah_name,
-                    s.english_name as surah_english_name,
-                    s.english_name_translation
-                FROM fts_arabic f
-                JOIN editions e ON f.edition_id = e.id
-                JOIN surahs s ON f.surah_id = s.id
-                {where_clause}
-                ORDER BY f.ayah_number
-                LIMIT ? OFFSET ?
-            """
-            cursor.execute(sql, params + [limit, offset])
-            rows = cursor.fetchall()
-
-            for row in rows:
-                highlighted = highlight_match(row["text"], normalized_query, language='ar')
-                results.append({
-                    "ayah_number": row["ayah_number"],
-                    "surah_id": row["surah_id"],
-                    "number_in_surah": row["number_in_surah"],
-                    "surah_name": get_row_value(row, "surah_name"),
-                    "surah_english_name": get_row_value(row, "surah_english_name"),
-                    "surah_english_name_translation": get_row_value(row, "surah_english_name_translation"),
-                    "text": row["text"],
-                    "highlighted_text": highlighted,
-                    "edition": row["edition_identifier"],
-                    "language": row["language"]
-                })
-
-        elif language == 'en':
-            # English search from Saheeh International only
-            where_clause = "WHERE fts_english MATCH ? AND e.identifier = 'en.sahih'"
-            params = [normalized_query]
-
-            if surah_id:
-                where_clause += " AND f.surah_id = ?"
-                params.append(surah_id)
-
-            # Get total count
-            count_sql = f"SELECT COUNT(*) FROM fts_english f JOIN editions e ON f.edition_id = e.id {where_clause}"
-            cursor.execute(count_sql, params)
-            total_count = cursor.fetchone()[0]
-
-            # Get results with pagination
-            sql = f"""
-                SELECT
-                    f.ayah_id,
-                    f.ayah_number,
-                    f.surah_id,
-                    f.number_in_surah,
-                    f.text,
-                    f.edition_id,
-                    e.identifier as edition_identifier,
-                    e.language,
-                    e.name as edition_name,
-                    s.name as surah_name,
-                    s.english_name as surah_english_name,
-                    s.english_name_translation
-                FROM fts_english f
-                JOIN editions e ON f.edition_id = e.id
-                JOIN surahs s ON f.surah_id = s.id
-                {where_clause}
-                ORDER BY f.ayah_number
-                LIMIT ? OFFSET ?
-            """
-            cursor.execute(sql, params + [limit, offset])
-            rows = cursor.fetchall()
-
-            for row in rows:
-                highlighted = highlight_match(row["text"], normalized_query, language='en')
-                results.append({
-                    "ayah_number": row["ayah_number"],
-                    "surah_id": row["surah_id"],
-                    "number_in_surah": row["number_in_surah"],
-                    "surah_name": get_row_value(row, "surah_name"),
-                    "surah_english_name": get_row_value(row, "surah_english_name"),
-                    "surah_english_name_translation": get_row_value(row, "surah_english_name_translation"),
-                    "text": row["text"],
-                    "highlighted_text": highlighted,
-                    "edition": row["edition_identifier"],
-                    "edition_name": get_row_value(row, "edition_name"),
-                    "language": row["language"]
-                })
-
-        else:  # language == 'all' - search both Uthmani and Saheeh
-            # Arabic results from Uthmani
-            arabic_where = "WHERE fts_arabic MATCH ? AND e.identifier = 'quran-uthmani'"
-            arabic_params = [normalized_query]
-
-            if surah_id:
-                arabic_where += " AND f.surah_id = ?"
-                arabic_params.append(surah_id)
-
-            arabic_sql = f"""
-                SELECT
-                    f.ayah_id,
-                    f.ayah_number,
-                    f.surah_id,
-                    f.number_in_surah,
-                    f.text,
-                    f.edition_id,
-                    e.identifier as edition_identifier,
-                    e.language,
-                    s.name as surah_name,
-                    s.english_name as surah_english_name,
-                    s.english_name_translation
-                FROM fts_arabic f
-                JOIN editions e ON f.edition_id = e.id
-                JOIN surahs s ON f.surah_id = s.id
-                {arabic_where}
-                ORDER BY f.ayah_number
-                LIMIT ?
-            """
-            cursor.execute(arabic_sql, arabic_params + [limit])
-            arabic_rows = cursor.fetchall()
-
-            for row in arabic_rows:
-                highlighted = highlight_match(row["text"], normalized_query, language='ar')
-                results.append({
-                    "ayah_number": row["ayah_number"],
-                    "surah_id": row["surah_id"],
-                    "number_in_surah": row["number_in_surah"],
-                    "surah_name": get_row_value(row, "surah_name"),
-                    "surah_english_name": get_row_value(row, "surah_english_name"),
-                    "surah_english_name_translation": get_row_value(row, "surah_english_name_translation"),
-                    "text": row["text"],
-                    "highlighted_text": highlighted,
-                    "edition": row["edition_identifier"],
-                    "language": row["language"]
-                })
-
-            # English results from Saheeh
-            remaining = limit - len(results)
-            if remaining > 0:
-                english_where = "WHERE fts_english MATCH ? AND e.identifier = 'en.sahih'"
-                english_params = [normalized_query]
-
-                if surah_id:
-                    english_where += " AND f.surah_id = ?"
-                    english_params.append(surah_id)
-
-                english_sql = f"""
-                    SELECT
-                        f.ayah_id,
-                        f.ayah_number,
-                        f.surah_id,
-                        f.number_in_surah,
-                        f.text,
-                        f.edition_id,
-                        e.identifier as edition_identifier,
-                        e.language,
-                        e.name as edition_name,
-                        s.name as surah_name,
-                        s.english_name as surah_english_name,
-                        s.english_name_translation
-                    FROM fts_english f
-                    JOIN editions e ON f.edition_id = e.id
-                    JOIN surahs s ON f.surah_id = s.id
-                    {english_where}
-                    ORDER BY f.ayah_number
-                    LIMIT ?
-                """
-                cursor.execute(english_sql, english_params + [remaining])
-                english_rows = cursor.fetchall()
-
-                for row in english_rows:
-                    highlighted = highlight_match(row["text"], normalized_query, language='en')
-                    results.append({
-                        "ayah_number": row["ayah_number"],
-                        "surah_id": row["surah_id"],
-                        "number_in_surah": row["number_in_surah"],
-                        "surah_name": get_row_value(row, "surah_name"),
-                        "surah_english_name": get_row_value(row, "surah_english_name"),
-                        "surah_english_name_translation": get_row_value(row, "surah_english_name_translation"),
-                        "text": row["text"],
-                        "highlighted_text": highlighted,
-                        "edition": row["edition_identifier"],
-                        "edition_name": get_row_value(row, "edition_name"),
-                        "language": row["language"]
-                    })
-
-            total_count = len(results)
-
-        return {
-            "query": q,
-            "language": language,
-            "total_count": total_count,
-            "limit": limit,
-            "offset": offset,
-            "results": results
-        }
-
-    finally:
-        conn.close()
-
+    # Fold Arabic queries the same way fts_arabic.text_normalized was built
+    normalized_query = normalize_arabic(q) if language == 'ar' else q
+
+    # Morphological modes only exist for Arabic and are always in mushaf order
+    if mode in MORPHOLOGY_MODES:
+        language = 'ar'
+        sort = "mushaf"
+        normalized_query = normalize_arabic(q)
+
+    # Single-stream cursors are ayah numbers; the merged stream's are "<language>:<ayah>"
+    if after is not None and (language != 'all' or editions is not None):
+        if not after.isdigit() or int(after) < 1:
+            raise HTTPException(status_code=400, detail="after must be an ayah number")
+        after = int(after)
+
+    identifiers = ()
+    if editions is not None:
+        identifiers = tuple(dict.fromkeys(e.strip() for e in editions.split(",") if e.strip()))
+        if not identifiers:
+            raise HTTPException(status_code=400, detail="At least one edition is required")
+        if mode in MORPHOLOGY_MODES:
+            raise HTTPException(status_code=400, detail="editions cannot be combined with root or stem mode")
+        corpus = get_corpus()
+        for identifier in identifiers:
+            resolve_edition(identifier, corpus)
+            try:
+                searchable_edition(corpus, identifier)
+            except SearchQueryError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+    # Editions and the merged stream fold Arabic per edition/language themselves
+    if identifiers:
+        page_language, page_query = "editions", q
+    elif language in ('ar', 'en'):
+        page_language, page_query = language, normalized_query
+    else:  # language == 'all' - Uthmani and Saheeh merged into one ranked stream
+        page_language, page_query = "all", q
 
-def get_row_value(row, key, default=""):
-    """Safely get a value from a sqlite3.Row object with a default."""
     try:
-        value = row[key]
-        return value if value is not None else default
-    except (KeyError, IndexError):
-        return default
+        body, meta = search_page(page_language, page_query, surah_id, sort, limit, offset, after, mode, identifiers)
+    except SearchQueryError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search query: {e}")
+    except SearchIndexMissing as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    envelope = {
+        "query": q,
+        "language": language,
+        "sort": sort,
+        "mode": mode,
+        "total_count": meta["total_count"],
+        "limit": limit,
+        "offset": offset,
+        "next_after": meta["next_after"],
+    }
+    if identifiers:
+        envelope["editions"] = list(identifiers)
+    if mode == "fuzzy":
+        envelope["expansions"] = meta.get("expansions", {})
+    envelope = encode_json(envelope)
+    # Splice the cached, already-serialized result array into the envelope
+    return Response(
+        content=envelope[:-1] + b',"results":' + body + b"}",
+        media_type="application/json",
+    )
 
 
-def highlight_match(text: str, query: str, language: str = 'en') -> str:
+@app.get("/api/quran/semantic-search")
+async def semantic_search(
+    q: str = Query(..., description="Natural-language query", min_length=1, max_length=500),
+    language: Optional[str] = Query(None, description="Filter by language: ar or en (default: both)"),
+    surah_id: Optional[int] = Query(None, description="Filter to specific surah"),
+    limit: int = Query(20, description="Max results (default: 20, max: 100)", ge=1, le=100)
+):
     """
-    Highlight matching terms in the text.
+    Semantic search: ayahs whose embeddings are closest to the query's.
 
-    For now, returns the original text.
-    A more sophisticated implementation would use FTS5's highlight function
-    or implement custom highlighting in Python.
+    Query embeddings are cached, and concurrent queries are encoded together
+    in one model call off the event loop. Results carry a cosine `similarity`.
     """
-    # TODO: Implement proper highlighting using FTS5 snippet/bm25highlight functions
-    # or regex-based matching for search terms
-    return text
+    index = semantic_index
+    if index is None:
+        raise HTTPException(status_code=503, detail="Semantic index not available (no ayah embeddings)")
+    if language is not None and language not in ("ar", "en"):
+        raise HTTPException(status_code=400, detail="Language must be 'ar' or 'en'")
 
+    try:
+        embedding = await query_encoder.encode(q)
+    except Exception as e:
+        print(f"⚠ Query encoding failed: {e}")
+        raise HTTPException(status_code=503, detail="Embedding model not available")
+    problem = embedding_mismatch(index, embedding.shape[-1])
+    if problem:
+        raise HTTPException(status_code=503, detail=problem)
 
+    def run():
+        conn = get_db_connection()
+        try:
+            return index.search(conn, embedding, language, surah_id, limit)
+        finally:
+            conn.close()
+
+    results = await run_in_threadpool(run)
+    return {
+        "query": q,
+        "language": language or "all",
+        "surah_id": surah_id,
+        "count": len(results),
+        "results": results,
+    }
 
 
 # =============================================================================
@@ -668,7 +911,7 @@ async def register(data: RegisterRequest):
     """Register a new user using Supabase Auth."""
     try:
         # Create user in Supabase Auth
-        response = supabase.auth.sign_up({
+        response = await run_in_threadpool(supabase.auth.sign_up, {
             "email": data.email,
             "password": data.password,
             "options": {
@@ -700,7 +943,7 @@ async def register(data: RegisterRequest):
 async def login(data: LoginRequest):
     """Login user using Supabase Auth."""
     try:
-        response = supabase.auth.sign_in_with_password({
+        response = await run_in_threadpool(supabase.auth.sign_in_with_password, {
             "email": data.email,
             "password": data.password
         })
@@ -709,7 +952,7 @@ async def login(data: LoginRequest):
             raise HTTPException(status_code=401, detail="Invalid email or password")
 
         # Get user profile for name
-        profile_response = supabase.table("profiles").select("name").eq("id", response.user.id).single().execute()
+        profile_response = await db.table("profiles").select("name").eq("id", response.user.id).single().execute()
 
         return {
             "user": {
@@ -755,7 +998,8 @@ async def forgot_password(data: ForgotPasswordRequest):
     try:
         # Use Supabase's built-in password reset
         # The redirect URL is where users land after clicking the email link
-        supabase.auth.reset_password_for_email(
+        await run_in_threadpool(
+            supabase.auth.reset_password_for_email,
             data.email,
             options={
                 "redirect_to": "https://quran.hyperflash.uk/reset-password"
@@ -781,10 +1025,10 @@ async def reset_password(data: ResetPasswordRequest):
         auth_client = create_client(SUPABASE_URL, SUPABASE_KEY)
         
         # Set the session with the access token from the recovery email
-        auth_client.auth.set_session(data.access_token, data.access_token)
+        await run_in_threadpool(auth_client.auth.set_session, data.access_token, data.access_token)
         
         # Update the user's password
-        response = auth_client.auth.update_user({
+        response = await run_in_threadpool(auth_client.auth.update_user, {
             "password": data.new_password
         })
         
@@ -823,7 +1067,7 @@ async def change_password(data: ChangePasswordRequest, current_user: dict = Depe
         if data.current_password:
             try:
                 # Try to sign in with the current password to verify it
-                verify_response = supabase.auth.sign_in_with_password({
+                verify_response = await run_in_threadpool(supabase.auth.sign_in_with_password, {
                     "email": current_user["email"],
                     "password": data.current_password
                 })
@@ -832,13 +1076,14 @@ async def change_password(data: ChangePasswordRequest, current_user: dict = Depe
 
         # Update the user's password using their access token
         auth_client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        auth_client.auth.set_session(access_token, access_token)
+        await run_in_threadpool(auth_client.auth.set_session, access_token, access_token)
 
-        update_response = auth_client.auth.update_user({
+        update_response = await run_in_threadpool(auth_client.auth.update_user, {
             "password": data.new_password
         })
 
         if update_response.user:
+            profile_cache.invalidate(current_user["id"])
             return {
                 "success": True,
                 "message": "Password updated successfully. You can now sign in with your email and password."
@@ -883,11 +1128,11 @@ async def oauth_callback(data: OAuthCallbackRequest):
 
         # Set the session using the OAuth tokens
         print("Setting session with OAuth tokens...")
-        auth_client.auth.set_session(data.access_token, data.refresh_token)
+        await run_in_threadpool(auth_client.auth.set_session, data.access_token, data.refresh_token)
 
         # Get the user to verify the session is valid
         print("Getting user from Supabase...")
-        user_response = auth_client.auth.get_user()
+        user_response = await run_in_threadpool(auth_client.auth.get_user)
         print(f"User response: {user_response}")
 
         if not user_response or not user_response.user:
@@ -899,13 +1144,14 @@ async def oauth_callback(data: OAuthCallbackRequest):
         print(f"OAuth user: id={oauth_user_id}, email={oauth_email}")
 
         # Use admin client for profile operations (bypasses RLS)
-        profile_client = supabase_admin if supabase_admin else supabase
+        profile_client = db
 
-        # Check if there's an existing profile with this email (from email/password registration)
-        existing_profile = profile_client.table("profiles").select("*").eq("email", oauth_email).execute()
-
-        # Get or create profile for the OAuth user
-        oauth_profile = profile_client.table("profiles").select("*").eq("id", oauth_user_id).execute()
+        # Check if there's an existing profile with this email (from email/password registration),
+        # and get the profile of the OAuth user
+        existing_profile, oauth_profile = await asyncio.gather(
+            profile_client.table("profiles").select("*").eq("email", oauth_email).execute(),
+            profile_client.table("profiles").select("*").eq("id", oauth_user_id).execute(),
+        )
 
         user_name = ""
         user_email = oauth_email
@@ -925,7 +1171,7 @@ async def oauth_callback(data: OAuthCallbackRequest):
                     await _migrate_account_data(existing_user_id, oauth_user_id, profile_client)
 
                     # Update OAuth profile with existing data (preserve name, etc.)
-                    profile_client.table("profiles").update({
+                    await profile_client.table("profiles").update({
                         "name": existing.get("name", ""),
                         "updated_at": datetime.now().isoformat()
                     }).eq("id", oauth_user_id).execute()
@@ -944,7 +1190,7 @@ async def oauth_callback(data: OAuthCallbackRequest):
                         "name": existing.get("name", ""),
                         "created_at": datetime.now().isoformat()
                     }
-                    profile_client.table("profiles").insert(new_profile).execute()
+                    await profile_client.table("profiles").insert(new_profile).execute()
 
                     # Migrate data from old account to new OAuth account
                     await _migrate_account_data(existing_user_id, oauth_user_id, profile_client)
@@ -972,9 +1218,12 @@ async def oauth_callback(data: OAuthCallbackRequest):
                 "created_at": datetime.now().isoformat()
             }
             print(f"Creating new profile: {new_profile}")
-            profile_client.table("profiles").insert(new_profile).execute()
+            await profile_client.table("profiles").insert(new_profile).execute()
             user_name = new_profile["name"]
 
+        # Merges rewrite profiles and move data between user ids
+        profile_cache.invalidate(oauth_user_id, existing_profile.data[0]["id"] if existing_profile.data else None)
+
         print(f"OAuth callback successful: user_id={oauth_user_id}, email={user_email}, name={user_name}")
 
         return {
@@ -997,7 +1246,11 @@ async def oauth_callback(data: OAuthCallbackRequest):
         raise HTTPException(status_code=401, detail="OAuth authentication failed")
 
 
-async def _migrate_account_data(from_user_id: str, to_user_id: str, client: Client = None):
+# Concurrent row inserts while migrating a merged account's data
+MIGRATION_CONCURRENCY = 10
+
+
+async def _migrate_account_data(from_user_id: str, to_user_id: str, client: AsyncPostgrestClient = None):
     """
     Migrate all user data from one account to another during account merge.
 
@@ -1011,117 +1264,78 @@ async def _migrate_account_data(from_user_id: str, to_user_id: str, client: Clie
     - quran_play_sessions
     """
     # Use admin client if provided, otherwise use default client
-    migration_client = client if client else supabase
-
-    # Migrate bookmarks
-    existing_bookmarks = migration_client.table("bookmarks").select("*").eq("user_id", from_user_id).execute()
-    if existing_bookmarks.data:
-        for bm in existing_bookmarks.data:
-            try:
-                migration_client.table("bookmarks").insert({
-                    "user_id": to_user_id,
-                    "ayah_id": bm["ayah_id"],
-                    "surah_id": bm["surah_id"],
-                    "ayah_number_in_surah": bm["ayah_number_in_surah"],
-                    "created_at": bm["created_at"]
-                }).execute()
-            except Exception:
-                pass  # Duplicate bookmarks are ok
-
-    # Migrate reading_progress
-    existing_progress = migration_client.table("reading_progress").select("*").eq("user_id", from_user_id).execute()
-    if existing_progress.data:
-        for p in existing_progress.data:
-            try:
-                migration_client.table("reading_progress").insert({
-                    "user_id": to_user_id,
-                    "surah_id": p["surah_id"],
-                    "last_read_ayah_id": p["last_read_ayah_id"],
-                    "last_read_ayah_number": p["last_read_ayah_number"],
-                    "total_ayahs_read": p["total_ayahs_read"],
-                    "last_read_date": p["last_read_date"],
-                    "created_at": p.get("created_at"),
-                    "updated_at": p["updated_at"]
-                }).execute()
-            except Exception:
-                pass
-
-    # Migrate daily_readings
-    existing_daily = migration_client.table("daily_readings").select("*").eq("user_id", from_user_id).execute()
-    if existing_daily.data:
-        for d in existing_daily.data:
-            try:
-                migration_client.table("daily_readings").insert({
-                    "user_id": to_user_id,
-                    "read_date": d["read_date"],
-                    "ayahs_read": d["ayahs_read"]
-                }).execute()
-            except Exception:
-                pass
-
-    # Migrate completed_ayahs
-    existing_completed = migration_client.table("completed_ayahs").select("*").eq("user_id", from_user_id).execute()
-    if existing_completed.data:
-        for c in existing_completed.data:
-            try:
-                migration_client.table("completed_ayahs").insert({
-                    "user_id": to_user_id,
-                    "ayah_id": c["ayah_id"],
-                    "surah_id": c["surah_id"],
-                    "ayah_number": c["ayah_number"],
-                    "is_sequential": c.get("is_sequential", False),
-                    "completed_at": c["completed_at"]
-                }).execute()
-            except Exception:
-                pass
-
-    # Migrate play_sessions
-    existing_sessions = migration_client.table("play_sessions").select("*").eq("user_id", from_user_id).execute()
-    if existing_sessions.data:
-        for s in existing_sessions.data:
-            try:
-                migration_client.table("play_sessions").insert({
-                    "user_id": to_user_id,
-                    "ayah_id": s["ayah_id"],
-                    "surah_id": s["surah_id"],
-                    "ayah_number": s["ayah_number"],
-                    "audio_edition": s.get("audio_edition", "ar.alafasy"),
-                    "created_at": s["created_at"],
-                    "completed_at": s.get("completed_at"),
-                    "duration_seconds": s.get("duration_seconds")
-                }).execute()
-            except Exception:
-                pass
-
-    # Migrate replay_stats
-    existing_replay = migration_client.table("replay_stats").select("*").eq("user_id", from_user_id).execute()
-    if existing_replay.data:
-        for r in existing_replay.data:
-            try:
-                migration_client.table("replay_stats").insert({
-                    "user_id": to_user_id,
-                    "ayah_id": r["ayah_id"],
-                    "play_count": r["play_count"],
-                    "total_duration_seconds": r["total_duration_seconds"],
-                    "last_played_at": r["last_played_at"]
-                }).execute()
-            except Exception:
-                pass
+    migration_client = client if client else db
+    # Inserts in flight at once, so a large account cannot exhaust the connection pool
+    limit = asyncio.Semaphore(MIGRATION_CONCURRENCY)
 
-    # Migrate quran_play_sessions
-    existing_quran_sessions = migration_client.table("quran_play_sessions").select("*").eq("user_id", from_user_id).execute()
-    if existing_quran_sessions.data:
-        for qs in existing_quran_sessions.data:
+    async def insert(table: str, build, row: dict):
+        async with limit:
             try:
-                migration_client.table("quran_play_sessions").insert({
-                    "user_id": to_user_id,
-                    "start_surah_id": qs["start_surah_id"],
-                    "start_ayah_number": qs["start_ayah_number"],
-                    "created_at": qs["created_at"],
-                    "ended_at": qs.get("ended_at")
-                }).execute()
+                await migration_client.table(table).insert(build(row)).execute()
             except Exception:
-                pass
+                pass  # Duplicates are ok
+
+    async def migrate(table: str, build):
+        existing = await migration_client.table(table).select("*").eq("user_id", from_user_id).execute()
+        await asyncio.gather(*(insert(table, build, row) for row in existing.data or []))
+
+    # The tables are independent, so they are copied concurrently
+    await asyncio.gather(
+        migrate("bookmarks", lambda bm: {
+            "user_id": to_user_id,
+            "ayah_id": bm["ayah_id"],
+            "surah_id": bm["surah_id"],
+            "ayah_number_in_surah": bm["ayah_number_in_surah"],
+            "created_at": bm["created_at"]
+        }),
+        migrate("reading_progress", lambda p: {
+            "user_id": to_user_id,
+            "surah_id": p["surah_id"],
+            "last_read_ayah_id": p["last_read_ayah_id"],
+            "last_read_ayah_number": p["last_read_ayah_number"],
+            "total_ayahs_read": p["total_ayahs_read"],
+            "last_read_date": p["last_read_date"],
+            "created_at": p.get("created_at"),
+            "updated_at": p["updated_at"]
+        }),
+        migrate("daily_readings", lambda d: {
+            "user_id": to_user_id,
+            "read_date": d["read_date"],
+            "ayahs_read": d["ayahs_read"]
+        }),
+        migrate("completed_ayahs", lambda c: {
+            "user_id": to_user_id,
+            "ayah_id": c["ayah_id"],
+            "surah_id": c["surah_id"],
+            "ayah_number": c["ayah_number"],
+            "is_sequential": c.get("is_sequential", False),
+            "completed_at": c["completed_at"]
+        }),
+        migrate("play_sessions", lambda s: {
+            "user_id": to_user_id,
+            "ayah_id": s["ayah_id"],
+            "surah_id": s["surah_id"],
+            "ayah_number": s["ayah_number"],
+            "audio_edition": s.get("audio_edition", "ar.alafasy"),
+            "created_at": s["created_at"],
+            "completed_at": s.get("completed_at"),
+            "duration_seconds": s.get("duration_seconds")
+        }),
+        migrate("replay_stats", lambda r: {
+            "user_id": to_user_id,
+            "ayah_id": r["ayah_id"],
+            "play_count": r["play_count"],
+            "total_duration_seconds": r["total_duration_seconds"],
+            "last_played_at": r["last_played_at"]
+        }),
+        migrate("quran_play_sessions", lambda qs: {
+            "user_id": to_user_id,
+            "start_surah_id": qs["start_surah_id"],
+            "start_ayah_number": qs["start_ayah_number"],
+            "created_at": qs["created_at"],
+            "ended_at": qs.get("ended_at")
+        }),
+    )
 
 
 # =============================================================================
@@ -1138,8 +1352,8 @@ class BookmarkRequest(BaseModel):
 async def get_bookmarks(current_user: dict = Depends(get_current_user)):
     """Get all bookmarks for the current user. Optimized with batch queries."""
     # Get bookmarks from Supabase (using admin client to bypass RLS)
-    client = supabase_admin or supabase
-    response = client.table("bookmarks").select("*").eq("user_id", current_user["id"]).order("created_at", desc=True).execute()
+    client = db
+    response = await client.table("bookmarks").select("*").eq("user_id", current_user["id"]).order("created_at", desc=True).execute()
 
     if not response.data:
         return []
@@ -1151,14 +1365,9 @@ async def get_bookmarks(current_user: dict = Depends(get_current_user)):
     ayah_ids = list(set(bm["ayah_id"] for bm in bookmarks))
 
     # Enrich with Quran data from SQLite using BATCH queries (much faster!)
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-
+    def enrich(cursor):
         # Get English translation edition ID once
-        cursor.execute("SELECT id FROM editions WHERE identifier = ?", ("en.sahih",))
-        en_edition_row = cursor.fetchone()
-        en_edition_id = en_edition_row[0] if en_edition_row else None
+        en_edition_id = find_edition_id("en.sahih")
 
         # BATCH QUERY 1: Get all surah info in a single query
         surahs_data = {}
@@ -1226,8 +1435,8 @@ async def get_bookmarks(current_user: dict = Depends(get_current_user)):
             })
 
         return enriched_bookmarks
-    finally:
-        conn.close()
+
+    return await run_in_threadpool(quran_query, enrich)
 
 
 @app.post("/api/bookmarks")
@@ -1236,9 +1445,9 @@ async def create_bookmark(
     current_user: dict = Depends(get_current_user)
 ):
     """Create a new bookmark in Supabase."""
-    client = supabase_admin or supabase
+    client = db
     try:
-        response = client.table("bookmarks").insert({
+        response = await client.table("bookmarks").insert({
             "user_id": current_user["id"],
             "ayah_id": data.ayah_id,
             "surah_id": data.surah_id,
@@ -1254,16 +1463,16 @@ async def create_bookmark(
 @app.delete("/api/bookmarks/{bookmark_id}")
 async def delete_bookmark(bookmark_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a bookmark from Supabase."""
-    client = supabase_admin or supabase
-    client.table("bookmarks").delete().eq("id", bookmark_id).eq("user_id", current_user["id"]).execute()
+    client = db
+    await client.table("bookmarks").delete().eq("id", bookmark_id).eq("user_id", current_user["id"]).execute()
     return {"success": True}
 
 
 @app.get("/api/bookmarks/exists/{ayah_id}")
 async def check_bookmark(ayah_id: int, current_user: dict = Depends(get_current_user)):
     """Check if an ayah is bookmarked."""
-    client = supabase_admin or supabase
-    response = client.table("bookmarks").select("id").eq("user_id", current_user["id"]).eq("ayah_id", ayah_id).execute()
+    client = db
+    response = await client.table("bookmarks").select("id").eq("user_id", current_user["id"]).eq("ayah_id", ayah_id).execute()
 
     bookmarked = len(response.data) > 0
     bookmark_id = response.data[0]["id"] if bookmarked else None
@@ -1274,8 +1483,8 @@ async def check_bookmark(ayah_id: int, current_user: dict = Depends(get_current_
 @app.get("/api/bookmarks/surah/{surah_id}")
 async def get_bookmarks_for_surah(surah_id: int, current_user: dict = Depends(get_current_user)):
     """Get all bookmarks for a specific surah (batch endpoint). Returns map of ayah_id -> bookmark_id."""
-    client = supabase_admin or supabase
-    response = client.table("bookmarks").select("ayah_id", "id").eq("user_id", current_user["id"]).eq("surah_id", surah_id).execute()
+    client = db
+    response = await client.table("bookmarks").select("ayah_id", "id").eq("user_id", current_user["id"]).eq("surah_id", surah_id).execute()
 
     return {bm["ayah_id"]: bm["id"] for bm in response.data}
 
@@ -1296,15 +1505,15 @@ async def update_progress(
     current_user: dict = Depends(get_current_user)
 ):
     """Update reading progress for a surah in Supabase."""
-    client = supabase_admin or supabase
+    client = db
     today = datetime.now().strftime("%Y-%m-%d")
 
     # Check if progress exists
-    existing = client.table("reading_progress").select("*").eq("user_id", current_user["id"]).eq("surah_id", data.surah_id).execute()
+    existing = await client.table("reading_progress").select("*").eq("user_id", current_user["id"]).eq("surah_id", data.surah_id).execute()
 
     if existing.data:
         # Update existing progress
-        client.table("reading_progress").update({
+        update = client.table("reading_progress").update({
             "last_read_ayah_id": data.ayah_id,
             "last_read_ayah_number": data.ayah_number,
             "last_read_date": today,
@@ -1313,40 +1522,43 @@ async def update_progress(
 
         # Track daily reading if different ayah
         if existing.data[0]["last_read_ayah_id"] != data.ayah_id:
-            daily = client.table("daily_readings").select("*").eq("user_id", current_user["id"]).eq("read_date", today).execute()
-            if daily.data:
-                client.table("daily_readings").update({"ayahs_read": daily.data[0]["ayahs_read"] + 1}).eq("user_id", current_user["id"]).eq("read_date", today).execute()
-            else:
-                client.table("daily_readings").insert({"user_id": current_user["id"], "read_date": today, "ayahs_read": 1}).execute()
-    else:
-        # Create new progress record
-        client.table("reading_progress").insert({
-            "user_id": current_user["id"],
-            "surah_id": data.surah_id,
-            "last_read_ayah_id": data.ayah_id,
-            "last_read_ayah_number": data.ayah_number,
-            "total_ayahs_read": 1,
-            "last_read_date": today
-        }).execute()
-
-        # Track daily reading
-        daily = client.table("daily_readings").select("*").eq("user_id", current_user["id"]).eq("read_date", today).execute()
-        if daily.data:
-            client.table("daily_readings").update({"ayahs_read": daily.data[0]["ayahs_read"] + 1}).eq("user_id", current_user["id"]).eq("read_date", today).execute()
+            await asyncio.gather(update, _track_daily_reading(client, current_user["id"], today))
         else:
-            client.table("daily_readings").insert({"user_id": current_user["id"], "read_date": today, "ayahs_read": 1}).execute()
+            await update
+    else:
+        # Create new progress record and track daily reading
+        await asyncio.gather(
+            client.table("reading_progress").insert({
+                "user_id": current_user["id"],
+                "surah_id": data.surah_id,
+                "last_read_ayah_id": data.ayah_id,
+                "last_read_ayah_number": data.ayah_number,
+                "total_ayahs_read": 1,
+                "last_read_date": today
+            }).execute(),
+            _track_daily_reading(client, current_user["id"], today),
+        )
 
     return {"success": True}
 
 
+async def _track_daily_reading(client: AsyncPostgrestClient, user_id: str, today: str):
+    """Count one more ayah read today."""
+    daily = await client.table("daily_readings").select("*").eq("user_id", user_id).eq("read_date", today).execute()
+    if daily.data:
+        await client.table("daily_readings").update({"ayahs_read": daily.data[0]["ayahs_read"] + 1}).eq("user_id", user_id).eq("read_date", today).execute()
+    else:
+        await client.table("daily_readings").insert({"user_id": user_id, "read_date": today, "ayahs_read": 1}).execute()
+
+
 @app.get("/api/progress")
 async def get_progress(current_user: dict = Depends(get_current_user)):
     """Get all reading progress for the current user."""
     # Use admin client to bypass RLS since we've already verified the user
-    client = supabase_admin or supabase
+    client = db
 
     # Get progress from Supabase
-    response = client.table("reading_progress").select("*").eq("user_id", current_user["id"]).order("updated_at", desc=True).execute()
+    response = await client.table("reading_progress").select("*").eq("user_id", current_user["id"]).order("updated_at", desc=True).execute()
 
     if not response.data:
         return []
@@ -1354,11 +1566,9 @@ async def get_progress(current_user: dict = Depends(get_current_user)):
     progress = response.data
 
     # Enrich with surah data from SQLite
-    conn = get_db_connection()
-    try:
+    def enrich(cursor):
         enriched = []
         for p in progress:
-            cursor = conn.cursor()
             cursor.execute("""
                 SELECT name, english_name, number_of_ayahs
                 FROM surahs
@@ -1379,60 +1589,28 @@ async def get_progress(current_user: dict = Depends(get_current_user)):
             })
 
         return enriched
-    finally:
-        conn.close()
+
+    return await run_in_threadpool(quran_query, enrich)
 
 
 @app.get("/api/progress/stats")
 async def get_progress_stats(current_user: dict = Depends(get_current_user)):
     """Get reading statistics for the current user from Supabase."""
-    client = supabase_admin or supabase
-
-    # Total ayahs read
-    daily_response = client.table("daily_readings").select("ayahs_read").eq("user_id", current_user["id"]).execute()
-    total_ayahs = sum(d["ayahs_read"] for d in daily_response.data) if daily_response.data else 0
-
-    # Total surahs with progress
-    progress_response = client.table("reading_progress").select("surah_id").eq("user_id", current_user["id"]).execute()
-    total_surahs = len(set(p["surah_id"] for p in progress_response.data)) if progress_response.data else 0
-
-    # Total bookmarks
-    bookmarks_response = client.table("bookmarks").select("id").eq("user_id", current_user["id"]).execute()
-    total_bookmarks = len(bookmarks_response.data) if bookmarks_response.data else 0
-
-    # Calculate reading streak
-    daily_dates_response = client.table("daily_readings").select("read_date").eq("user_id", current_user["id"]).order("read_date", desc=True).limit(365).execute()
-    streak = 0
-
-    if daily_dates_response.data:
-        dates = sorted(list(set(d["read_date"] for d in daily_dates_response.data)), reverse=True)
-        today = datetime.now().strftime("%Y-%m-%d")
-        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-
-        if dates and (dates[0] == today or dates[0] == yesterday):
-            streak = 1
-            expected_date = (datetime.now() - timedelta(days=1 if dates[0] == today else 2)).strftime("%Y-%m-%d")
-
-            for date in dates[1:]:
-                if date == expected_date:
-                    streak += 1
-                    expected_date = (datetime.strptime(expected_date, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-                else:
-                    break
+    stats = await stats_store.collect(current_user["id"], ("reading", "bookmarks", "streak"))
 
     return {
-        "total_ayahs_read": total_ayahs,
-        "total_surahs_read": total_surahs,
-        "total_bookmarks": total_bookmarks,
-        "reading_streak": streak
+        "total_ayahs_read": stats["reading"]["total_ayahs_read"],
+        "total_surahs_read": stats["reading"]["total_surahs_read"],
+        "total_bookmarks": stats["bookmarks"],
+        "reading_streak": stats["streak"]
     }
 
 
 @app.get("/api/progress/last-position")
 async def get_last_position(current_user: dict = Depends(get_current_user)):
     """Get the last reading position for resuming."""
-    client = supabase_admin or supabase
-    response = client.table("reading_progress").select("*").eq("user_id", current_user["id"]).order("updated_at", desc=True).limit(1).execute()
+    client = db
+    response = await client.table("reading_progress").select("*").eq("user_id", current_user["id"]).order("updated_at", desc=True).limit(1).execute()
 
     if not response.data:
         return None
@@ -1440,27 +1618,24 @@ async def get_last_position(current_user: dict = Depends(get_current_user)):
     p = response.data[0]
 
     # Enrich with surah data from SQLite
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
+    def lookup(cursor):
         cursor.execute("""
             SELECT name, english_name, number_of_ayahs
             FROM surahs
             WHERE id = ?
         """, (p["surah_id"],))
-        surah = cursor.fetchone()
+        return cursor.fetchone()
 
-        return {
-            "surah_id": p["surah_id"],
-            "last_read_ayah_id": p["last_read_ayah_id"],
-            "last_read_ayah_number": p["last_read_ayah_number"],
-            "last_read_date": p["last_read_date"],
-            "surah_name": surah["name"] if surah else "",
-            "english_name": surah["english_name"] if surah else "",
-            "number_of_ayahs": surah["number_of_ayahs"] if surah else 0
-        }
-    finally:
-        conn.close()
+    surah = await run_in_threadpool(quran_query, lookup)
+    return {
+        "surah_id": p["surah_id"],
+        "last_read_ayah_id": p["last_read_ayah_id"],
+        "last_read_ayah_number": p["last_read_ayah_number"],
+        "last_read_date": p["last_read_date"],
+        "surah_name": surah["name"] if surah else "",
+        "english_name": surah["english_name"] if surah else "",
+        "number_of_ayahs": surah["number_of_ayahs"] if surah else 0
+    }
 
 
 # =============================================================================
@@ -1480,8 +1655,8 @@ async def mark_ayah_completed(
 ):
     """Mark an ayah as completed in Supabase."""
     try:
-        client = supabase_admin or supabase
-        client.table("completed_ayahs").insert({
+        client = db
+        await client.table("completed_ayahs").insert({
             "user_id": current_user["id"],
             "ayah_id": data.ayah_id,
             "surah_id": data.surah_id,
@@ -1512,7 +1687,7 @@ async def mark_ayahs_batch_completed(
     if not data.ayahs:
         return {"success": True, "count": 0}
 
-    client = supabase_admin or supabase
+    client = db
     
     # Prepare data for bulk insert
     insert_data = []
@@ -1527,7 +1702,7 @@ async def mark_ayahs_batch_completed(
     try:
         # Perform bulk insert/upsert
         # ignore_duplicates=True ensures we don't fail if some are already marked
-        client.table("completed_ayahs").upsert(
+        await client.table("completed_ayahs").upsert(
             insert_data, 
             on_conflict="user_id, ayah_id",
             ignore_duplicates=True
@@ -1546,8 +1721,8 @@ async def get_completed_ayahs_for_surah(
     current_user: dict = Depends(get_current_user)
 ):
     """Get list of completed ayah IDs for a specific surah from Supabase."""
-    client = supabase_admin or supabase
-    response = client.table("completed_ayahs").select("ayah_id", "ayah_number", "completed_at").eq("user_id", current_user["id"]).eq("surah_id", surah_id).order("ayah_number").execute()
+    client = db
+    response = await client.table("completed_ayahs").select("ayah_id", "ayah_number", "completed_at").eq("user_id", current_user["id"]).eq("surah_id", surah_id).order("ayah_number").execute()
     return response.data if response.data else []
 
 
@@ -1558,28 +1733,23 @@ async def get_surah_completion_stats(
 ):
     """Get completion stats for a specific surah."""
     # Get total ayahs in surah from SQLite
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
+    def surah_size(cursor):
         cursor.execute("SELECT number_of_ayahs FROM surahs WHERE id = ?", (surah_id,))
-        surah = cursor.fetchone()
-        if not surah:
-            raise HTTPException(status_code=404, detail="Surah not found")
+        return cursor.fetchone()
 
-        total_ayahs = surah["number_of_ayahs"]
-    finally:
-        conn.close()
+    surah = await run_in_threadpool(quran_query, surah_size)
+    if not surah:
+        raise HTTPException(status_code=404, detail="Surah not found")
+    total_ayahs = surah["number_of_ayahs"]
 
     # Get completed count from Supabase
-    client = supabase_admin or supabase
-    completed_response = client.table("completed_ayahs").select("ayah_id", "ayah_number").eq("user_id", current_user["id"]).eq("surah_id", surah_id).execute()
+    client = db
+    completed_response = await client.table("completed_ayahs").select("ayah_id", "ayah_number").eq("user_id", current_user["id"]).eq("surah_id", surah_id).execute()
     completed_count = len(completed_response.data) if completed_response.data else 0
     completed_numbers = [c["ayah_number"] for c in completed_response.data] if completed_response.data else []
 
     # Get first unread ayah from SQLite
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
+    def first_unread_in_surah(cursor):
         if completed_numbers:
             placeholders = ",".join("?" * len(completed_numbers))
             cursor.execute(f"""
@@ -1587,12 +1757,11 @@ async def get_surah_completion_stats(
                 FROM ayahs
                 WHERE surah_id = ? AND number_in_surah NOT IN ({placeholders})
             """, [surah_id] + completed_numbers)
-            first_unread = cursor.fetchone()["first_unread"]
         else:
             cursor.execute("SELECT MIN(number_in_surah) as first_unread FROM ayahs WHERE surah_id = ?", (surah_id,))
-            first_unread = cursor.fetchone()["first_unread"]
-    finally:
-        conn.close()
+        return cursor.fetchone()["first_unread"]
+
+    first_unread = await run_in_threadpool(quran_query, first_unread_in_surah)
 
     return {
         "total_ayahs": total_ayahs,
@@ -1607,14 +1776,12 @@ async def get_surah_completion_stats(
 async def get_first_unread_ayah(current_user: dict = Depends(get_current_user)):
     """Get the first unread ayah across all surahs (for global resume)."""
     # Get all completed ayahs from Supabase
-    client = supabase_admin or supabase
-    completed_response = client.table("completed_ayahs").select("ayah_id").eq("user_id", current_user["id"]).execute()
+    client = db
+    completed_response = await client.table("completed_ayahs").select("ayah_id").eq("user_id", current_user["id"]).execute()
     completed_ayah_ids = [c["ayah_id"] for c in completed_response.data] if completed_response.data else []
 
     # Get first unread ayah from SQLite
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
+    def first_unread(cursor):
         if completed_ayah_ids:
             placeholders = ",".join("?" * len(completed_ayah_ids))
             cursor.execute(f"""
@@ -1641,49 +1808,21 @@ async def get_first_unread_ayah(current_user: dict = Depends(get_current_user)):
             return None
 
         return dict(result)
-    finally:
-        conn.close()
+
+    return await run_in_threadpool(quran_query, first_unread)
 
 
 @app.get("/api/completed-ayahs/overall-stats")
 async def get_overall_completion_stats(current_user: dict = Depends(get_current_user)):
     """Get overall completion statistics across all surahs from Supabase."""
-    total_quran_ayahs = 6236
-
-    # Get completed ayahs count
-    client = supabase_admin or supabase
-    completed_response = client.table("completed_ayahs").select("ayah_id").eq("user_id", current_user["id"]).execute()
-    completed_count = len(completed_response.data) if completed_response.data else 0
-
-    # Get completed surahs count
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, number_of_ayahs FROM surahs")
-        all_surahs = cursor.fetchall()
-
-        completed_surahs = 0
-        if completed_response.data:
-            # Group completed ayahs by surah
-            surah_completion = {}
-            for c in completed_response.data:
-                surah_id = c["surah_id"]
-                if surah_id not in surah_completion:
-                    surah_completion[surah_id] = 0
-                surah_completion[surah_id] += 1
-
-            # Count fully completed surahs
-            for surah in all_surahs:
-                if surah_completion.get(surah["id"], 0) >= surah["number_of_ayahs"]:
-                    completed_surahs += 1
-    finally:
-        conn.close()
+    stats = await stats_store.collect(current_user["id"], ("completion",), surah_sizes())
+    completed_count = stats["completion"]["ayahs_completed"]
 
     return {
-        "total_ayahs_in_quran": total_quran_ayahs,
+        "total_ayahs_in_quran": TOTAL_QURAN_AYAHS,
         "ayahs_completed": completed_count,
-        "completion_percentage": round((completed_count / total_quran_ayahs) * 100, 1),
-        "surahs_fully_completed": completed_surahs
+        "completion_percentage": round((completed_count / TOTAL_QURAN_AYAHS) * 100, 1),
+        "surahs_fully_completed": stats["completion"]["surahs_completed"]
     }
 
 
@@ -1694,18 +1833,16 @@ async def get_all_surahs_progress(current_user: dict = Depends(get_current_user)
     Optimized to use Counter for faster counting.
     """
     # Get all surahs basic info
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
+    def surah_list(cursor):
         cursor.execute("SELECT id, number_of_ayahs FROM surahs ORDER BY id")
-        all_surahs = cursor.fetchall()
-    finally:
-        conn.close()
+        return cursor.fetchall()
+
+    all_surahs = await run_in_threadpool(quran_query, surah_list)
 
     # Get completed ayahs count per surah - optimized with Counter
     from collections import Counter
-    client = supabase_admin or supabase
-    completed_response = client.table("completed_ayahs").select("surah_id").eq("user_id", current_user["id"]).execute()
+    client = db
+    completed_response = await client.table("completed_ayahs").select("surah_id").eq("user_id", current_user["id"]).execute()
 
     # Use Counter for O(n) counting instead of manual dictionary operations
     surah_counts = Counter()
@@ -1730,8 +1867,8 @@ async def clear_surah_progress(
     current_user: dict = Depends(get_current_user)
 ):
     """Clear all completed ayahs for a specific surah."""
-    client = supabase_admin or supabase
-    response = client.table("completed_ayahs").delete().eq("user_id", current_user["id"]).eq("surah_id", surah_id).execute()
+    client = db
+    response = await client.table("completed_ayahs").delete().eq("user_id", current_user["id"]).eq("surah_id", surah_id).execute()
     return {"success": True, "deleted_count": len(response.data) if response.data else 0}
 
 
@@ -1748,10 +1885,10 @@ async def get_sequential_progress(current_user: dict = Depends(get_current_user)
     Optimized to avoid iterating all 6236 ayahs when possible.
     Uses surah_id + ayah_number for tracking to avoid edition-specific ayah_id issues.
     """
-    client = supabase_admin or supabase
+    client = db
 
     # Get all completed ayahs with their surah_id and ayah_number, sorted by position
-    completed = client.table("completed_ayahs")\
+    completed = await client.table("completed_ayahs")\
         .select("surah_id, ayah_number")\
         .eq("user_id", current_user["id"])\
         .order("surah_id")\
@@ -1773,10 +1910,7 @@ async def get_sequential_progress(current_user: dict = Depends(get_current_user)
 
     # Quick check: if we have very few completions (< 100), iterate through Quran from start
     # If we have many completions (> 1000), iterate backwards from end to find first gap
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-
+    def sequential_progress(cursor):
         if len(completed_positions) < 5000:
             # Forward iteration: Find first gap by checking Quran from the beginning
             # This is faster when user hasn't completed much
@@ -1886,8 +2020,8 @@ async def get_sequential_progress(current_user: dict = Depends(get_current_user)
             "first_incomplete_ayah": first_incomplete_ayah,
             "total_ayahs": 6236
         }
-    finally:
-        conn.close()
+
+    return await run_in_threadpool(quran_query, sequential_progress)
 
 
 @app.post("/api/progress/validate-sequential")
@@ -1896,10 +2030,10 @@ async def validate_sequential_progress(current_user: dict = Depends(get_current_
     Recalculate sequential progress flags in Supabase.
     Uses surah_id + ayah_number for tracking to avoid edition-specific ayah_id issues.
     """
-    client = supabase_admin or supabase
+    client = db
     
     # Get all completed ayahs with their surah_id and ayah_number
-    completed = client.table("completed_ayahs").select("surah_id, ayah_number").eq("user_id", current_user["id"]).execute()
+    completed = await client.table("completed_ayahs").select("surah_id, ayah_number").eq("user_id", current_user["id"]).execute()
     
     if not completed.data:
         return {"success": True, "sequential_count": 0}
@@ -1910,40 +2044,44 @@ async def validate_sequential_progress(current_user: dict = Depends(get_current_
         completed_set.add((c["surah_id"], c["ayah_number"]))
     
     # Get the canonical list of all ayahs in Quran order
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
+    def quran_positions(cursor):
         cursor.execute("""
             SELECT DISTINCT surah_id, number_in_surah
             FROM ayahs
             ORDER BY surah_id, number_in_surah
         """)
-        all_positions = cursor.fetchall()
-        
-        # Find which completed positions are sequential
-        sequential_positions = []
-        
-        for pos in all_positions:
-            surah_id = pos["surah_id"]
-            ayah_num = pos["number_in_surah"]
-            position_key = (surah_id, ayah_num)
-            
-            if position_key in completed_set:
-                sequential_positions.append(position_key)
-            else:
-                # Found first incomplete - stop here
-                break
-        
-        # Reset all sequential flags for this user
-        client.table("completed_ayahs").update({"is_sequential": False}).eq("user_id", current_user["id"]).execute()
-        
-        # Mark sequential ones as true using composite key (user_id, surah_id, ayah_number)
-        for surah_id, ayah_number in sequential_positions:
-            client.table("completed_ayahs").update({"is_sequential": True}).eq("user_id", current_user["id"]).eq("surah_id", surah_id).eq("ayah_number", ayah_number).execute()
+        return cursor.fetchall()
+
+    all_positions = await run_in_threadpool(quran_query, quran_positions)
+    
+    # Find which completed positions are sequential
+    sequential_positions = []
+    
+    for pos in all_positions:
+        surah_id = pos["surah_id"]
+        ayah_num = pos["number_in_surah"]
+        position_key = (surah_id, ayah_num)
         
-        return {"success": True, "sequential_count": len(sequential_positions)}
-    finally:
-        conn.close()
+        if position_key in completed_set:
+            sequential_positions.append(position_key)
+        else:
+            # Found first incomplete - stop here
+            break
+    
+    # Reset all sequential flags for this user
+    await client.table("completed_ayahs").update({"is_sequential": False}).eq("user_id", current_user["id"]).execute()
+    
+    # Mark sequential ones as true using composite key (user_id, surah_id, ayah_number),
+    # one update per surah, issued concurrently
+    by_surah = {}
+    for surah_id, ayah_number in sequential_positions:
+        by_surah.setdefault(surah_id, []).append(ayah_number)
+    await asyncio.gather(*(
+        client.table("completed_ayahs").update({"is_sequential": True}).eq("user_id", current_user["id"]).eq("surah_id", surah_id).in_("ayah_number", ayah_numbers).execute()
+        for surah_id, ayah_numbers in by_surah.items()
+    ))
+    
+    return {"success": True, "sequential_count": len(sequential_positions)}
 
 
 # =============================================================================
@@ -1964,8 +2102,8 @@ class PlaySessionEnd(BaseModel):
 @app.post("/api/analytics/play-start")
 async def start_play_session(data: PlaySessionStart, current_user: dict = Depends(get_current_user)):
     """Track when user starts playing an ayah in Supabase."""
-    client = supabase_admin or supabase
-    response = client.table("play_sessions").insert({
+    client = db
+    response = await client.table("play_sessions").insert({
         "user_id": current_user["id"],
         "ayah_id": data.ayah_id,
         "surah_id": data.surah_id,
@@ -1980,31 +2118,31 @@ async def start_play_session(data: PlaySessionStart, current_user: dict = Depend
 async def end_play_session(data: PlaySessionEnd, current_user: dict = Depends(get_current_user)):
     """Track when user finishes playing an ayah (updates duration)."""
     # Get session to find ayah_id
-    client = supabase_admin or supabase
-    session = client.table("play_sessions").select("ayah_id").eq("id", data.session_id).eq("user_id", current_user["id"]).execute()
+    client = db
+    session = await client.table("play_sessions").select("ayah_id").eq("id", data.session_id).eq("user_id", current_user["id"]).execute()
 
     if not session.data:
         raise HTTPException(status_code=404, detail="Session not found")
 
     ayah_id = session.data[0]["ayah_id"]
 
-    # Update play session
-    client.table("play_sessions").update({
-        "completed_at": datetime.now().isoformat(),
-        "duration_seconds": data.duration_seconds
-    }).eq("id", data.session_id).execute()
-
-    # Update replay stats in Supabase
-    existing = client.table("replay_stats").select("*").eq("user_id", current_user["id"]).eq("ayah_id", ayah_id).execute()
+    # Update play session while reading the replay stats to update
+    _, existing = await asyncio.gather(
+        client.table("play_sessions").update({
+            "completed_at": datetime.now().isoformat(),
+            "duration_seconds": data.duration_seconds
+        }).eq("id", data.session_id).execute(),
+        client.table("replay_stats").select("*").eq("user_id", current_user["id"]).eq("ayah_id", ayah_id).execute(),
+    )
 
     if existing.data:
-        client.table("replay_stats").update({
+        await client.table("replay_stats").update({
             "play_count": existing.data[0]["play_count"] + 1,
             "total_duration_seconds": existing.data[0]["total_duration_seconds"] + data.duration_seconds,
             "last_played_at": datetime.now().isoformat()
         }).eq("user_id", current_user["id"]).eq("ayah_id", ayah_id).execute()
     else:
-        client.table("replay_stats").insert({
+        await client.table("replay_stats").insert({
             "user_id": current_user["id"],
             "ayah_id": ayah_id,
             "play_count": 1,
@@ -2018,18 +2156,16 @@ async def end_play_session(data: PlaySessionEnd, current_user: dict = Depends(ge
 @app.get("/api/analytics/replay-stats")
 async def get_replay_stats_endpoint(current_user: dict = Depends(get_current_user), limit: int = 10):
     """Get most replayed ayahs (highest play count) from Supabase."""
-    client = supabase_admin or supabase
-    response = client.table("replay_stats").select("*").eq("user_id", current_user["id"]).order("play_count", desc=True).limit(limit).execute()
+    client = db
+    response = await client.table("replay_stats").select("*").eq("user_id", current_user["id"]).order("play_count", desc=True).limit(limit).execute()
 
     if not response.data:
         return []
 
     # Enrich with Quran data from SQLite
-    conn = get_db_connection()
-    try:
+    def enrich(cursor):
         enriched = []
         for rs in response.data:
-            cursor = conn.cursor()
             cursor.execute("""
                 SELECT a.number_in_surah, a.surah_id,
                        s.name as surah_name, s.english_name
@@ -2051,8 +2187,8 @@ async def get_replay_stats_endpoint(current_user: dict = Depends(get_current_use
                 })
 
         return enriched
-    finally:
-        conn.close()
+
+    return await run_in_threadpool(quran_query, enrich)
 
 
 # =============================================================================
@@ -2063,14 +2199,12 @@ async def get_replay_stats_endpoint(current_user: dict = Depends(get_current_use
 async def start_quran_play(current_user: dict = Depends(get_current_user)):
     """Start a full Quran play session from first incomplete ayah."""
     # Get all completed ayah IDs from Supabase
-    client = supabase_admin or supabase
-    completed = client.table("completed_ayahs").select("ayah_id").eq("user_id", current_user["id"]).execute()
+    client = db
+    completed = await client.table("completed_ayahs").select("ayah_id").eq("user_id", current_user["id"]).execute()
     completed_ayah_ids = [c["ayah_id"] for c in completed.data] if completed.data else []
 
     # Get first incomplete ayah from SQLite
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
+    def first_incomplete(cursor):
         if completed_ayah_ids:
             placeholders = ",".join("?" * len(completed_ayah_ids))
             cursor.execute(f"""
@@ -2083,26 +2217,25 @@ async def start_quran_play(current_user: dict = Depends(get_current_user)):
                 SELECT MIN(surah_id) as surah_id, MIN(number_in_surah) as ayah_num
                 FROM ayahs
             """)
-        result = cursor.fetchone()
+        return cursor.fetchone()
 
-        start_surah = result["surah_id"] if result and result["surah_id"] else 1
-        start_ayah = result["ayah_num"] if result and result["ayah_num"] else 1
+    result = await run_in_threadpool(quran_query, first_incomplete)
+    start_surah = result["surah_id"] if result and result["surah_id"] else 1
+    start_ayah = result["ayah_num"] if result and result["ayah_num"] else 1
 
-        # Create session in Supabase
-        response = client.table("quran_play_sessions").insert({
-            "user_id": current_user["id"],
-            "start_surah_id": start_surah,
-            "start_ayah_number": start_ayah
-        }).execute()
+    # Create session in Supabase
+    response = await client.table("quran_play_sessions").insert({
+        "user_id": current_user["id"],
+        "start_surah_id": start_surah,
+        "start_ayah_number": start_ayah
+    }).execute()
 
-        return {
-            "success": True,
-            "session_id": response.data[0]["id"] if response.data else None,
-            "start_surah": start_surah,
-            "start_ayah": start_ayah
-        }
-    finally:
-        conn.close()
+    return {
+        "success": True,
+        "session_id": response.data[0]["id"] if response.data else None,
+        "start_surah": start_surah,
+        "start_ayah": start_ayah
+    }
 
 
 @app.get("/api/quran-play/next-ayah/{surah_id}/{ayah_number}")
@@ -2164,8 +2297,8 @@ def get_next_quran_ayah(surah_id: int, ayah_number: int):
 @app.post("/api/quran-play/end/{session_id}")
 async def end_quran_play_endpoint(session_id: str, current_user: dict = Depends(get_current_user)):
     """End a Quran play session in Supabase."""
-    client = supabase_admin or supabase
-    client.table("quran_play_sessions").update({
+    client = db
+    await client.table("quran_play_sessions").update({
         "ended_at": datetime.now().isoformat()
     }).eq("id", session_id).eq("user_id", current_user["id"]).execute()
 
@@ -2236,11 +2369,7 @@ def get_ayah_share_image(
             raise HTTPException(status_code=404, detail=f"Surah {surah_id} not found")
 
         # Get edition ID for Arabic text
-        cursor.execute("SELECT id FROM editions WHERE identifier = ?", (edition,))
-        edition_row = cursor.fetchone()
-        if not edition_row:
-            raise HTTPException(status_code=404, detail=f"Edition '{edition}' not found")
-        edition_id = edition_row[0]
+        edition_id = resolve_edition(edition)["id"]
 
         # Get ayah text
         cursor.execute("""
@@ -2259,10 +2388,8 @@ def get_ayah_share_image(
         # Get translation if requested
         translation_text = None
         if translation != "none":
-            cursor.execute("SELECT id FROM editions WHERE identifier = ?", (translation,))
-            trans_row = cursor.fetchone()
-            if trans_row:
-                trans_edition_id = trans_row[0]
+            trans_edition_id = find_edition_id(translation)
+            if trans_edition_id:
                 cursor.execute("""
                     SELECT text
                     FROM ayahs
@@ -2340,10 +2467,8 @@ def get_ayah_share_image_by_id(
         # Get translation if requested
         translation_text = None
         if translation != "none":
-            cursor.execute("SELECT id FROM editions WHERE identifier = ?", (translation,))
-            trans_row = cursor.fetchone()
-            if trans_row:
-                trans_edition_id = trans_row[0]
+            trans_edition_id = find_edition_id(translation)
+            if trans_edition_id:
                 cursor.execute("""
                     SELECT text
                     FROM ayahs
@@ -2791,8 +2916,8 @@ async def generate_share_profile(current_user: dict = Depends(get_current_user))
     Creates a unique 8-character share_id if one doesn't exist.
     """
     # Check if user already has a share profile
-    client = supabase_admin or supabase
-    existing = client.table("share_profiles").select("*").eq("user_id", current_user["id"]).execute()
+    client = db
+    existing = await client.table("share_profiles").select("*").eq("user_id", current_user["id"]).execute()
 
     if existing.data:
         # Return existing share profile
@@ -2806,7 +2931,7 @@ async def generate_share_profile(current_user: dict = Depends(get_current_user))
         }
 
     # Create new share profile (share_id will be auto-generated by trigger)
-    response = client.table("share_profiles").insert({
+    response = await client.table("share_profiles").insert({
         "user_id": current_user["id"],
         "theme": "classic",
         "show_reading_progress": True,
@@ -2836,8 +2961,8 @@ async def get_share_settings(current_user: dict = Depends(get_current_user)):
     Get the current user's share profile settings.
     Returns null if no share profile exists.
     """
-    client = supabase_admin or supabase
-    response = client.table("share_profiles").select("*").eq("user_id", current_user["id"]).execute()
+    client = db
+    response = await client.table("share_profiles").select("*").eq("user_id", current_user["id"]).execute()
 
     if not response.data:
         return None
@@ -2867,10 +2992,10 @@ async def update_share_settings(
     Update the current user's share profile settings.
     Creates a new profile if one doesn't exist.
     """
-    client = supabase_admin or supabase
+    client = db
 
     # Check if profile exists
-    existing = client.table("share_profiles").select("*").eq("user_id", current_user["id"]).execute()
+    existing = await client.table("share_profiles").select("*").eq("user_id", current_user["id"]).execute()
 
     # Build update dict with only provided fields
     update_data = {}
@@ -2896,17 +3021,17 @@ async def update_share_settings(
 
     if existing.data:
         # Update existing profile
-        response = client.table("share_profiles").update(update_data).eq("user_id", current_user["id"]).execute()
+        response = await client.table("share_profiles").update(update_data).eq("user_id", current_user["id"]).execute()
         share_id = existing.data[0]["share_id"]
     else:
         # Create new profile
         update_data["user_id"] = current_user["id"]
-        response = client.table("share_profiles").insert(update_data).execute()
+        response = await client.table("share_profiles").insert(update_data).execute()
         share_id = response.data[0]["share_id"] if response.data else None
 
     if not response.data and existing.data:
         # Update might return no data on success, fetch the profile
-        profile = client.table("share_profiles").select("*").eq("user_id", current_user["id"]).execute()
+        profile = await client.table("share_profiles").select("*").eq("user_id", current_user["id"]).execute()
         share_id = profile.data[0]["share_id"] if profile.data else None
 
     return {
@@ -2923,11 +3048,11 @@ async def get_public_share_stats(share_id: str):
     This endpoint does NOT require authentication.
     Returns user stats based on their share settings.
     """
-    client = supabase_admin or supabase
+    client = db
 
     # Use the Supabase function to get stats
     try:
-        response = client.table("share_profiles").select(
+        response = await client.table("share_profiles").select(
             "user_id",
             "enabled",
             "theme",
@@ -2951,8 +3076,24 @@ async def get_public_share_stats(share_id: str):
 
     user_id = profile["user_id"]
 
-    # Get user profile info (name, created_at)
-    user_profile = client.table("profiles").select("name", "created_at").eq("id", user_id).single().execute()
+    # Stats based on visibility settings
+    parts = set()
+    if profile.get("show_reading_progress") or profile.get("show_completion"):
+        parts.add("reading")
+    if profile.get("show_completion"):
+        parts.add("completion")
+    if profile.get("show_streak"):
+        parts.add("streak")
+    if profile.get("show_bookmarks"):
+        parts.add("bookmarks")
+    if profile.get("show_listening_stats"):
+        parts.add("listening")
+
+    # Get user profile info (name, created_at) alongside the stats
+    user_profile, stats = await asyncio.gather(
+        client.table("profiles").select("name", "created_at").eq("id", user_id).single().execute(),
+        stats_store.collect(user_id, parts, surah_sizes()),
+    )
 
     if not user_profile.data:
         raise HTTPException(status_code=404, detail="User not found")
@@ -2966,99 +3107,16 @@ async def get_public_share_stats(share_id: str):
         "stats": {}
     }
 
-    # Get stats based on visibility settings
-    if profile.get("show_reading_progress") or profile.get("show_completion"):
-        # Total ayahs read
-        daily_response = client.table("daily_readings").select("ayahs_read").eq("user_id", user_id).execute()
-        total_ayahs = sum(d["ayahs_read"] for d in daily_response.data) if daily_response.data else 0
-
-        # Total surahs with progress
-        progress_response = client.table("reading_progress").select("surah_id").eq("user_id", user_id).execute()
-        total_surahs = len(set(p["surah_id"] for p in progress_response.data)) if progress_response.data else 0
-
-        result["stats"]["reading"] = {
-            "total_ayahs_read": total_ayahs,
-            "total_surahs_read": total_surahs
-        }
-
-    if profile.get("show_completion"):
-        # Completion stats
-        completed_response = client.table("completed_ayahs").select("ayah_id", "surah_id").eq("user_id", user_id).execute()
-        completed_count = len(completed_response.data) if completed_response.data else 0
-        completion_percentage = round((completed_count / 6236) * 100, 1) if completed_count > 0 else 0
-
-        # Count fully completed surahs
-        conn = get_db_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, number_of_ayahs FROM surahs")
-            all_surahs = cursor.fetchall()
-
-            completed_surahs = 0
-            if completed_response.data:
-                surah_completion = {}
-                for c in completed_response.data:
-                    surah_id = c["surah_id"]
-                    if surah_id not in surah_completion:
-                        surah_completion[surah_id] = 0
-                    surah_completion[surah_id] += 1
-
-                for surah in all_surahs:
-                    if surah_completion.get(surah["id"], 0) >= surah["number_of_ayahs"]:
-                        completed_surahs += 1
-        finally:
-            conn.close()
-
-        result["stats"]["completion"] = {
-            "completion_percentage": completion_percentage,
-            "ayahs_completed": completed_count,
-            "surahs_completed": completed_surahs
-        }
-
-    if profile.get("show_streak"):
-        # Calculate reading streak
-        daily_dates_response = client.table("daily_readings").select("read_date").eq("user_id", user_id).order("read_date", desc=True).limit(365).execute()
-        streak = 0
-
-        if daily_dates_response.data:
-            dates = sorted(list(set(d["read_date"] for d in daily_dates_response.data)), reverse=True)
-            today = datetime.now().strftime("%Y-%m-%d")
-            yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-
-            if dates and (dates[0] == today or dates[0] == yesterday):
-                streak = 1
-                expected_date = (datetime.now() - timedelta(days=1 if dates[0] == today else 2)).strftime("%Y-%m-%d")
-
-                for date in dates[1:]:
-                    if date == expected_date:
-                        streak += 1
-                        expected_date = (datetime.strptime(expected_date, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-                    else:
-                        break
-
-        result["stats"]["streak"] = streak
-
-    if profile.get("show_bookmarks"):
-        # Get bookmarks count
-        bookmarks_response = client.table("bookmarks").select("id").eq("user_id", user_id).execute()
-        result["stats"]["bookmarks"] = len(bookmarks_response.data) if bookmarks_response.data else 0
-
-    if profile.get("show_listening_stats"):
-        # Get listening stats
-        replay_response = client.table("replay_stats").select("play_count", "total_duration_seconds").eq("user_id", user_id).execute()
-
-        total_plays = 0
-        total_seconds = 0
-
-        if replay_response.data:
-            for r in replay_response.data:
-                total_plays += r.get("play_count", 0)
-                total_seconds += r.get("total_duration_seconds", 0)
-
-        result["stats"]["listening"] = {
-            "total_plays": total_plays,
-            "total_minutes": round(total_seconds / 60) if total_seconds > 0 else 0
-        }
+    if "reading" in stats:
+        result["stats"]["reading"] = stats["reading"]
+    if "completion" in stats:
+        result["stats"]["completion"] = stats["completion"]
+    if "streak" in stats:
+        result["stats"]["streak"] = stats["streak"]
+    if "bookmarks" in stats:
+        result["stats"]["bookmarks"] = stats["bookmarks"]
+    if "listening" in stats:
+        result["stats"]["listening"] = stats["listening"]
 
     return result
 
@@ -3071,11 +3129,11 @@ async def get_share_og_image(share_id: str):
     """
     from share_image import generate_share_profile_image_bytes
 
-    client = supabase_admin or supabase
+    client = db
 
     # Fetch share profile and stats
     try:
-        profile_response = client.table("share_profiles").select(
+        profile_response = await client.table("share_profiles").select(
             "user_id", "theme"
         ).eq("share_id", share_id).single().execute()
     except Exception:
@@ -3087,40 +3145,19 @@ async def get_share_og_image(share_id: str):
     user_id = profile_response.data["user_id"]
     theme = profile_response.data.get("theme", "classic")
 
-    # Get user profile
-    user_profile = client.table("profiles").select("name").eq("id", user_id).single().execute()
+    # Get user profile and the key stats for the image
+    user_profile, stats = await asyncio.gather(
+        client.table("profiles").select("name").eq("id", user_id).single().execute(),
+        stats_store.collect(user_id, ("completion", "streak", "reading"), surah_sizes()),
+    )
 
     if not user_profile.data:
         raise HTTPException(status_code=404, detail="User not found")
 
     user_name = user_profile.data.get("name", "Quran Reader")
-
-    # Get key stats for the image
-    # Completion %
-    completed_response = client.table("completed_ayahs").select("ayah_id").eq("user_id", user_id).execute()
-    completed_count = len(completed_response.data) if completed_response.data else 0
-    completion_pct = round((completed_count / 6236) * 100, 1) if completed_count > 0 else 0
-
-    # Streak
-    daily_dates_response = client.table("daily_readings").select("read_date").eq("user_id", user_id).order("read_date", desc=True).limit(365).execute()
-    streak = 0
-    if daily_dates_response.data:
-        dates = sorted(list(set(d["read_date"] for d in daily_dates_response.data)), reverse=True)
-        today = datetime.now().strftime("%Y-%m-%d")
-        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-        if dates and (dates[0] == today or dates[0] == yesterday):
-            streak = 1
-            expected_date = (datetime.now() - timedelta(days=1 if dates[0] == today else 2)).strftime("%Y-%m-%d")
-            for date in dates[1:]:
-                if date == expected_date:
-                    streak += 1
-                    expected_date = (datetime.strptime(expected_date, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-                else:
-                    break
-
-    # Total ayahs
-    daily_response = client.table("daily_readings").select("ayahs_read").eq("user_id", user_id).execute()
-    total_ayahs = sum(d["ayahs_read"] for d in daily_response.data) if daily_response.data else 0
+    completion_pct = stats["completion"]["completion_percentage"]
+    streak = stats["streak"]
+    total_ayahs = stats["reading"]["total_ayahs_read"]
 
     # Generate image
     try:
@@ -0,0 +1,89 @@
+-- Migration 009: Server-side aggregates for the stats endpoints
+-- Run this in your Supabase SQL Editor
+--
+-- /api/progress/stats, /api/completed-ayahs/overall-stats, /api/share/{share_id}
+-- and the share OG image call these through PostgREST (/rest/v1/rpc/...), so
+-- only totals cross the network instead of every row. Row counts (bookmarks)
+-- use PostgREST's exact count and need no function.
+
+-- Total ayahs read and distinct surahs with progress
+CREATE OR REPLACE FUNCTION user_reading_totals(p_user_id UUID)
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'total_ayahs_read', (
+            SELECT COALESCE(SUM(ayahs_read), 0)
+            FROM daily_readings
+            WHERE user_id = p_user_id
+        ),
+        'total_surahs_read', (
+            SELECT COUNT(DISTINCT surah_id)
+            FROM reading_progress
+            WHERE user_id = p_user_id
+        )
+    );
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- Consecutive reading days ending today or yesterday. p_today is passed by the
+-- server so "today" matches the server's date, not the database time zone.
+CREATE OR REPLACE FUNCTION user_reading_streak(p_user_id UUID, p_today DATE)
+RETURNS INTEGER AS $$
+    WITH recent AS (
+        SELECT DISTINCT read_date
+        FROM (
+            SELECT read_date
+            FROM daily_readings
+            WHERE user_id = p_user_id
+            ORDER BY read_date DESC
+            LIMIT 365
+        ) latest
+    ),
+    runs AS (
+        -- Consecutive dates share the same date + row number
+        SELECT read_date,
+               read_date + (ROW_NUMBER() OVER (ORDER BY read_date DESC))::INTEGER AS grp
+        FROM recent
+    )
+    SELECT CASE
+        WHEN MAX(read_date) IN (p_today, p_today - 1) THEN (
+            SELECT COUNT(*)::INTEGER
+            FROM runs
+            WHERE grp = (SELECT grp FROM runs ORDER BY read_date DESC LIMIT 1)
+        )
+        ELSE 0
+    END
+    FROM recent;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- Completed ayahs per surah ({"1": 7, "2": 40, ...}); the server compares
+-- them with surah lengths from quran.db
+CREATE OR REPLACE FUNCTION user_completion_by_surah(p_user_id UUID)
+RETURNS JSON AS $$
+    SELECT COALESCE(json_object_agg(surah_id, ayahs), '{}'::json)
+    FROM (
+        SELECT surah_id, COUNT(*) AS ayahs
+        FROM completed_ayahs
+        WHERE user_id = p_user_id
+        GROUP BY surah_id
+    ) per_surah;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- Total plays and listening time
+CREATE OR REPLACE FUNCTION user_listening_totals(p_user_id UUID)
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'total_plays', COALESCE(SUM(play_count), 0),
+        'total_seconds', COALESCE(SUM(total_duration_seconds), 0)
+    )
+    FROM replay_stats
+    WHERE user_id = p_user_id;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- Only the backend (service role) calls these; they take arbitrary user ids
+REVOKE EXECUTE ON FUNCTION user_reading_totals(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION user_reading_streak(UUID, DATE) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION user_completion_by_surah(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION user_listening_totals(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION user_reading_totals(UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION user_reading_streak(UUID, DATE) TO service_role;
+GRANT EXECUTE ON FUNCTION user_completion_by_surah(UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION user_listening_totals(UUID) TO service_role;
@@ -0,0 +1,291 @@
+-- Migration 010: Materialized per-user stats summary
+-- Run this in your Supabase SQL Editor
+--
+-- One user_stats row per user holds everything the stats endpoints show, so
+-- /api/progress/stats, /api/completed-ayahs/overall-stats, /api/share/{share_id}
+-- and the share OG image read a single row. Triggers on the source tables keep
+-- the row up to date incrementally as ayahs are completed, progress and daily
+-- readings are recorded, bookmarks change and plays end.
+-- rebuild_user_stats() recomputes rows from the source tables (repair job:
+-- backend/archive/rebuild_user_stats.py).
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id UUID PRIMARY KEY,
+    total_ayahs_read INTEGER NOT NULL DEFAULT 0,
+    total_surahs_read INTEGER NOT NULL DEFAULT 0,
+    total_bookmarks INTEGER NOT NULL DEFAULT 0,
+    ayahs_completed INTEGER NOT NULL DEFAULT 0,
+    -- Completed ayahs per surah ({"1": 7, "2": 40, ...}); fully completed surahs
+    -- are counted against the surah lengths in quran.db
+    completed_by_surah JSONB NOT NULL DEFAULT '{}'::jsonb,
+    -- Latest reading day and the run of consecutive days ending on it; the
+    -- streak shown is streak_days while last_read_date is today or yesterday
+    last_read_date DATE,
+    streak_days INTEGER NOT NULL DEFAULT 0,
+    total_plays INTEGER NOT NULL DEFAULT 0,
+    total_listening_seconds BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Only the backend (service role) reads it
+ALTER TABLE user_stats ENABLE ROW LEVEL SECURITY;
+
+-- =============================================================================
+-- Rebuild from source tables
+-- =============================================================================
+
+-- Latest reading day and the length of the consecutive run ending on it
+CREATE OR REPLACE FUNCTION user_streak_state(p_user_id UUID, OUT last_read_date DATE, OUT streak_days INTEGER)
+AS $$
+    WITH runs AS (
+        -- Consecutive dates share the same date + row number
+        SELECT read_date,
+               read_date + (ROW_NUMBER() OVER (ORDER BY read_date DESC))::INTEGER AS grp
+        FROM daily_readings
+        WHERE user_id = p_user_id
+    )
+    SELECT MAX(read_date),
+           COALESCE(COUNT(*) FILTER (WHERE grp = (SELECT grp FROM runs ORDER BY read_date DESC LIMIT 1)), 0)::INTEGER
+    FROM runs;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- Recompute one user's row (or every user's when p_user_id is NULL).
+-- Returns the number of rows written.
+CREATE OR REPLACE FUNCTION rebuild_user_stats(p_user_id UUID DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER := 0;
+    v_user_id UUID;
+BEGIN
+    IF p_user_id IS NULL THEN
+        -- One user at a time, so each row is recomputed under that user's lock
+        -- and an increment committed meanwhile is never overwritten. The locks
+        -- are held until commit (one lock table slot per user).
+        FOR v_user_id IN
+            SELECT user_id FROM daily_readings
+            UNION SELECT user_id FROM reading_progress
+            UNION SELECT user_id FROM bookmarks
+            UNION SELECT user_id FROM completed_ayahs
+            UNION SELECT user_id FROM replay_stats
+        LOOP
+            v_rows := v_rows + rebuild_user_stats(v_user_id);
+        END LOOP;
+        RETURN v_rows;
+    END IF;
+
+    -- Serialize with the user's incremental updates (see user_stats_lock). The
+    -- statements below take a new snapshot, so they see increments committed
+    -- while waiting for the lock.
+    PERFORM pg_advisory_xact_lock(hashtextextended(p_user_id::TEXT, 0));
+
+    INSERT INTO user_stats AS s (
+        user_id, total_ayahs_read, total_surahs_read, total_bookmarks,
+        ayahs_completed, completed_by_surah, last_read_date, streak_days,
+        total_plays, total_listening_seconds, updated_at
+    )
+    SELECT
+        p_user_id,
+        (SELECT COALESCE(SUM(ayahs_read), 0) FROM daily_readings WHERE user_id = p_user_id),
+        (SELECT COUNT(DISTINCT surah_id) FROM reading_progress WHERE user_id = p_user_id),
+        (SELECT COUNT(*) FROM bookmarks WHERE user_id = p_user_id),
+        (SELECT COUNT(*) FROM completed_ayahs WHERE user_id = p_user_id),
+        (SELECT COALESCE(jsonb_object_agg(surah_id, ayahs), '{}'::jsonb)
+         FROM (SELECT surah_id, COUNT(*) AS ayahs
+               FROM completed_ayahs WHERE user_id = p_user_id
+               GROUP BY surah_id) per_surah),
+        streak.last_read_date,
+        streak.streak_days,
+        (SELECT COALESCE(SUM(play_count), 0) FROM replay_stats WHERE user_id = p_user_id),
+        (SELECT COALESCE(SUM(total_duration_seconds), 0) FROM replay_stats WHERE user_id = p_user_id),
+        NOW()
+    FROM user_streak_state(p_user_id) streak
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_ayahs_read = EXCLUDED.total_ayahs_read,
+        total_surahs_read = EXCLUDED.total_surahs_read,
+        total_bookmarks = EXCLUDED.total_bookmarks,
+        ayahs_completed = EXCLUDED.ayahs_completed,
+        completed_by_surah = EXCLUDED.completed_by_surah,
+        last_read_date = EXCLUDED.last_read_date,
+        streak_days = EXCLUDED.streak_days,
+        total_plays = EXCLUDED.total_plays,
+        total_listening_seconds = EXCLUDED.total_listening_seconds,
+        updated_at = EXCLUDED.updated_at;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Serialize stats maintenance per user until the transaction ends, so an
+-- increment and a rebuild of the same user never interleave, and make sure the
+-- row exists. A new row starts at zero: every user with data before this
+-- migration gets a row from the initial rebuild at the end of this file.
+-- Deleting a row to repair it is not supported, since the next write would
+-- recreate it at zero; repair with rebuild_user_stats(user_id) instead.
+CREATE OR REPLACE FUNCTION user_stats_lock(p_user_id UUID)
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtextextended(p_user_id::TEXT, 0));
+    INSERT INTO user_stats (user_id) VALUES (p_user_id) ON CONFLICT (user_id) DO NOTHING;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- =============================================================================
+-- Incremental maintenance
+-- =============================================================================
+
+-- daily_readings: ayahs read and the streak
+CREATE OR REPLACE FUNCTION user_stats_daily_readings()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id UUID := COALESCE(NEW.user_id, OLD.user_id);
+    v_last DATE;
+    v_delta INTEGER;
+BEGIN
+    PERFORM user_stats_lock(v_user_id);
+
+    v_delta := CASE TG_OP
+        WHEN 'INSERT' THEN COALESCE(NEW.ayahs_read, 0)
+        WHEN 'UPDATE' THEN COALESCE(NEW.ayahs_read, 0) - COALESCE(OLD.ayahs_read, 0)
+        ELSE -COALESCE(OLD.ayahs_read, 0)
+    END;
+
+    SELECT last_read_date INTO v_last FROM user_stats WHERE user_id = v_user_id;
+
+    IF TG_OP = 'INSERT' AND (v_last IS NULL OR NEW.read_date > v_last + 1) THEN
+        -- New run
+        UPDATE user_stats SET last_read_date = NEW.read_date, streak_days = 1
+        WHERE user_id = v_user_id;
+    ELSIF TG_OP = 'INSERT' AND NEW.read_date = v_last + 1 THEN
+        -- Next day of the current run
+        UPDATE user_stats SET last_read_date = NEW.read_date, streak_days = streak_days + 1
+        WHERE user_id = v_user_id;
+    ELSIF TG_OP = 'DELETE' OR (TG_OP = 'INSERT' AND NEW.read_date < v_last)
+          OR (TG_OP = 'UPDATE' AND NEW.read_date IS DISTINCT FROM OLD.read_date) THEN
+        -- Back-filled or removed days (e.g. account merges): recount the run
+        UPDATE user_stats s SET last_read_date = st.last_read_date, streak_days = st.streak_days
+        FROM user_streak_state(v_user_id) st
+        WHERE s.user_id = v_user_id;
+    END IF;
+
+    UPDATE user_stats
+    SET total_ayahs_read = total_ayahs_read + v_delta, updated_at = NOW()
+    WHERE user_id = v_user_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- reading_progress: surahs with progress (one row per user and surah)
+CREATE OR REPLACE FUNCTION user_stats_reading_progress()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id UUID := COALESCE(NEW.user_id, OLD.user_id);
+BEGIN
+    PERFORM user_stats_lock(v_user_id);
+    UPDATE user_stats
+    SET total_surahs_read = total_surahs_read + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END,
+        updated_at = NOW()
+    WHERE user_id = v_user_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- bookmarks: bookmark count
+CREATE OR REPLACE FUNCTION user_stats_bookmarks()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id UUID := COALESCE(NEW.user_id, OLD.user_id);
+BEGIN
+    PERFORM user_stats_lock(v_user_id);
+    UPDATE user_stats
+    SET total_bookmarks = total_bookmarks + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END,
+        updated_at = NOW()
+    WHERE user_id = v_user_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- completed_ayahs: completed count, overall and per surah
+CREATE OR REPLACE FUNCTION user_stats_completed_ayahs()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id UUID := COALESCE(NEW.user_id, OLD.user_id);
+    v_surah TEXT := COALESCE(NEW.surah_id, OLD.surah_id)::TEXT;
+    v_delta INTEGER := CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END;
+BEGIN
+    PERFORM user_stats_lock(v_user_id);
+    UPDATE user_stats
+    SET ayahs_completed = ayahs_completed + v_delta,
+        completed_by_surah = jsonb_set(
+            completed_by_surah, ARRAY[v_surah],
+            to_jsonb(COALESCE((completed_by_surah->>v_surah)::INTEGER, 0) + v_delta)
+        ),
+        updated_at = NOW()
+    WHERE user_id = v_user_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- replay_stats: plays and listening time (updated when a play ends)
+CREATE OR REPLACE FUNCTION user_stats_replay_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id UUID := COALESCE(NEW.user_id, OLD.user_id);
+BEGIN
+    PERFORM user_stats_lock(v_user_id);
+    UPDATE user_stats
+    SET total_plays = total_plays
+            + CASE WHEN TG_OP = 'DELETE' THEN 0 ELSE COALESCE(NEW.play_count, 0) END
+            - CASE WHEN TG_OP = 'INSERT' THEN 0 ELSE COALESCE(OLD.play_count, 0) END,
+        total_listening_seconds = total_listening_seconds
+            + CASE WHEN TG_OP = 'DELETE' THEN 0 ELSE COALESCE(NEW.total_duration_seconds, 0) END
+            - CASE WHEN TG_OP = 'INSERT' THEN 0 ELSE COALESCE(OLD.total_duration_seconds, 0) END,
+        updated_at = NOW()
+    WHERE user_id = v_user_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS user_stats_daily_readings_trigger ON daily_readings;
+CREATE TRIGGER user_stats_daily_readings_trigger
+    AFTER INSERT OR UPDATE OF ayahs_read, read_date OR DELETE ON daily_readings
+    FOR EACH ROW
+    EXECUTE FUNCTION user_stats_daily_readings();
+
+DROP TRIGGER IF EXISTS user_stats_reading_progress_trigger ON reading_progress;
+CREATE TRIGGER user_stats_reading_progress_trigger
+    AFTER INSERT OR DELETE ON reading_progress
+    FOR EACH ROW
+    EXECUTE FUNCTION user_stats_reading_progress();
+
+DROP TRIGGER IF EXISTS user_stats_bookmarks_trigger ON bookmarks;
+CREATE TRIGGER user_stats_bookmarks_trigger
+    AFTER INSERT OR DELETE ON bookmarks
+    FOR EACH ROW
+    EXECUTE FUNCTION user_stats_bookmarks();
+
+DROP TRIGGER IF EXISTS user_stats_completed_ayahs_trigger ON completed_ayahs;
+CREATE TRIGGER user_stats_completed_ayahs_trigger
+    AFTER INSERT OR DELETE ON completed_ayahs
+    FOR EACH ROW
+    EXECUTE FUNCTION user_stats_completed_ayahs();
+
+DROP TRIGGER IF EXISTS user_stats_replay_stats_trigger ON replay_stats;
+CREATE TRIGGER user_stats_replay_stats_trigger
+    AFTER INSERT OR UPDATE OF play_count, total_duration_seconds OR DELETE ON replay_stats
+    FOR EACH ROW
+    EXECUTE FUNCTION user_stats_replay_stats();
+
+REVOKE EXECUTE ON FUNCTION rebuild_user_stats(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION user_streak_state(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION user_stats_lock(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION rebuild_user_stats(UUID) TO service_role;
+
+-- Initial fill for existing users
+SELECT rebuild_user_stats();
+
+-- The 009 aggregate RPCs are superseded by user_stats and no longer called
+DROP FUNCTION IF EXISTS user_reading_totals(UUID);
+DROP FUNCTION IF EXISTS user_reading_streak(UUID, DATE);
+DROP FUNCTION IF EXISTS user_completion_by_surah(UUID);
+DROP FUNCTION IF EXISTS user_listening_totals(UUID);
@@ -0,0 +1,116 @@
+"""
+User Profile Cache
+
+Authenticated endpoints resolve the caller's `profiles` row on every request,
+and one reader page load hits several of them at once. ProfileCache keeps
+profiles in a bounded LRU keyed by user id with a short TTL, and coalesces
+concurrent misses for the same user into a single Supabase fetch.
+
+Endpoints that change a profile (or move data between user ids) call
+invalidate(); a fetch that was in flight during an invalidation is returned to
+its waiters but not cached.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL", "60"))
+PROFILE_CACHE_MAX_ENTRIES = int(os.environ.get("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+
+
+class ProfileCache:
+    """TTL + LRU cache of profile dicts with per-user request coalescing."""
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Optional[dict]]],
+        ttl: float = PROFILE_CACHE_TTL,
+        max_entries: int = PROFILE_CACHE_MAX_ENTRIES,
+    ):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # user_id -> (expires, profile)
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Bumped by invalidate(); a fetch only stores if the generation is unchanged
+        self._generations: Dict[str, int] = {}
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        """Return the user's profile (None if there is no row)."""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            del self._entries[user_id]
+
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The request running the fetch was cancelled
+                return await self.get(user_id)
+
+        self.misses += 1
+        generation = self._generations.get(user_id, 0)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[user_id] = future
+        try:
+            profile = await self.fetch(user_id)
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures do not log warnings
+            future.exception()
+            raise
+        except BaseException:
+            # Cancelled: release the coalesced waiters so they fetch again
+            future.cancel()
+            raise
+        finally:
+            self._pending.pop(user_id, None)
+            current = self._generations.pop(user_id, 0)
+
+        future.set_result(profile)
+        if profile is not None and current == generation:
+            self._entries[user_id] = (time.monotonic() + self.ttl, profile)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return profile
+
+    def invalidate(self, *user_ids: str):
+        """Drop cached profiles (and discard in-flight fetches) for these users."""
+        for user_id in user_ids:
+            if not user_id:
+                continue
+            self._entries.pop(user_id, None)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            if user_id not in self._pending:
+                # Only needed while a fetch is in flight
+                self._generations.pop(user_id, None)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "in_flight": len(self._pending),
+        }
@@ -0,0 +1,457 @@
+"""
+In-memory Quran Corpus
+
+Loads the static Quran tables (surahs, editions, ayahs, audio editions) from
+SQLite once at startup into compact columnar storage, so the read-only Quran
+endpoints are served without any database round-trips.
+
+Each text edition is stored as a handful of flat arrays indexed by position in
+global ayah order, plus a single UTF-8 text blob with an offsets array. Flat
+buffers hold no per-ayah Python objects, so when the corpus is built in the
+gunicorn master (--preload) the pages stay shared copy-on-write across workers.
+
+The corpus also serves as the edition resolver (identifier -> id/metadata in
+O(1)). get_corpus() periodically stats quran.db and, when the file has been
+swapped, rebuilds the snapshot on a background thread, swaps it in and
+notifies registered reload listeners; requests keep the previous snapshot
+meanwhile.
+
+A hot-reloaded snapshot is built inside each worker process, so it is not
+shared copy-on-write like the one loaded by the --preload master: restart
+the server after replacing quran.db to get the shared snapshot back.
+"""
+
+import array
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Per-ayah metadata columns stored as unsigned 16-bit arrays (0 means NULL)
+AYAH_META_COLUMNS = ("juz", "manzil", "page", "ruku", "hizb_quarter")
+
+# Optional fields a parallel-text row can carry besides the aligned texts
+PARALLEL_FIELDS = ("ids",) + AYAH_META_COLUMNS + ("sajda",)
+
+SURAH_COLUMNS = (
+    "id", "name", "english_name", "english_name_translation",
+    "revelation_type", "number_of_ayahs"
+)
+
+EDITION_COLUMNS = (
+    "id", "identifier", "language", "name", "english_name",
+    "format", "type", "direction"
+)
+
+
+class EditionText:
+    """Columnar storage for every ayah of a single text edition."""
+
+    __slots__ = (
+        "edition_id", "identifier", "ids", "numbers", "surah_ids",
+        "numbers_in_surah", "meta", "sajda", "text_blob", "text_offsets",
+        "surah_ranges", "meta_ranges"
+    )
+
+    def __init__(self, edition_id: int, identifier: str, rows):
+        self.edition_id = edition_id
+        self.identifier = identifier
+        self.ids = array.array("I")
+        self.numbers = array.array("H")
+        self.surah_ids = array.array("B")
+        self.numbers_in_surah = array.array("H")
+        self.meta = {column: array.array("H") for column in AYAH_META_COLUMNS}
+        self.sajda = {}
+        self.text_offsets = array.array("I", [0])
+        self.surah_ranges = {}
+        # Offset tables: column -> value -> (start, stop) slice of positions.
+        # Pages, juz, hizb quarters etc. are contiguous in mushaf order.
+        self.meta_ranges = {column: {} for column in AYAH_META_COLUMNS}
+
+        chunks = []
+        offset = 0
+        for position, row in enumerate(rows):
+            self.ids.append(row["id"])
+            self.numbers.append(row["number"])
+            self.surah_ids.append(row["surah_id"])
+            self.numbers_in_surah.append(row["number_in_surah"])
+            for column in AYAH_META_COLUMNS:
+                self.meta[column].append(row[column] or 0)
+            if row["sajda"] is not None:
+                self.sajda[position] = row["sajda"]
+
+            encoded = row["text"].encode("utf-8")
+            chunks.append(encoded)
+            offset += len(encoded)
+            self.text_offsets.append(offset)
+
+            start, _ = self.surah_ranges.get(row["surah_id"], (position, position))
+            self.surah_ranges[row["surah_id"]] = (start, position + 1)
+            for column in AYAH_META_COLUMNS:
+                value = row[column]
+                if value:
+                    ranges = self.meta_ranges[column]
+                    start, _ = ranges.get(value, (position, position))
+                    ranges[value] = (start, position + 1)
+
+        self.text_blob = b"".join(chunks)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def text(self, position: int) -> str:
+        """Decode the text of the ayah at a given position."""
+        return self.text_blob[self.text_offsets[position]:self.text_offsets[position + 1]].decode("utf-8")
+
+    def position_of(self, number: int) -> Optional[int]:
+        """Return the position of a global ayah number, or None if absent."""
+        position = bisect_left(self.numbers, number)
+        if position < len(self.numbers) and self.numbers[position] == number:
+            return position
+        return None
+
+    def row(self, position: int) -> dict:
+        """Build an ayah dict in the same shape as the `ayahs` table row."""
+        row = {
+            "id": self.ids[position],
+            "number": self.numbers[position],
+            "number_in_surah": self.numbers_in_surah[position],
+            "text": self.text(position),
+        }
+        for column in AYAH_META_COLUMNS:
+            row[column] = self.meta[column][position] or None
+        row["sajda"] = self.sajda.get(position)
+        return row
+
+    def range_rows(self, start: int, stop: int) -> List[dict]:
+        """Return ayah rows for a slice of positions, tagged with their surah."""
+        rows = []
+        for position in range(start, stop):
+            row = self.row(position)
+            row["surah_id"] = self.surah_ids[position]
+            rows.append(row)
+        return rows
+
+    def meta_range(self, column: str, first: int, last: Optional[int] = None):
+        """Slice of positions covering `column` values first..last, or None."""
+        ranges = self.meta_ranges[column]
+        bounds = [ranges[v] for v in range(first, (last or first) + 1) if v in ranges]
+        if not bounds:
+            return None
+        return bounds[0][0], bounds[-1][1]
+
+    def surah_rows(self, surah_id: int) -> List[dict]:
+        """Return every ayah of a surah, ordered by number_in_surah."""
+        start, stop = self.surah_ranges.get(surah_id, (0, 0))
+        return [self.row(position) for position in range(start, stop)]
+
+    def nbytes(self) -> int:
+        """Size in bytes of the columnar buffers, text blob and lookup tables."""
+        total = len(self.text_blob)
+        for column in [self.ids, self.numbers, self.surah_ids, self.numbers_in_surah,
+                       self.text_offsets, *self.meta.values()]:
+            total += array_bytes(column)
+        return total + object_bytes(self.sajda) + object_bytes(self.surah_ranges) + object_bytes(self.meta_ranges)
+
+
+class QuranCorpus:
+    """Immutable in-memory snapshot of the Quran text tables."""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.signature = file_signature(self.db_path)
+        # Content hash of quran.db; changes whenever the database file is swapped
+        self.version = database_digest(self.db_path)
+
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT {", ".join(SURAH_COLUMNS)}
+                FROM surahs
+                ORDER BY id ASC
+            """)
+            self.surah_list = [dict(row) for row in cursor.fetchall()]
+            self.surahs: Dict[int, dict] = {s["id"]: s for s in self.surah_list}
+
+            cursor.execute(f"""
+                SELECT {", ".join(EDITION_COLUMNS)}
+                FROM editions
+                ORDER BY language, type, english_name
+            """)
+            self.edition_rows = [dict(row) for row in cursor.fetchall()]
+            self.editions: Dict[str, dict] = {e["identifier"]: e for e in self.edition_rows}
+
+            cursor.execute("""
+                SELECT id, identifier, bitrate
+                FROM audio_editions
+                ORDER BY identifier
+            """)
+            self.audio_edition_rows = [dict(row) for row in cursor.fetchall()]
+            self.audio_editions: Dict[str, dict] = {e["identifier"]: e for e in self.audio_edition_rows}
+            self.editions_by_id: Dict[int, dict] = {e["id"]: e for e in self.edition_rows}
+
+            self.texts: Dict[str, EditionText] = {}
+            for edition in self.edition_rows:
+                cursor.execute("""
+                    SELECT id, number, number_in_surah, surah_id, text,
+                           juz, manzil, page, ruku, hizb_quarter, sajda
+                    FROM ayahs
+                    WHERE edition_id = ?
+                    ORDER BY number ASC
+                """, (edition["id"],))
+                self.texts[edition["identifier"]] = EditionText(
+                    edition["id"], edition["identifier"], cursor.fetchall()
+                )
+        finally:
+            conn.close()
+
+    # -------------------------------------------------------------------------
+    # Public API rows (same shape the SQLite-backed endpoints returned)
+    # -------------------------------------------------------------------------
+
+    def surah(self, surah_id: int) -> Optional[dict]:
+        """Return surah metadata, or None if the surah does not exist."""
+        return self.surahs.get(surah_id)
+
+    def edition(self, identifier: str) -> Optional[EditionText]:
+        """Return the columnar text for an edition, or None if unknown."""
+        return self.texts.get(identifier)
+
+    def surah_ayahs(self, identifier: str, surah_id: int) -> List[dict]:
+        """Return all ayahs of a surah for an edition."""
+        return self.texts[identifier].surah_rows(surah_id)
+
+    def parallel_ayahs(self, identifiers: List[str], surah_id: int, fields=PARALLEL_FIELDS) -> List[dict]:
+        """
+        Return one row per number_in_surah with the texts of several editions aligned.
+
+        Metadata (juz, page, ...) is taken from the first edition. `fields`
+        selects which optional columns are included.
+        """
+        texts = [self.texts[identifier] for identifier in identifiers]
+        primary = texts[0]
+        start, stop = primary.surah_ranges.get(surah_id, (0, 0))
+
+        # Editions share ayah numbering, so the same offset into each surah
+        # range lines up; fall back to matching on number_in_surah otherwise.
+        offsets = []
+        for text in texts:
+            t_start, t_stop = text.surah_ranges.get(surah_id, (0, 0))
+            if t_stop - t_start == stop - start:
+                offsets.append(t_start - start)
+            else:
+                offsets.append({
+                    text.numbers_in_surah[p]: p for p in range(t_start, t_stop)
+                })
+
+        meta_columns = [(c, primary.meta[c]) for c in AYAH_META_COLUMNS if c in fields]
+        include_ids = "ids" in fields
+        include_sajda = "sajda" in fields
+
+        rows = []
+        for position in range(start, stop):
+            number_in_surah = primary.numbers_in_surah[position]
+            row = {
+                "number": primary.numbers[position],
+                "number_in_surah": number_in_surah,
+                "texts": {},
+            }
+            ids = {}
+            for identifier, text, offset in zip(identifiers, texts, offsets):
+                if isinstance(offset, dict):
+                    p = offset.get(number_in_surah)
+                else:
+                    p = position + offset
+                row["texts"][identifier] = text.text(p) if p is not None else None
+                ids[identifier] = text.ids[p] if p is not None else None
+            if include_ids:
+                row["ids"] = ids
+            for column, values in meta_columns:
+                row[column] = values[position] or None
+            if include_sajda:
+                row["sajda"] = primary.sajda.get(position)
+            rows.append(row)
+        return rows
+
+    def public_editions(self) -> List[dict]:
+        """Editions list as exposed by /api/quran/editions (without internal ids)."""
+        return [{k: v for k, v in e.items() if k != "id"} for e in self.edition_rows]
+
+    # -------------------------------------------------------------------------
+    # Memory reporting
+    # -------------------------------------------------------------------------
+
+    def nbytes(self) -> int:
+        """Approximate size of the corpus in bytes."""
+        total = sum(text.nbytes() for text in self.texts.values())
+        for rows in (self.surah_list, self.edition_rows, self.audio_edition_rows):
+            total += object_bytes(rows)
+        return total
+
+    def stats(self) -> dict:
+        """Summary of corpus contents and memory footprint."""
+        return {
+            "version": self.version,
+            "surahs": len(self.surah_list),
+            "editions": len(self.texts),
+            "ayah_rows": sum(len(text) for text in self.texts.values()),
+            "corpus_bytes": self.nbytes(),
+            "process_rss_bytes": process_rss_bytes(),
+        }
+
+
+def file_signature(db_path) -> tuple:
+    """Cheap identity of the database file, used to detect it being swapped."""
+    st = os.stat(db_path)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def database_digest(db_path, chunk_size: int = 1024 * 1024) -> str:
+    """Short SHA-256 content hash of the database file."""
+    digest = hashlib.sha256()
+    with open(db_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def array_bytes(column: array.array) -> int:
+    """Size of an array's item buffer."""
+    return column.buffer_info()[1] * column.itemsize
+
+
+def object_bytes(value) -> int:
+    """Size of a dict/list/tuple including its keys and values, recursively."""
+    total = sys.getsizeof(value)
+    if isinstance(value, dict):
+        total += sum(object_bytes(k) + object_bytes(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        total += sum(object_bytes(item) for item in value)
+    return total
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of the current process, if it can be determined."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux, bytes on macOS
+        return rss if sys.platform == "darwin" else rss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+# =============================================================================
+# MODULE-LEVEL SINGLETON
+# =============================================================================
+
+# How often (seconds) get_corpus() checks whether quran.db was replaced
+RELOAD_CHECK_INTERVAL = float(os.environ.get("CORPUS_RELOAD_INTERVAL", "5"))
+
+_corpus: Optional[QuranCorpus] = None
+_corpus_path: Optional[Path] = None
+_corpus_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_last_check = 0.0
+_reload_listeners: List[Callable[[QuranCorpus], None]] = []
+
+
+def load_corpus(db_path) -> QuranCorpus:
+    """Build the corpus from the database and install it as the shared instance."""
+    global _corpus, _corpus_path, _last_check
+    corpus = QuranCorpus(db_path)
+    with _corpus_lock:
+        previous = _corpus
+        _corpus = corpus
+        _corpus_path = Path(db_path)
+        _last_check = time.monotonic()
+    if previous is not None:
+        for listener in list(_reload_listeners):
+            try:
+                listener(corpus)
+            except Exception as e:
+                print(f"⚠ Corpus reload listener failed: {e}")
+    return corpus
+
+
+def add_reload_listener(callback: Callable[[QuranCorpus], None]):
+    """Register a callback invoked with the new corpus after a hot reload."""
+    _reload_listeners.append(callback)
+
+
+def _reload(db_path, release: bool = False) -> bool:
+    """Rebuild and install the corpus; `release` hands back _reload_lock afterwards."""
+    try:
+        corpus = load_corpus(db_path)
+    except Exception as e:
+        print(f"⚠ Failed to reload Quran corpus: {e}")
+        return False
+    else:
+        print(f"✓ Quran corpus reloaded (version {corpus.version})")
+        return True
+    finally:
+        if release:
+            _reload_lock.release()
+
+
+def reload_if_changed(force: bool = False, wait: bool = True) -> bool:
+    """
+    Reload the corpus if quran.db was swapped on disk.
+
+    Only one thread rebuilds at a time; concurrent callers keep serving the
+    previous snapshot until the new one is installed. Without `wait` the
+    rebuild (a full load plus content hash) runs on a background thread and
+    True means it was started.
+    """
+    global _last_check
+    if _corpus is None or not _reload_lock.acquire(blocking=False):
+        return False
+    handed_off = False
+    try:
+        _last_check = time.monotonic()
+        try:
+            changed = file_signature(_corpus.db_path) != _corpus.signature
+        except OSError:
+            # File is mid-swap or missing; keep the current snapshot
+            return False
+        if not (changed or force):
+            return False
+        if wait:
+            return _reload(_corpus.db_path)
+        threading.Thread(
+            target=_reload, args=(_corpus.db_path, True), name="corpus-reload", daemon=True
+        ).start()
+        handed_off = True
+        return True
+    finally:
+        if not handed_off:
+            _reload_lock.release()
+
+
+def get_corpus(db_path=None) -> QuranCorpus:
+    """Return the shared corpus, loading it on first use if needed."""
+    if _corpus is not None:
+        if time.monotonic() - _last_check > RELOAD_CHECK_INTERVAL:
+            # Only a stat() on the request thread; any rebuild runs in the background
+            reload_if_changed(wait=False)
+        return _corpus
+    with _corpus_lock:
+        if _corpus is not None:
+            return _corpus
+        path = db_path or _corpus_path
+        if path is None:
+            raise RuntimeError("Quran corpus has not been loaded")
+    return load_corpus(path)
@@ -0,0 +1,196 @@
+"""
+Full-Quran Export
+
+Streams one or more complete editions from the in-memory corpus for offline
+clients, one surah per chunk so memory stays bounded regardless of how many
+editions are requested.
+
+Two formats are supported:
+
+ndjson
+    One JSON object per line. A header line comes first, then for every surah
+    a {"type": "surah", ...} line followed by one {"type": "ayah", ...} line
+    per ayah with the texts of all requested editions.
+
+pack
+    Compact binary layout (all integers little-endian):
+
+        b"QPK1"
+        u32 header length, then a UTF-8 JSON header
+            {"version", "editions", "surahs", "ayah_count", "record": "<HBHBBHHH"}
+        per ayah:
+            record  number(u16) surah(u8) number_in_surah(u16) juz(u8)
+                    manzil(u8) page(u16) hizb_quarter(u16) ruku(u16)
+            per edition (header order): u32 text length, UTF-8 text
+
+The byte stream for a given corpus version, edition list and format is
+deterministic, which is what lets interrupted downloads resume with Range.
+"""
+
+import hashlib
+import json
+import struct
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "pack": "application/octet-stream",
+}
+
+PACK_MAGIC = b"QPK1"
+PACK_RECORD = struct.Struct("<HBHBBHHH")
+PACK_LENGTH = struct.Struct("<I")
+
+# Per-surah chunk sizes are cached so Range requests can skip straight to the
+# right chunk without re-encoding everything before it.
+_SIZE_CACHE_LIMIT = 32
+_size_cache = {}
+_size_lock = threading.Lock()
+
+
+def export_etag(version: str, identifiers: List[str], fmt: str) -> str:
+    """Strong ETag for an export; the content is fully determined by these inputs."""
+    digest = hashlib.sha256(f"{fmt}:{','.join(identifiers)}".encode("utf-8")).hexdigest()[:12]
+    return f'"{version}-export-{digest}"'
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _header(corpus, identifiers: List[str], fmt: str) -> bytes:
+    texts = [corpus.edition(identifier) for identifier in identifiers]
+    header = {
+        "version": corpus.version,
+        "editions": [
+            {k: v for k, v in corpus.editions[identifier].items() if k != "id"}
+            for identifier in identifiers
+        ],
+        "ayah_count": len(texts[0]),
+    }
+    if fmt == "ndjson":
+        header["type"] = "header"
+        return _dumps(header) + b"\n"
+    header["surahs"] = corpus.surah_list
+    header["record"] = PACK_RECORD.format
+    encoded = _dumps(header)
+    return PACK_MAGIC + PACK_LENGTH.pack(len(encoded)) + encoded
+
+
+def _text_or_none(text, number: int) -> Optional[str]:
+    """An edition's text of an ayah, or None if the edition lacks it."""
+    position = text.position_of(number)
+    return None if position is None else text.text(position)
+
+
+def _surah_chunk(corpus, identifiers: List[str], surah_id: int, fmt: str) -> bytes:
+    texts = [corpus.edition(identifier) for identifier in identifiers]
+    primary = texts[0]
+    start, stop = primary.surah_ranges.get(surah_id, (0, 0))
+    meta = primary.meta
+    parts = []
+
+    if fmt == "ndjson":
+        parts.append(_dumps({"type": "surah", **corpus.surah(surah_id)}) + b"\n")
+        for position in range(start, stop):
+            parts.append(_dumps({
+                "type": "ayah",
+                "number": primary.numbers[position],
+                "surah_id": surah_id,
+                "number_in_surah": primary.numbers_in_surah[position],
+                "juz": meta["juz"][position] or None,
+                "page": meta["page"][position] or None,
+                "hizb_quarter": meta["hizb_quarter"][position] or None,
+                "texts": {
+                    identifier: _text_or_none(text, primary.numbers[position])
+                    for identifier, text in zip(identifiers, texts)
+                },
+            }) + b"\n")
+        return b"".join(parts)
+
+    for position in range(start, stop):
+        number = primary.numbers[position]
+        parts.append(PACK_RECORD.pack(
+            number,
+            surah_id,
+            primary.numbers_in_surah[position],
+            meta["juz"][position],
+            meta["manzil"][position],
+            meta["page"][position],
+            meta["hizb_quarter"][position],
+            meta["ruku"][position],
+        ))
+        for text in texts:
+            p = text.position_of(number)
+            if p is None:
+                parts.append(PACK_LENGTH.pack(0))
+                continue
+            raw = text.text_blob[text.text_offsets[p]:text.text_offsets[p + 1]]
+            parts.append(PACK_LENGTH.pack(len(raw)))
+            parts.append(raw)
+    return b"".join(parts)
+
+
+def iter_export(corpus, identifiers: List[str], fmt: str) -> Iterator[bytes]:
+    """Yield the export one chunk (header, then one surah) at a time."""
+    yield _header(corpus, identifiers, fmt)
+    for surah in corpus.surah_list:
+        yield _surah_chunk(corpus, identifiers, surah["id"], fmt)
+
+
+def export_chunk_sizes(corpus, identifiers: List[str], fmt: str) -> List[int]:
+    """Byte size of every chunk of an export (computed once per version/key)."""
+    key = (corpus.version, tuple(identifiers), fmt)
+    sizes = _size_cache.get(key)
+    if sizes is None:
+        sizes = [len(chunk) for chunk in iter_export(corpus, identifiers, fmt)]
+        with _size_lock:
+            if len(_size_cache) >= _SIZE_CACHE_LIMIT:
+                _size_cache.pop(next(iter(_size_cache)))
+            _size_cache[key] = sizes
+    return sizes
+
+
+def iter_export_range(corpus, identifiers: List[str], fmt: str, start: int, end: int) -> Iterator[bytes]:
+    """Yield bytes start..end (inclusive) of an export, skipping whole chunks before start."""
+    sizes = export_chunk_sizes(corpus, identifiers, fmt)
+    chunks = [lambda: _header(corpus, identifiers, fmt)] + [
+        (lambda sid: lambda: _surah_chunk(corpus, identifiers, sid, fmt))(s["id"])
+        for s in corpus.surah_list
+    ]
+
+    offset = 0
+    for size, make_chunk in zip(sizes, chunks):
+        chunk_start, chunk_end = offset, offset + size
+        offset = chunk_end
+        if chunk_end <= start:
+            continue
+        if chunk_start > end:
+            break
+        chunk = make_chunk()
+        yield chunk[max(start - chunk_start, 0):min(end + 1 - chunk_start, size)]
+
+
+def parse_range(header: Optional[str], total: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range `bytes=` header into inclusive (start, end).
+
+    Returns None when the header is absent or not a single byte range (the
+    caller then serves the full body), and raises ValueError when the range
+    is unsatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    if not (first.isdigit() or first == "") or not (last.isdigit() or last == ""):
+        return None
+    if first == "":
+        if not last or int(last) == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(total - int(last), 0), total - 1
+    start = int(first)
+    end = int(last) if last else total - 1
+    if start >= total or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, min(end, total - 1)
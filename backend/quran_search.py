@@ -0,0 +1,968 @@
+"""
+Quran Full-Text Search
+
+FTS5 query execution for /api/quran/search. Results are ranked with bm25()
+using per-column weights, and matched terms are marked up by FTS5's own
+highlight()/snippet() auxiliary functions so no Python post-processing of the
+ayah text is needed.
+
+Each distinct search runs its MATCH once: the ordered list of matching rowids
+is cached, and every page (by offset or keyset `after`) is then fetched by
+rowid with the edition and surah filters pushed into FTS5 as column filters.
+
+The FTS tables are built by quran-dump/create_fts_tables.py.
+"""
+
+import heapq
+import re
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+
+from arabic_text import normalize_arabic, light_stem, arabic_root
+
+SORT_OPTIONS = ("relevance", "mushaf")
+
+# text: FTS5 full-text; fuzzy: typo-tolerant term expansion;
+# root / stem: Arabic morphological posting lists
+SEARCH_MODES = ("text", "fuzzy", "root", "stem")
+MORPHOLOGY_MODES = ("root", "stem")
+
+# Edition whose text is returned for morphological (root/stem) matches
+ROOT_SEARCH_EDITION = "quran-uthmani"
+
+HIGHLIGHT_OPEN = "<mark>"
+HIGHLIGHT_CLOSE = "</mark>"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 24
+
+# Distinct searches whose full match lists are kept for paging
+DEFAULT_MATCH_LISTS = 512
+
+
+class SearchQueryError(ValueError):
+    """The search text is not a valid FTS5 query (e.g. an unbalanced quote)."""
+
+
+class SearchIndexMissing(RuntimeError):
+    """An offline-built search index has not been created in quran.db."""
+
+
+class FTSIndex:
+    """Description of one FTS5 table and how to rank and highlight it."""
+
+    def __init__(self, table: str, edition: str, columns: Tuple[str, ...],
+                 weights: Dict[str, float], match_column: str):
+        self.table = table
+        self.edition = edition
+        self.columns = columns
+        # User queries are confined to this column; highlights come from it too
+        self.match_column = match_column
+        # bm25() takes one weight per column, in declaration order; metadata
+        # columns get 0 so matches on numbers never influence relevance
+        self.weights = tuple(weights.get(column, 0.0) for column in columns)
+        self.highlight_index = columns.index(match_column)
+        self.text_index = columns.index("text")
+
+    @property
+    def match(self) -> str:
+        """WHERE clause for a match_expression() (filters, query) pair."""
+        return f"{self.table} MATCH ? AND {self.table}.{self.match_column} MATCH ?"
+
+    @property
+    def bm25(self) -> str:
+        return f"bm25({self.table}, {', '.join(str(w) for w in self.weights)})"
+
+    @property
+    def highlight(self) -> str:
+        return f"highlight({self.table}, {self.highlight_index}, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}')"
+
+    @property
+    def snippet(self) -> str:
+        return (
+            f"snippet({self.table}, {self.highlight_index}, '{HIGHLIGHT_OPEN}', "
+            f"'{HIGHLIGHT_CLOSE}', '{SNIPPET_ELLIPSIS}', {SNIPPET_TOKENS})"
+        )
+
+
+FTS_INDEXES = {
+    # Arabic queries are folded with arabic_text.normalize_arabic() and only
+    # ever matched against text_normalized, which was folded the same way
+    "ar": FTSIndex(
+        table="fts_arabic",
+        edition="quran-uthmani",
+        columns=("ayah_id", "ayah_number", "surah_id", "number_in_surah", "text", "text_normalized", "edition_id"),
+        weights={"text_normalized": 1.0},
+        match_column="text_normalized",
+    ),
+    "en": FTSIndex(
+        table="fts_english",
+        edition="en.sahih",
+        columns=("ayah_id", "ayah_number", "surah_id", "number_in_surah", "text", "edition_id"),
+        weights={"text": 1.0},
+        match_column="text",
+    ),
+}
+
+
+def project_highlight(original: str, highlighted: str) -> str:
+    """
+    Carry highlight marks from a normalized text back onto the original.
+
+    Arabic is matched against the folded column, so FTS5 marks up that
+    column. Folding never merges or splits words (standalone pause marks fold
+    to nothing and are skipped), so the marks map onto the Uthmani text word
+    for word.
+    """
+    if HIGHLIGHT_OPEN not in highlighted:
+        return original
+    original_words = original.split()
+    marked_words = iter(highlighted.split())
+    if len([w for w in original_words if normalize_arabic(w)]) != len(highlighted.split()):
+        return highlighted
+
+    out = []
+    inside = False
+    for word in original_words:
+        if not normalize_arabic(word):
+            out.append((word, inside))
+            continue
+        marked = next(marked_words)
+        hit = inside or HIGHLIGHT_OPEN in marked
+        if HIGHLIGHT_OPEN in marked:
+            inside = True
+        if HIGHLIGHT_CLOSE in marked:
+            inside = marked.rfind(HIGHLIGHT_OPEN) > marked.rfind(HIGHLIGHT_CLOSE)
+        out.append((word, hit))
+
+    parts = []
+    for i, (word, hit) in enumerate(out):
+        opens = hit and (i == 0 or not out[i - 1][1])
+        closes = hit and (i == len(out) - 1 or not out[i + 1][1])
+        parts.append(f"{HIGHLIGHT_OPEN if opens else ''}{word}{HIGHLIGHT_CLOSE if closes else ''}")
+    return " ".join(parts)
+
+
+def match_expression(index: FTSIndex, query: str, edition_id: int,
+                     surah_id: Optional[int] = None) -> Tuple[str, str]:
+    """
+    Build the two MATCH constraints of a search, (filters, query), for index.match.
+
+    The edition (and surah) are pushed into FTS5 as column filters: the
+    metadata columns are indexed, so they are resolved by intersecting
+    doclists instead of joining editions and filtering every matched row
+    afterwards. The user's query is bound on its own as a MATCH on the text
+    column, so FTS5 parses it separately and its operators or parentheses can
+    never widen the filters.
+    """
+    filters = f'edition_id : "{int(edition_id)}"'
+    if surah_id:
+        filters += f' AND surah_id : "{int(surah_id)}"'
+    return filters, query
+
+
+class MatchList:
+    """Every match for one search, in result order: rowids, ayah numbers, bm25 scores."""
+
+    __slots__ = ("rowids", "ayah_numbers", "scores", "_positions")
+
+    def __init__(self, rows):
+        self.rowids = array("q", (row[0] for row in rows))
+        self.ayah_numbers = array("H", (row[1] for row in rows))
+        self.scores = array("d", (row[2] for row in rows))
+        self._positions = None
+
+    def __len__(self):
+        return len(self.rowids)
+
+    def position_after(self, ayah_number: int, sort: str) -> int:
+        """Index of the first match after `ayah_number` (keyset pagination)."""
+        if sort == "mushaf":
+            return bisect_right(self.ayah_numbers, ayah_number)
+        if self._positions is None:
+            self._positions = {n: i for i, n in enumerate(self.ayah_numbers)}
+        position = self._positions.get(ayah_number)
+        return len(self) if position is None else position + 1
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.rowids, self.ayah_numbers, self.scores))
+
+
+def normalized_relevance(matches: MatchList) -> List[float]:
+    """
+    bm25 scores rescaled to (0, 1], 1 being the list's best match.
+
+    bm25 magnitudes depend on each table's statistics, so raw scores from
+    different editions or languages cannot be compared directly.
+    """
+    best = min(matches.scores, default=0.0)
+    if best >= 0:
+        return [1.0] * len(matches)
+    return [score / best for score in matches.scores]
+
+
+class MatchListCache:
+    """
+    LRU cache of match lists, so MATCH runs once per distinct search.
+
+    Paging then only seeks the page's rowids (or rowid range) in the index,
+    which keeps deep pages of common words as cheap as the first one.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MATCH_LISTS):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, MatchList]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, build) -> MatchList:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = build()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "entries": len(entries),
+            "bytes": sum(entry.nbytes() for entry in entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+match_lists = MatchListCache()
+
+
+def _match_list(cursor, index: FTSIndex, expression: Tuple[str, str], sort: str) -> MatchList:
+    order_by = "score, rowid" if sort == "relevance" else "ayah_number, rowid"
+
+    def build():
+        try:
+            cursor.execute(f"""
+                SELECT rowid, ayah_number, {index.bm25} as score
+                FROM {index.table}
+                WHERE {index.match}
+                ORDER BY {order_by}
+            """, expression)
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                raise
+            raise SearchQueryError(str(e))
+        return MatchList(cursor.fetchall())
+
+    return match_lists.get((index.table, expression, sort), build)
+
+
+def searchable_edition(corpus, identifier: str) -> Tuple[FTSIndex, dict]:
+    """Return the FTS index and edition row for an edition identifier."""
+    edition = corpus.editions.get(identifier)
+    if edition is None:
+        raise SearchQueryError(f"Edition '{identifier}' not found")
+    index = FTS_INDEXES.get(edition["language"])
+    if index is None:
+        raise SearchQueryError(f"Edition '{identifier}' is not searchable")
+    return index, edition
+
+
+def _fetch_rows(cursor, index: FTSIndex, expression: Tuple[str, str], rowids, contiguous: bool) -> Dict[int, sqlite3.Row]:
+    """Fetch highlighted rows for a page of rowids from one FTS table."""
+    # Mushaf pages are contiguous in rowid order, so a range scan of the
+    # doclists suffices; relevance pages are scattered and seeked by rowid.
+    if contiguous:
+        rowid_clause = "rowid BETWEEN ? AND ?"
+        rowid_params = [min(rowids), max(rowids)]
+    else:
+        rowid_clause = f"rowid IN ({', '.join('?' * len(rowids))})"
+        rowid_params = list(rowids)
+
+    cursor.execute(f"""
+        SELECT
+            rowid,
+            ayah_number,
+            surah_id,
+            number_in_surah,
+            text,
+            {index.highlight} as highlighted,
+            {index.snippet} as snippet,
+            {index.bm25} as score
+        FROM {index.table}
+        WHERE {index.match} AND {rowid_clause}
+    """, list(expression) + rowid_params)
+    return {row["rowid"]: row for row in cursor.fetchall()}
+
+
+def _edition_match(index: FTSIndex, edition: dict, row) -> dict:
+    """The per-edition part of a search result."""
+    highlighted = row["highlighted"]
+    if index.highlight_index != index.text_index:
+        highlighted = project_highlight(row["text"], highlighted)
+    return {
+        "text": row["text"],
+        "highlighted_text": highlighted,
+        "snippet": row["snippet"],
+        # bm25() is lower-is-better; flip it so clients see higher = more relevant
+        "score": round(-row["score"], 4),
+        "edition": edition["identifier"],
+        "edition_name": edition["name"] or "",
+        "language": edition["language"],
+    }
+
+
+def _ayah_fields(corpus, ayah_number: int, surah_id: int, number_in_surah: int) -> dict:
+    """The ayah/surah part of a search result."""
+    surah = corpus.surah(int(surah_id)) or {}
+    return {
+        "ayah_number": ayah_number,
+        "surah_id": surah_id,
+        "number_in_surah": number_in_surah,
+        "surah_name": surah.get("name") or "",
+        "surah_english_name": surah.get("english_name") or "",
+        "surah_english_name_translation": surah.get("english_name_translation") or "",
+    }
+
+
+def search_fts(
+    cursor,
+    corpus,
+    language: str,
+    query: str,
+    surah_id: Optional[int] = None,
+    sort: str = "relevance",
+    limit: int = 50,
+    offset: int = 0,
+    after: Optional[int] = None,
+    edition: Optional[str] = None,
+) -> Tuple[List[dict], int, Optional[int]]:
+    """
+    Run one FTS5 search against a single edition (default: the language's).
+
+    Pages are addressed either by offset or, with `after`, by the ayah number
+    of the last result already seen (keyset pagination).
+
+    Returns (results, total_count, next_after), where next_after is the
+    ayah number to pass as `after` for the next page, or None on the last page.
+    """
+    identifier = edition or FTS_INDEXES[language].edition
+    if identifier not in corpus.editions:
+        return [], 0, None
+    index, edition_row = searchable_edition(corpus, identifier)
+
+    expression = match_expression(index, query, edition_row["id"], surah_id)
+    matches = _match_list(cursor, index, expression, sort)
+    start = matches.position_after(after, sort) if after is not None else offset
+    page = matches.rowids[start:start + limit]
+    if not page:
+        return [], len(matches), None
+
+    rows = _fetch_rows(cursor, index, expression, page, contiguous=sort == "mushaf")
+    results = []
+    for rowid in page:
+        row = rows.get(rowid)
+        if row is None:
+            continue
+        results.append({
+            **_ayah_fields(corpus, row["ayah_number"], row["surah_id"], row["number_in_surah"]),
+            **_edition_match(index, edition_row, row),
+        })
+
+    next_after = results[-1]["ayah_number"] if results and start + limit < len(matches) else None
+    return results, len(matches), next_after
+
+
+# =============================================================================
+# MULTI-EDITION SEARCH
+# =============================================================================
+# Every edition is searched through its own edition_id column filter, so each
+# one only walks its own doclists (the FTS data is effectively partitioned by
+# edition). The per-edition match lists are then grouped by ayah: one verse
+# matching in three translations is one result carrying three matches.
+
+class GroupedMatches:
+    """Ayah numbers matching in any of several editions, in result order."""
+
+    __slots__ = ("ayah_numbers", "rowids", "_positions")
+
+    def __init__(self, per_edition: Dict[str, MatchList], sort: str):
+        # rowids[edition][ayah_number] -> FTS rowid of that edition's match
+        self.rowids: Dict[str, Dict[int, int]] = {}
+        best: Dict[int, float] = {}
+        for identifier, matches in per_edition.items():
+            self.rowids[identifier] = dict(zip(matches.ayah_numbers, matches.rowids))
+            for number, relevance in zip(matches.ayah_numbers, normalized_relevance(matches)):
+                if relevance > best.get(number, -1.0):
+                    best[number] = relevance
+        if sort == "relevance":
+            ordered = sorted(best, key=lambda number: (-best[number], number))
+        else:
+            ordered = sorted(best)
+        self.ayah_numbers = array("H", ordered)
+        self._positions = None
+
+    def __len__(self):
+        return len(self.ayah_numbers)
+
+    position_after = MatchList.position_after
+
+    def nbytes(self) -> int:
+        return (self.ayah_numbers.itemsize * len(self.ayah_numbers)
+                + sum(len(rowids) * 16 for rowids in self.rowids.values()))
+
+
+def search_editions(
+    cursor,
+    corpus,
+    identifiers: List[str],
+    query: str,
+    surah_id: Optional[int] = None,
+    sort: str = "relevance",
+    limit: int = 50,
+    offset: int = 0,
+    after: Optional[int] = None,
+    expressions: Optional[Dict[str, str]] = None,
+) -> Tuple[List[dict], int, Optional[int]]:
+    """
+    Search several editions at once, grouping matches by ayah.
+
+    Each result carries the ayah fields plus `matches`, one entry (text,
+    highlighted_text, snippet, score) per edition the ayah matched in. Arabic
+    editions get the query folded with normalize_arabic(). `expressions` may
+    supply a prepared query per language (used by fuzzy mode). Either way the
+    query is bound per edition as its own MATCH on the text column (see
+    match_expression()), so it cannot reach another edition's rows.
+
+    Relevance order ranks each ayah by its best bm25, normalized per edition
+    so scores from different tables are comparable.
+    """
+    editions = [searchable_edition(corpus, identifier) for identifier in identifiers]
+    prepared = {}
+    for index, edition in editions:
+        language = edition["language"]
+        if expressions and language in expressions:
+            text_query = expressions[language]
+        else:
+            text_query = normalize_arabic(query) if language == "ar" else query
+        prepared[edition["identifier"]] = (
+            index, edition, match_expression(index, text_query, edition["id"], surah_id)
+        )
+
+    def build():
+        return GroupedMatches(
+            {identifier: _match_list(cursor, index, expression, sort)
+             for identifier, (index, _, expression) in prepared.items()},
+            sort,
+        )
+
+    key = ("editions", sort) + tuple(expression for _, _, expression in prepared.values())
+    grouped = match_lists.get(key, build)
+    start = grouped.position_after(after, sort) if after is not None else offset
+    page = grouped.ayah_numbers[start:start + limit]
+    if not page:
+        return [], len(grouped), None
+
+    results = {number: None for number in page}
+    for identifier, (index, edition, expression) in prepared.items():
+        rowids = [grouped.rowids[identifier][n] for n in page if n in grouped.rowids[identifier]]
+        if not rowids:
+            continue
+        rows = _fetch_rows(cursor, index, expression, rowids, contiguous=sort == "mushaf")
+        for row in rows.values():
+            number = row["ayah_number"]
+            if number not in results:
+                continue
+            if results[number] is None:
+                results[number] = {
+                    **_ayah_fields(corpus, number, row["surah_id"], row["number_in_surah"]),
+                    "score": 0.0,
+                    "matches": [],
+                }
+            match = _edition_match(index, edition, row)
+            results[number]["matches"].append(match)
+
+    # Matches are listed in the order the editions were requested
+    order = {identifier: i for i, identifier in enumerate(prepared)}
+    ordered = []
+    for number in page:
+        result = results[number]
+        if result is None:
+            continue
+        result["matches"].sort(key=lambda match: order[match["edition"]])
+        result["score"] = max(match["score"] for match in result["matches"])
+        ordered.append(result)
+
+    next_after = page[-1] if start + limit < len(grouped) else None
+    return ordered, len(grouped), next_after
+
+
+# =============================================================================
+# MERGED ARABIC + ENGLISH SEARCH (language=all)
+# =============================================================================
+# The Arabic and English MATCH queries run concurrently, each on its own pooled
+# connection, and their match lists are k-way merged into one stream (by
+# normalized bm25, or by mushaf order with Arabic before English). The merged
+# stream is cached like any match list, so totals are exact and pages are
+# addressed by offset or by a "<language>:<ayah>" keyset cursor.
+
+MERGED_LANGUAGES = ("ar", "en")
+
+# Threads are only started on first use, so this is safe under gunicorn --preload
+_merge_executor = ThreadPoolExecutor(max_workers=2 * len(MERGED_LANGUAGES), thread_name_prefix="search-merge")
+
+
+def merged_cursor(language: str, ayah_number: int) -> str:
+    """Keyset cursor for a position in the merged stream."""
+    return f"{language}:{ayah_number}"
+
+
+def parse_merged_cursor(cursor: str) -> Tuple[str, int]:
+    """Parse a merged-stream cursor, raising SearchQueryError if malformed."""
+    language, _, number = cursor.partition(":")
+    if language not in MERGED_LANGUAGES or not number.isdigit():
+        raise SearchQueryError(f"Invalid cursor '{cursor}' (expected e.g. 'ar:255')")
+    return language, int(number)
+
+
+class MergedMatches:
+    """The merged result stream of several languages' match lists."""
+
+    __slots__ = ("languages", "sources", "rowids", "ayah_numbers", "_positions")
+
+    def __init__(self, per_language: Dict[str, MatchList], sort: str):
+        self.languages = tuple(per_language)
+        streams = []
+        for source, matches in enumerate(per_language.values()):
+            if sort == "relevance":
+                keys = ((-relevance, source) for relevance in normalized_relevance(matches))
+            else:
+                keys = ((number, source) for number in matches.ayah_numbers)
+            streams.append(zip(keys, matches.rowids, matches.ayah_numbers, repeat(source)))
+
+        # Each list is already in result order, so a heap merge keeps it linear
+        merged = list(heapq.merge(*streams, key=lambda entry: entry[0]))
+        self.rowids = array("q", (entry[1] for entry in merged))
+        self.ayah_numbers = array("H", (entry[2] for entry in merged))
+        self.sources = array("B", (entry[3] for entry in merged))
+        self._positions = None
+
+    def __len__(self):
+        return len(self.rowids)
+
+    def position_after(self, language: str, ayah_number: int) -> int:
+        """Index of the first entry after (language, ayah_number)."""
+        if self._positions is None:
+            self._positions = {
+                (source, number): i
+                for i, (source, number) in enumerate(zip(self.sources, self.ayah_numbers))
+            }
+        if language not in self.languages:
+            return len(self)
+        position = self._positions.get((self.languages.index(language), ayah_number))
+        return len(self) if position is None else position + 1
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.rowids, self.ayah_numbers, self.sources))
+
+
+def _with_connection(connect, work):
+    """Run work(cursor) on a connection of its own, returning it afterwards."""
+    conn = connect()
+    try:
+        return work(conn.cursor())
+    finally:
+        conn.close()
+
+
+def search_merged(
+    connect,
+    corpus,
+    queries: Dict[str, str],
+    surah_id: Optional[int] = None,
+    sort: str = "relevance",
+    limit: int = 50,
+    offset: int = 0,
+    after: Optional[str] = None,
+) -> Tuple[List[dict], int, Optional[str]]:
+    """
+    Search several languages' default editions as one merged, paginated stream.
+
+    `queries` maps language to its prepared query (Arabic already normalized);
+    `connect` returns a pooled connection, one per concurrent query. Results
+    have the same shape as search_fts(). Returns (results, total_count,
+    next_after), next_after being a merged_cursor() string.
+    """
+    prepared = {}
+    for language, query in queries.items():
+        index = FTS_INDEXES[language]
+        edition = corpus.editions.get(index.edition)
+        if edition is not None:
+            prepared[language] = (index, edition, match_expression(index, query, edition["id"], surah_id))
+
+    def build():
+        futures = {
+            language: _merge_executor.submit(
+                _with_connection, connect,
+                lambda cursor, index=index, expression=expression: _match_list(cursor, index, expression, sort),
+            )
+            for language, (index, _, expression) in prepared.items()
+        }
+        return MergedMatches({language: future.result() for language, future in futures.items()}, sort)
+
+    key = ("merged", sort) + tuple(expression for _, _, expression in prepared.values())
+    merged = match_lists.get(key, build)
+    start = merged.position_after(*parse_merged_cursor(after)) if after is not None else offset
+    stop = min(start + limit, len(merged))
+    if start >= stop:
+        return [], len(merged), None
+
+    page_rowids = {language: [] for language in merged.languages}
+    for i in range(start, stop):
+        page_rowids[merged.languages[merged.sources[i]]].append(merged.rowids[i])
+
+    futures = {
+        language: _merge_executor.submit(
+            _with_connection, connect,
+            lambda cursor, index=prepared[language][0], expression=prepared[language][2], rowids=rowids:
+                _fetch_rows(cursor, index, expression, rowids, contiguous=sort == "mushaf"),
+        )
+        for language, rowids in page_rowids.items() if rowids
+    }
+    rows = {language: future.result() for language, future in futures.items()}
+
+    results = []
+    for i in range(start, stop):
+        language = merged.languages[merged.sources[i]]
+        row = rows[language].get(merged.rowids[i])
+        if row is None:
+            continue
+        index, edition, _ = prepared[language]
+        results.append({
+            **_ayah_fields(corpus, row["ayah_number"], row["surah_id"], row["number_in_surah"]),
+            **_edition_match(index, edition, row),
+        })
+
+    next_after = None
+    if stop < len(merged):
+        next_after = merged_cursor(merged.languages[merged.sources[stop - 1]], merged.ayah_numbers[stop - 1])
+    return results, len(merged), next_after
+
+
+# =============================================================================
+# ARABIC ROOT / STEM SEARCH
+# =============================================================================
+# Built offline by quran-dump/create_root_index.py:
+#   arabic_token_roots(token, stem, root)   normalized token -> stem and root
+#   arabic_postings(kind, key, ayah_count, postings)
+#       kind is 'root' or 'stem'; postings is the sorted ayah numbers holding
+#       the key, delta-encoded as unsigned LEB128 varints.
+# Queries intersect the postings of every query word; FTS is not involved.
+
+def encode_postings(numbers) -> bytes:
+    """Delta + varint encode a sorted sequence of ayah numbers."""
+    out = bytearray()
+    previous = 0
+    for number in numbers:
+        delta = number - previous
+        previous = number
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_postings(blob: bytes) -> array:
+    """Decode encode_postings() output back into sorted ayah numbers."""
+    numbers = array("H")
+    value = shift = 0
+    previous = 0
+    for byte in blob:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        numbers.append(previous)
+        value = shift = 0
+    return numbers
+
+
+def intersect_postings(lists: List[array]) -> array:
+    """Intersect sorted posting lists, smallest first, galloping through the rest."""
+    lists = sorted(lists, key=len)
+    result = lists[0]
+    for other in lists[1:]:
+        merged = array("H")
+        lo = 0
+        for number in result:
+            lo = bisect_left(other, number, lo)
+            if lo == len(other):
+                break
+            if other[lo] == number:
+                merged.append(number)
+        result = merged
+        if not result:
+            break
+    return result
+
+
+def _token_keys(cursor, tokens: List[str], kind: str) -> Dict[str, str]:
+    """Map normalized tokens to their root/stem, preferring the offline table."""
+    keys = {}
+    try:
+        cursor.execute(
+            f"SELECT token, {kind} FROM arabic_token_roots WHERE token IN ({', '.join('?' * len(tokens))})",
+            tokens,
+        )
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            raise SearchIndexMissing("Arabic root index not built (run quran-dump/create_root_index.py)")
+        raise
+    for token, key in cursor.fetchall():
+        keys[token] = key
+    derive = arabic_root if kind == "root" else light_stem
+    for token in tokens:
+        if token not in keys:
+            keys[token] = derive(token)
+    return keys
+
+
+def search_roots(
+    cursor,
+    corpus,
+    query: str,
+    kind: str = "root",
+    surah_id: Optional[int] = None,
+    limit: int = 50,
+    offset: int = 0,
+    after: Optional[int] = None,
+) -> Tuple[List[dict], int, Optional[int]]:
+    """
+    Find ayahs containing every query word's root (or light stem).
+
+    Results are in mushaf order; score is the number of matching words in
+    the ayah. Same return shape as search_fts().
+    """
+    text = corpus.edition(ROOT_SEARCH_EDITION)
+    edition = corpus.editions.get(ROOT_SEARCH_EDITION)
+    if text is None:
+        return [], 0, None
+
+    tokens = sorted(set(normalize_arabic(query).split()))
+    if not tokens:
+        raise SearchQueryError("Query has no Arabic words")
+    query_keys = _token_keys(cursor, tokens, kind)
+    wanted = sorted(set(query_keys.values()))
+
+    def build():
+        cursor.execute(
+            f"SELECT key, postings FROM arabic_postings WHERE kind = ? AND key IN ({', '.join('?' * len(wanted))})",
+            [kind] + wanted,
+        )
+        postings = {key: decode_postings(blob) for key, blob in cursor.fetchall()}
+        if len(postings) < len(wanted):
+            numbers = array("H")
+        else:
+            numbers = intersect_postings(list(postings.values()))
+        if surah_id:
+            first, stop = text.surah_ranges.get(surah_id, (0, 0))
+            if first == stop:
+                numbers = array("H")
+            else:
+                lo = bisect_left(numbers, text.numbers[first])
+                hi = bisect_right(numbers, text.numbers[stop - 1])
+                numbers = numbers[lo:hi]
+        return MatchList([(n, n, 0.0) for n in numbers])
+
+    matches = match_lists.get((kind, tuple(wanted), surah_id or None, "mushaf"), build)
+    start = matches.position_after(after, "mushaf") if after is not None else offset
+    page = matches.ayah_numbers[start:start + limit]
+    if not page:
+        return [], len(matches), None
+
+    # Mark every word of the page whose root/stem is one of the query's
+    page = [number for number in page if text.position_of(number) is not None]
+    positions = [text.position_of(number) for number in page]
+    ayah_texts = [text.text(p) for p in positions]
+    words = sorted({normalize_arabic(w) for t in ayah_texts for w in t.split()} - {""})
+    word_keys = _token_keys(cursor, words, kind) if words else {}
+    targets = set(wanted)
+
+    results = []
+    for number, position, ayah_text in zip(page, positions, ayah_texts):
+        parts = []
+        hits = 0
+        for word in ayah_text.split():
+            if word_keys.get(normalize_arabic(word)) in targets:
+                parts.append(f"{HIGHLIGHT_OPEN}{word}{HIGHLIGHT_CLOSE}")
+                hits += 1
+            else:
+                parts.append(word)
+        highlighted = " ".join(parts)
+        surah = corpus.surah(text.surah_ids[position]) or {}
+        results.append({
+            "ayah_number": number,
+            "surah_id": text.surah_ids[position],
+            "number_in_surah": text.numbers_in_surah[position],
+            "surah_name": surah.get("name") or "",
+            "surah_english_name": surah.get("english_name") or "",
+            "surah_english_name_translation": surah.get("english_name_translation") or "",
+            "text": ayah_text,
+            "highlighted_text": highlighted,
+            "snippet": highlighted,
+            "score": hits,
+            "edition": edition["identifier"],
+            "edition_name": edition["name"] or "",
+            "language": edition["language"],
+        })
+
+    next_after = page[-1] if page and start + limit < len(matches) else None
+    return results, len(matches), next_after
+
+
+# =============================================================================
+# FUZZY SEARCH
+# =============================================================================
+# Typo tolerance works on the vocabulary, not the ayahs: fts_terms (built by
+# quran-dump/create_fts_tables.py with the FTS5 trigram tokenizer) holds every
+# distinct word of en.sahih and of the normalized Uthmani text. Each query word
+# is expanded to the vocabulary terms most similar to it, then the ordinary
+# FTS search runs with those terms OR-ed together.
+
+# Terms pulled from fts_terms per query word before similarity scoring
+FUZZY_CANDIDATE_BUDGET = 200
+# Expansions kept per query word, and the least trigram similarity accepted
+FUZZY_MAX_EXPANSIONS = 5
+FUZZY_MIN_SIMILARITY = 0.35
+
+# Transliteration / name variants -> spelling used in the indexed text.
+# English keys expand within en.sahih; Arabic keys (modern spelling) expand
+# to the Uthmani rasm as folded by normalize_arabic().
+NAME_VARIANTS = {
+    "en": {
+        "ibrahim": ["abraham"], "musa": ["moses"], "isa": ["jesus"],
+        "nuh": ["noah"], "yusuf": ["joseph"], "dawud": ["david"],
+        "dawood": ["david"], "sulayman": ["solomon"], "suleiman": ["solomon"],
+        "yaqub": ["jacob"], "ishaq": ["isaac"], "ismail": ["ishmael"],
+        "harun": ["aaron"], "yunus": ["jonah"], "ayyub": ["job"],
+        "lut": ["lot"], "idris": ["idrees"], "zakariya": ["zechariah"],
+        "yahya": ["john"], "maryam": ["mary"], "firawn": ["pharaoh"],
+        "firaun": ["pharaoh"], "jibril": ["gabriel"], "jibreel": ["gabriel"],
+        "mikail": ["michael"], "shaytan": ["satan"], "shaitan": ["satan"],
+        "jannah": ["paradise", "garden"], "jahannam": ["hell"],
+        "salah": ["prayer"], "salat": ["prayer"], "zakah": ["zakah", "charity"],
+        "sabr": ["patience"], "rahma": ["mercy"], "rahmah": ["mercy"],
+    },
+    "ar": {
+        "ابراهيم": ["ابرهيم"], "اسماعيل": ["اسمعيل"], "اسحاق": ["اسحق"],
+        "سليمان": ["سليمن"], "هارون": ["هرون"], "لقمان": ["لقمن"],
+        "الصلاه": ["الصلوه"], "الزكاه": ["الزكوه"], "الحياه": ["الحيوه"],
+        "الرحمان": ["الرحمن"],
+    },
+}
+
+_WORD = re.compile(r"\w+")
+
+
+def quote_term(term: str) -> str:
+    """An FTS5 string literal matching `term` as a plain term."""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def trigrams(word: str) -> set:
+    """Padded character trigrams of a word (pg_trgm style)."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of two words' trigram sets."""
+    ga, gb = trigrams(a), trigrams(b)
+    return len(ga & gb) / len(ga | gb)
+
+
+def fuzzy_expansions(cursor, language: str, word: str) -> List[Tuple[str, float]]:
+    """Vocabulary terms similar to `word`, best first, as (term, similarity)."""
+    expansions = {variant: 1.0 for variant in NAME_VARIANTS[language].get(word, [])}
+    # The trigram tokenizer only indexes substrings of three characters or more
+    inner = {word[i:i + 3] for i in range(len(word) - 2)}
+    if inner:
+        try:
+            cursor.execute(
+                """
+                SELECT term FROM fts_terms
+                WHERE fts_terms MATCH ? AND language = ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (" OR ".join(quote_term(gram) for gram in sorted(inner)), language, FUZZY_CANDIDATE_BUDGET),
+            )
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                raise SearchIndexMissing("Fuzzy term index not built (run quran-dump/create_fts_tables.py)")
+            raise
+        for (term,) in cursor.fetchall():
+            similarity = trigram_similarity(word, term)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                expansions[term] = max(similarity, expansions.get(term, 0.0))
+    expansions.setdefault(word, trigram_similarity(word, word))
+    ranked = sorted(expansions.items(), key=lambda item: (-item[1], item[0]))
+    return [(term, round(similarity, 3)) for term, similarity in ranked[:FUZZY_MAX_EXPANSIONS]]
+
+
+def fuzzy_expression(cursor, language: str, query: str) -> Tuple[str, Dict[str, List[Tuple[str, float]]]]:
+    """Build the FTS5 expression for a fuzzy query: an AND of per-word OR groups."""
+    words = list(dict.fromkeys(_WORD.findall(query.lower())))
+    if not words:
+        raise SearchQueryError("Query has no words")
+
+    expansions = {word: fuzzy_expansions(cursor, language, word) for word in words}
+    expression = " AND ".join(
+        "(" + " OR ".join(quote_term(term) for term, _ in terms) + ")"
+        for terms in expansions.values()
+    )
+    return expression, expansions
+
+
+def search_fuzzy(
+    cursor,
+    corpus,
+    language: str,
+    query: str,
+    surah_id: Optional[int] = None,
+    sort: str = "relevance",
+    limit: int = 50,
+    offset: int = 0,
+    after: Optional[int] = None,
+) -> Tuple[List[dict], int, Optional[int], Dict[str, List[Tuple[str, float]]]]:
+    """
+    Typo-tolerant search: expand every query word, then run search_fts().
+
+    Each word becomes an OR group of its most similar vocabulary terms (plus
+    name variants); groups are AND-ed. Returns search_fts()'s tuple plus the
+    expansions used, {word: [(term, similarity), ...]}.
+    """
+    expression, expansions = fuzzy_expression(cursor, language, query)
+    results, total_count, next_after = search_fts(
+        cursor, corpus, language, expression, surah_id, sort, limit, offset, after
+    )
+    return results, total_count, next_after, expansions
@@ -0,0 +1,290 @@
+"""
+Pre-serialized Response Cache
+
+Caches the JSON bodies of the static Quran endpoints as bytes, built once per
+(endpoint, surah, edition) key and optionally pre-compressed with gzip and
+brotli. Responses carry strong ETags derived from the quran.db content hash,
+so clients revalidating with If-None-Match get a bodiless 304.
+
+SearchResultCache holds serialized search result pages in an LRU with a TTL
+and a byte budget, since search keys are open-ended unlike the static payloads.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Long-lived caching: the payloads only change when quran.db is replaced,
+# and the ETag lets clients revalidate cheaply after max-age expires.
+CACHE_CONTROL = "public, max-age=604800, stale-while-revalidate=86400"
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+# 114 surahs x a handful of editions fits easily; the bound only matters for
+# endpoints whose keys include client-chosen combinations (e.g. /parallel)
+DEFAULT_MAX_ENTRIES = 4096
+
+# Search result pages: total serialized size kept and how long a page lives
+SEARCH_CACHE_MAX_BYTES = int(os.environ.get("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", "3600"))
+
+# Rough per-entry bookkeeping cost (key, tuple, dict slot) counted against the budget
+ENTRY_OVERHEAD_BYTES = 256
+
+
+def encode_json(content) -> bytes:
+    """Serialize content the same way FastAPI's JSONResponse does."""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class CachedBody:
+    """A serialized JSON body and its pre-compressed variants."""
+
+    __slots__ = ("identity", "gzip", "br", "etag")
+
+    def __init__(self, body: bytes, version: str, compress: bool = True):
+        self.identity = body
+        self.gzip = None
+        self.br = None
+        if compress and len(body) >= MIN_COMPRESS_BYTES:
+            self.gzip = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.br = brotli.compress(body, quality=11)
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        self.etag = f'"{version}-{digest}"'
+
+    def nbytes(self) -> int:
+        return sum(len(b) for b in (self.identity, self.gzip, self.br) if b)
+
+    def select(self, accept_encoding: str):
+        """Pick the best available encoding for an Accept-Encoding header."""
+        accepted = parse_accept_encoding(accept_encoding)
+        if self.br is not None and accepted.get("br", 0) > 0:
+            return self.br, "br"
+        if self.gzip is not None and accepted.get("gzip", 0) > 0:
+            return self.gzip, "gzip"
+        return self.identity, None
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """Strong ETags must differ per content-coding, so suffix encoded variants."""
+        return f'{self.etag[:-1]}-{encoding}"' if encoding else self.etag
+
+    def etags(self):
+        return {self.etag, self.etag_for("gzip"), self.etag_for("br")}
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    if "*" in accepted:
+        for coding in ("br", "gzip"):
+            accepted.setdefault(coding, accepted["*"])
+    return accepted
+
+
+def etag_matches(if_none_match: Optional[str], etags) -> bool:
+    """Weak comparison of an If-None-Match header against a set of ETags."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+
+class ResponseCache:
+    """Thread-safe cache of pre-serialized responses, invalidated on DB version change."""
+
+    def __init__(self, compress: bool = True, cache_control: str = CACHE_CONTROL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.compress = compress
+        self.max_entries = max_entries
+        self.cache_control = cache_control
+        self.version: Optional[str] = None
+        self._entries: Dict[Hashable, CachedBody] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: Hashable, build: Callable[[], object], version: str) -> CachedBody:
+        """Return the cached body for key, building it once if missing."""
+        if version != self.version:
+            self.clear(version)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                entry = CachedBody(encode_json(build()), version, self.compress)
+                if len(self._entries) >= self.max_entries:
+                    # Evict the oldest entry (dicts keep insertion order)
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[key] = entry
+            else:
+                self.hits += 1
+        return entry
+
+    def response(self, request: Request, key: Hashable, build: Callable[[], object], version: str) -> Response:
+        """Serve a cached body, honouring If-None-Match and Accept-Encoding."""
+        entry = self.get(key, build, version)
+        body, encoding = entry.select(request.headers.get("accept-encoding", ""))
+        headers = {
+            "ETag": entry.etag_for(encoding),
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+
+        # Any variant of the same entity is fresh; the body is identical once decoded
+        if etag_matches(request.headers.get("if-none-match"), entry.etags()):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def clear(self, version: Optional[str] = None):
+        """Drop all cached bodies and adopt a new DB version."""
+        with self._lock:
+            self._entries = {}
+            self.version = version
+
+    def stats(self) -> dict:
+        entries = list(self._entries.values())
+        return {
+            "version": self.version,
+            "entries": len(entries),
+            "bytes": sum(entry.nbytes() for entry in entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "brotli": brotli is not None,
+        }
+
+
+class SearchResultCache:
+    """
+    LRU/TTL cache of serialized search result pages within a byte budget.
+
+    Entries are (body, meta) pairs: the JSON-encoded results array and the
+    small dict of counts needed to assemble the response around it. The whole
+    cache is dropped when the DB version changes.
+    """
+
+    def __init__(self, max_bytes: int = SEARCH_CACHE_MAX_BYTES, ttl: float = SEARCH_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes, dict]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, build: Callable[[], Tuple[bytes, dict]], version: str) -> Tuple[bytes, dict]:
+        """Return the cached (body, meta) for key, building and storing it on a miss."""
+        if version != self.version:
+            self.clear(version)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, body, meta = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body, meta
+                self._remove(key)
+                self.expired += 1
+            self.misses += 1
+
+        body, meta = build()
+        size = len(body) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return body, meta
+
+        with self._lock:
+            if self.version != version:
+                # The DB was swapped while this page was being built
+                return body, meta
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (now + self.ttl, body, meta)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return body, meta
+
+    def _remove(self, key: Hashable):
+        _, body, _ = self._entries.pop(key)
+        self._bytes -= len(body) + ENTRY_OVERHEAD_BYTES
+
+    def clear(self, version: Optional[str] = None):
+        """Drop all cached pages and adopt a new DB version."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.version = version
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,566 @@
+"""
+Semantic Search Index
+
+Nearest-neighbour search over the ayah embeddings in the `ayah_embeddings`
+table (see archive/generate_embeddings.py), without touching SQLite per row.
+
+All vectors are loaded once into one contiguous float32 matrix, L2-normalized
+up front so cosine similarity is a plain dot product. A query is then scored
+against every ayah with a single matrix-vector product, language and surah
+filters are boolean masks over the rows, and the top k are picked with
+argpartition. Text and surah metadata are joined for those k rows only.
+
+The matrix is cached next to quran.db as a .npy file and memory-mapped, so
+startup skips decoding thousands of BLOBs and the pages are shared between
+processes; the cache is rebuilt whenever the database version changes.
+An optional IVF index (built offline by archive/build_ann_index.py) narrows
+each query to a few clusters once the corpus is too large to score in full.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings import bytes_to_embedding, quantize_int8
+
+# Cache files written next to quran.db: <stem>.semantic.npy / <stem>.semantic.npz
+INDEX_SUFFIX = ".semantic"
+
+# IVF index files next to quran.db: <stem>.ivf.json plus one .npy per array
+ANN_SUFFIX = ".ivf"
+ANN_ARRAYS = ("centroids", "vectors", "rows", "offsets")
+DEFAULT_NPROBE = 8
+KMEANS_ITERATIONS = 20
+# Filters leaving this many rows or fewer are scored exactly instead
+ANN_MIN_CANDIDATES = 2048
+
+# Matrix used for brute-force scoring: float32 (exact), float16 or int8.
+# Quantized scores only pick RERANK_FACTOR * k candidates, which are then
+# re-ranked with the float32 rows (read from the memory-mapped .npy on demand).
+QUANTIZATIONS = ("float32", "float16", "int8")
+QUANTIZATION = os.environ.get("SEMANTIC_QUANTIZATION", "float32")
+RERANK_FACTOR = 4
+SCORE_BLOCK_ROWS = 4096
+
+
+def index_paths(db_path) -> Tuple[Path, Path]:
+    """Paths of the cached vector matrix (.npy) and its row metadata (.npz)."""
+    db_path = Path(db_path)
+    return db_path.with_suffix(INDEX_SUFFIX + ".npy"), db_path.with_suffix(INDEX_SUFFIX + ".npz")
+
+
+def quantized_paths(db_path, quantization: str) -> Tuple[Path, Path]:
+    """Paths of the cached quantized matrix and (int8 only) its per-vector scales."""
+    db_path = Path(db_path)
+    return (db_path.with_suffix(f"{INDEX_SUFFIX}.{quantization}.npy"),
+            db_path.with_suffix(f"{INDEX_SUFFIX}.{quantization}.scales.npy"))
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale every row to unit length (zero rows stay zero)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class SemanticIndex:
+    """Row-aligned embedding matrix plus the columns needed to filter it."""
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        ayah_ids: np.ndarray,
+        surah_ids: np.ndarray,
+        languages: np.ndarray,
+        language_names: Tuple[str, ...],
+        version: str = "",
+        model: str = "",
+    ):
+        self.vectors = vectors
+        self.ayah_ids = ayah_ids
+        self.surah_ids = surah_ids
+        self.languages = languages
+        self.language_names = tuple(language_names)
+        self.version = version
+        # Model that produced the vectors ("" for rows stored before it was recorded)
+        self.model = model
+        # Optional IVFIndex over the same rows (see load_semantic_index)
+        self.ann: Optional["IVFIndex"] = None
+        # Quantized copy of `vectors` used for scoring (see quantize())
+        self.quantization = "float32"
+        self.codes: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self._language_masks = {
+            name: languages == code for code, name in enumerate(self.language_names)
+        }
+
+    def __len__(self):
+        return len(self.ayah_ids)
+
+    @property
+    def dimensions(self) -> int:
+        return self.vectors.shape[1] if self.vectors.ndim == 2 else 0
+
+    # -------------------------------------------------------------------------
+    # Building and persistence
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def from_database(cls, conn, version: str = "", model: Optional[str] = None) -> "SemanticIndex":
+        """
+        Decode every stored embedding into a normalized matrix.
+
+        With `model`, only that model's rows are loaded (plus rows stored
+        before the model was recorded). Raises ValueError when the rows still
+        come from more than one model or have different dimensions, e.g.
+        after an interrupted re-embed with another model.
+        """
+        cursor = conn.cursor()
+        # Tables created before quantized storage / incremental regeneration
+        # have no dtype / model column
+        cursor.execute("PRAGMA table_info(ayah_embeddings)")
+        columns = {row[1] for row in cursor.fetchall()}
+        dtype = "em.dtype" if "dtype" in columns else "'float32'"
+        model_column = "em.model" if "model" in columns else "NULL"
+        where, params = "", []
+        if model and "model" in columns:
+            where, params = "WHERE em.model = ? OR em.model IS NULL", [model]
+        cursor.execute(f"""
+            SELECT em.ayah_id, em.surah_id, em.language, em.embedding, {dtype}, {model_column}
+            FROM ayah_embeddings em
+            {where}
+            ORDER BY em.ayah_id
+        """, params)
+        rows = cursor.fetchall()
+        if not rows:
+            return cls(np.zeros((0, 0), np.float32), np.zeros(0, np.int64),
+                       np.zeros(0, np.uint8), np.zeros(0, np.uint8), (), version, model or "")
+
+        models = sorted({row[5] for row in rows if row[5]})
+        if len(models) > 1:
+            raise ValueError(f"ayah_embeddings mixes models ({', '.join(models)}); "
+                             f"set EMBEDDING_MODEL or re-run generate_embeddings.py --model")
+        language_names = tuple(sorted({row[2] for row in rows}))
+        codes = {name: code for code, name in enumerate(language_names)}
+        if all(row[4] == "float32" for row in rows):
+            dimensions = {len(row[3]) // 4 for row in rows}
+            if len(dimensions) == 1:
+                blob = b"".join(row[3] for row in rows)
+                vectors = np.frombuffer(blob, dtype=np.float32).reshape(len(rows), -1)
+        else:
+            decoded = [bytes_to_embedding(row[3], row[4]) for row in rows]
+            dimensions = {len(vector) for vector in decoded}
+            if len(dimensions) == 1:
+                vectors = np.stack(decoded)
+        if len(dimensions) > 1:
+            raise ValueError(f"ayah_embeddings mixes dimensions ({', '.join(map(str, sorted(dimensions)))}); "
+                             f"re-run generate_embeddings.py")
+        return cls(
+            normalize_rows(vectors),
+            np.fromiter((row[0] for row in rows), np.int64, len(rows)),
+            np.fromiter((row[1] for row in rows), np.uint8, len(rows)),
+            np.fromiter((codes[row[2]] for row in rows), np.uint8, len(rows)),
+            language_names,
+            version,
+            models[0] if models else "",
+        )
+
+    def save(self, db_path):
+        """Write the cache files atomically (temp file + rename)."""
+        vectors_path, meta_path = index_paths(db_path)
+        tmp_vectors = vectors_path.with_suffix(".tmp.npy")
+        tmp_meta = meta_path.with_suffix(".tmp.npz")
+        np.save(tmp_vectors, np.ascontiguousarray(self.vectors))
+        np.savez(
+            tmp_meta,
+            ayah_ids=self.ayah_ids,
+            surah_ids=self.surah_ids,
+            languages=self.languages,
+            language_names=np.array(self.language_names),
+            version=np.array(self.version),
+            model=np.array(self.model),
+        )
+        os.replace(tmp_vectors, vectors_path)
+        os.replace(tmp_meta, meta_path)
+
+    @classmethod
+    def load(cls, db_path) -> Optional["SemanticIndex"]:
+        """Memory-map the cached matrix, or None if there is no cache."""
+        vectors_path, meta_path = index_paths(db_path)
+        if not (vectors_path.exists() and meta_path.exists()):
+            return None
+        with np.load(meta_path) as meta:
+            columns = {name: meta[name] for name in meta.files}
+        return cls(
+            np.load(vectors_path, mmap_mode="r"),
+            columns["ayah_ids"],
+            columns["surah_ids"],
+            columns["languages"],
+            tuple(str(name) for name in columns["language_names"]),
+            str(columns["version"]),
+            str(columns.get("model", "")),
+        )
+
+    # -------------------------------------------------------------------------
+    # Quantization
+    # -------------------------------------------------------------------------
+
+    def quantize(self, quantization: str):
+        """Derive the scoring matrix: float16 copy, or int8 codes plus scales."""
+        self.quantization = quantization
+        self.codes = self.scales = None
+        if quantization == "float16":
+            self.codes = np.asarray(self.vectors, dtype=np.float16)
+        elif quantization == "int8":
+            parts = [quantize_int8(self.vectors[start:start + SCORE_BLOCK_ROWS])
+                     for start in range(0, len(self), SCORE_BLOCK_ROWS)]
+            self.codes = np.concatenate([codes for codes, _ in parts])
+            self.scales = np.concatenate([scales for _, scales in parts])
+
+    def save_quantized(self, db_path):
+        codes_path, scales_path = quantized_paths(db_path, self.quantization)
+        if self.scales is not None:
+            np.save(scales_path.with_suffix(".tmp.npy"), self.scales)
+            os.replace(scales_path.with_suffix(".tmp.npy"), scales_path)
+        np.save(codes_path.with_suffix(".tmp.npy"), self.codes)
+        os.replace(codes_path.with_suffix(".tmp.npy"), codes_path)
+
+    def load_quantized(self, db_path, quantization: str) -> bool:
+        """Memory-map a cached quantized matrix newer than the float32 cache."""
+        codes_path, scales_path = quantized_paths(db_path, quantization)
+        vectors_path, _ = index_paths(db_path)
+        needed = [codes_path] + ([scales_path] if quantization == "int8" else [])
+        if not vectors_path.exists() or not all(path.exists() and path.stat().st_mtime_ns >= vectors_path.stat().st_mtime_ns
+                   for path in needed):
+            return False
+        self.quantization = quantization
+        self.codes = np.load(codes_path, mmap_mode="r")
+        self.scales = np.load(scales_path, mmap_mode="r") if quantization == "int8" else None
+        return True
+
+    def _coarse_scores(self, query: np.ndarray) -> np.ndarray:
+        """Similarity of every row, from the (possibly quantized) scoring matrix."""
+        if self.quantization == "int8":
+            query_codes, query_scale = quantize_int8(query)
+            dots = np.einsum("ij,j->i", self.codes, query_codes[0], dtype=np.int32)
+            return dots * (self.scales * query_scale[0])
+        if self.quantization == "float16":
+            return np.concatenate([
+                self.codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32) @ query
+                for start in range(0, len(self), SCORE_BLOCK_ROWS)
+            ])
+        return self.vectors @ query
+
+    # -------------------------------------------------------------------------
+    # Querying
+    # -------------------------------------------------------------------------
+
+    def mask(self, language: Optional[str] = None, surah_id: Optional[int] = None) -> Optional[np.ndarray]:
+        """Boolean row mask for the filters, or None when nothing is filtered."""
+        mask = None
+        if language:
+            mask = self._language_masks.get(language)
+            if mask is None:
+                return np.zeros(len(self), dtype=bool)
+        if surah_id:
+            surah_mask = self.surah_ids == surah_id
+            mask = surah_mask if mask is None else mask & surah_mask
+        return mask
+
+    def top_k(
+        self,
+        query_embedding: np.ndarray,
+        language: Optional[str] = None,
+        surah_id: Optional[int] = None,
+        limit: int = 50,
+        exact: bool = False,
+        rerank: bool = True,
+    ) -> List[Tuple[int, float]]:
+        """
+        Return [(ayah_id, similarity)] of the `limit` most similar rows.
+
+        Uses the IVF index when one is loaded, unless `exact` is set or the
+        filters leave so few rows that scoring them all is cheaper. With a
+        quantized matrix the best candidates are re-scored in float32.
+        """
+        if not len(self) or limit <= 0:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        mask = self.mask(language, surah_id)
+        if self.ann is not None and not exact and (mask is None or mask.sum() > ANN_MIN_CANDIDATES):
+            rows, scores = self.ann.candidates(query)
+            if mask is not None:
+                keep = mask[rows]
+                rows, scores = rows[keep], scores[keep]
+        else:
+            scores = self._coarse_scores(query)
+            rows = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+            if mask is not None:
+                scores = scores[rows]
+            candidates = limit * RERANK_FACTOR
+            if self.quantization != "float32" and rerank and len(rows) > limit:
+                if len(rows) > candidates:
+                    rows = rows[np.argpartition(-scores, candidates - 1)[:candidates]]
+                rows = np.sort(rows)
+                scores = self.vectors[rows] @ query
+        if not len(scores):
+            return []
+
+        k = min(limit, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(self.ayah_ids[rows[i]]), float(scores[i])) for i in best]
+
+    def search(
+        self,
+        conn,
+        query_embedding: np.ndarray,
+        language: Optional[str] = None,
+        surah_id: Optional[int] = None,
+        limit: int = 50,
+    ) -> List[dict]:
+        """top_k() with ayah, surah and edition metadata joined for the hits."""
+        hits = self.top_k(query_embedding, language, surah_id, limit)
+        if not hits:
+            return []
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT
+                a.id as ayah_id,
+                a.surah_id,
+                a.number as ayah_number,
+                e.language,
+                a.text,
+                a.number_in_surah,
+                s.name as surah_name,
+                s.english_name as surah_english_name,
+                s.english_name_translation,
+                e.identifier as edition
+            FROM ayahs a
+            JOIN surahs s ON a.surah_id = s.id
+            JOIN editions e ON a.edition_id = e.id
+            WHERE a.id IN ({', '.join('?' * len(hits))})
+        """, [ayah_id for ayah_id, _ in hits])
+        rows: Dict[int, sqlite3.Row] = {row[0]: row for row in cursor.fetchall()}
+
+        results = []
+        for ayah_id, similarity in hits:
+            row = rows.get(ayah_id)
+            if row is None:
+                continue
+            results.append({
+                "ayah_id": row[0],
+                "surah_id": row[1],
+                "ayah_number": row[2],
+                "language": row[3],
+                "text": row[4],
+                "number_in_surah": row[5],
+                "surah_name": row[6],
+                "surah_english_name": row[7],
+                "surah_english_name_translation": row[8],
+                "edition": row[9],
+                "similarity": round(similarity, 6),
+            })
+        return results
+
+    def nbytes(self) -> int:
+        return int(self.vectors.nbytes + self.ayah_ids.nbytes + self.surah_ids.nbytes + self.languages.nbytes)
+
+    def scoring_bytes(self) -> int:
+        """Size of the matrix scanned by every brute-force query."""
+        if self.codes is None:
+            return int(self.vectors.nbytes)
+        return int(self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def stats(self) -> dict:
+        return {
+            "vectors": len(self),
+            "dimensions": self.dimensions,
+            "model": self.model,
+            "languages": list(self.language_names),
+            "bytes": self.nbytes(),
+            "quantization": self.quantization,
+            "scoring_bytes": self.scoring_bytes(),
+            "memory_mapped": isinstance(self.vectors, np.memmap),
+            "ann": self.ann.stats() if self.ann is not None else None,
+        }
+
+
+# =============================================================================
+# APPROXIMATE NEAREST NEIGHBOURS (IVF)
+# =============================================================================
+# An inverted-file index: spherical k-means splits the vectors into `nlist`
+# clusters, and each cluster's vectors are stored contiguously. A query scores
+# the centroids, then only the vectors of the `nprobe` closest clusters, so
+# cost grows with nprobe/nlist of the corpus instead of all of it. Built
+# offline by archive/build_ann_index.py; every array is a plain .npy that is
+# memory-mapped, so forked workers share the pages.
+
+def ann_paths(db_path) -> Dict[str, Path]:
+    """Paths of the IVF index files for a database (keys: ANN_ARRAYS + "meta")."""
+    db_path = Path(db_path)
+    paths = {name: db_path.with_suffix(f"{ANN_SUFFIX}.{name}.npy") for name in ANN_ARRAYS}
+    paths["meta"] = db_path.with_suffix(ANN_SUFFIX + ".json")
+    return paths
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, iterations: int = KMEANS_ITERATIONS,
+                     seed: int = 0, chunk: int = 8192) -> Tuple[np.ndarray, np.ndarray]:
+    """Cluster unit vectors by cosine similarity; returns (centroids, assignments)."""
+    rng = np.random.default_rng(seed)
+    centroids = np.array(vectors[rng.choice(len(vectors), nlist, replace=False)], dtype=np.float32)
+    assignments = np.zeros(len(vectors), dtype=np.int32)
+    for _ in range(iterations):
+        for start in range(0, len(vectors), chunk):
+            block = np.asarray(vectors[start:start + chunk])
+            assignments[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=nlist)
+        # Re-seed empty clusters with random vectors
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids, assignments
+
+
+class IVFIndex:
+    """Inverted-file ANN index over the rows of a SemanticIndex."""
+
+    def __init__(self, centroids: np.ndarray, vectors: np.ndarray, rows: np.ndarray,
+                 offsets: np.ndarray, version: str = "", nprobe: int = DEFAULT_NPROBE, model: str = ""):
+        self.centroids = centroids
+        self.vectors = vectors        # cluster-ordered copy of the unit vectors
+        self.rows = rows              # SemanticIndex row of each vector
+        self.offsets = offsets        # cluster i is vectors[offsets[i]:offsets[i + 1]]
+        self.version = version
+        self.nprobe = nprobe
+        self.model = model
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, nlist: Optional[int] = None, iterations: int = KMEANS_ITERATIONS,
+              version: str = "", nprobe: int = DEFAULT_NPROBE, model: str = "") -> "IVFIndex":
+        """Cluster a normalized matrix; nlist defaults to ~2*sqrt(N)."""
+        nlist = nlist or max(1, int(round(2 * np.sqrt(len(vectors)))))
+        nlist = min(nlist, len(vectors))
+        centroids, assignments = spherical_kmeans(vectors, nlist, iterations)
+        order = np.argsort(assignments, kind="stable").astype(np.int32)
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignments, minlength=nlist))
+        return cls(centroids, np.ascontiguousarray(vectors[order]), order, offsets, version, nprobe, model)
+
+    def save(self, db_path):
+        """Write every array, then the metadata file that marks the index complete."""
+        paths = ann_paths(db_path)
+        for name in ANN_ARRAYS:
+            tmp = paths[name].with_suffix(".tmp.npy")
+            np.save(tmp, getattr(self, name))
+            os.replace(tmp, paths[name])
+        tmp = paths["meta"].with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": self.version, "model": self.model,
+                                   "nlist": self.nlist, "nprobe": self.nprobe}))
+        os.replace(tmp, paths["meta"])
+
+    @classmethod
+    def load(cls, db_path) -> Optional["IVFIndex"]:
+        """Memory-map an index built by save(), or None if there is none."""
+        paths = ann_paths(db_path)
+        if not all(path.exists() for path in paths.values()):
+            return None
+        meta = json.loads(paths["meta"].read_text())
+        arrays = {name: np.load(paths[name], mmap_mode="r") for name in ANN_ARRAYS}
+        return cls(version=meta["version"], nprobe=meta.get("nprobe", DEFAULT_NPROBE),
+                   model=meta.get("model", ""), **arrays)
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, similarities) of every vector in the nprobe closest clusters."""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        closest = np.sort(np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe])
+        spans = [(self.offsets[c], self.offsets[c + 1]) for c in closest]
+        rows = np.concatenate([self.rows[start:stop] for start, stop in spans])
+        scores = np.concatenate([self.vectors[start:stop] @ query for start, stop in spans])
+        return rows, scores
+
+    def stats(self) -> dict:
+        return {
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "bytes": int(sum(getattr(self, name).nbytes for name in ANN_ARRAYS)),
+        }
+
+
+def recall_at_k(index: SemanticIndex, queries: np.ndarray, k: int = 10,
+                nprobe: Optional[int] = None) -> Tuple[float, float, float]:
+    """
+    Mean recall@k of the IVF index against exact search over `queries`.
+
+    Returns (recall, exact ms per query, approximate ms per query).
+    """
+    exact_time = approx_time = 0.0
+    found = 0
+    for query in queries:
+        started = time.perf_counter()
+        exact = {ayah_id for ayah_id, _ in index.top_k(query, limit=k, exact=True)}
+        exact_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        rows, scores = index.ann.candidates(query, nprobe)
+        best = rows[np.argpartition(-scores, min(k, len(scores)) - 1)[:k]]
+        approx_time += time.perf_counter() - started
+        found += len(exact & {int(ayah_id) for ayah_id in index.ayah_ids[best]})
+    n = max(len(queries), 1)
+    return found / (n * k), 1000 * exact_time / n, 1000 * approx_time / n
+
+
+def load_semantic_index(conn, db_path, version: str, quantization: str = QUANTIZATION,
+                        model: Optional[str] = None) -> SemanticIndex:
+    """
+    Return the index for a database version (and `model`'s rows, see
+    SemanticIndex.from_database), from the .npy cache if current.
+
+    A stale or missing cache is rebuilt from ayah_embeddings and written back
+    (best effort: a read-only deployment just keeps the index in memory).
+    An IVF index built for the same version is attached when present, and the
+    scoring matrix is quantized (and cached) as `quantization` asks.
+    """
+    index = SemanticIndex.load(db_path)
+    if index is None or index.version != version or (model and index.model and index.model != model):
+        index = SemanticIndex.from_database(conn, version, model)
+        if len(index):
+            try:
+                index.save(db_path)
+                index = SemanticIndex.load(db_path)
+            except OSError as e:
+                print(f"⚠ Could not write semantic index cache: {e}")
+
+    if quantization not in QUANTIZATIONS:
+        print(f"⚠ Unknown SEMANTIC_QUANTIZATION '{quantization}', using float32")
+        quantization = "float32"
+    if quantization != "float32" and len(index) and not index.load_quantized(db_path, quantization):
+        index.quantize(quantization)
+        try:
+            index.save_quantized(db_path)
+            index.load_quantized(db_path, quantization)
+        except OSError as e:
+            print(f"⚠ Could not write quantized semantic index: {e}")
+
+    ann = IVFIndex.load(db_path)
+    if ann is not None:
+        if ann.version == version and ann.model == index.model and len(ann.rows) == len(index):
+            index.ann = ann
+        else:
+            print("⚠ IVF index is stale; rebuild it with archive/build_ann_index.py")
+    return index
@@ -0,0 +1,99 @@
+"""
+Async Supabase Data Access
+
+User data (bookmarks, progress, stats, share profiles) lives in Supabase's
+Postgres and is reached through PostgREST. The synchronous supabase-py client
+blocks the event loop for every round-trip, and the server runs a single
+worker, so one slow query stalls every request.
+
+create_data_client() returns postgrest's AsyncPostgrestClient, which has the
+same query-builder API as `supabase.table(...)` but whose execute() is awaited,
+on top of one shared httpx.AsyncClient: pooled keep-alive connections,
+multiplexed over HTTP/2. Independent queries in a handler can then be issued
+together with asyncio.gather().
+
+The base URL comes from SUPABASE_REST_URL (default `<SUPABASE_URL>/rest/v1`),
+so any PostgREST-compatible server, such as a local stub, can stand in.
+"""
+
+import os
+import time
+from typing import Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+# Connection pool: concurrent queries and idle keep-alive connections kept open
+MAX_CONNECTIONS = int(os.environ.get("SUPABASE_MAX_CONNECTIONS", "50"))
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+REQUEST_TIMEOUT_SECONDS = 15.0
+
+
+class RequestStats:
+    """Request counters and latency, recorded through httpx event hooks."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.http_versions = {}
+
+    async def on_request(self, request: httpx.Request):
+        request.extensions["started"] = time.perf_counter()
+        self.requests += 1
+
+    async def on_response(self, response: httpx.Response):
+        self.total_seconds += time.perf_counter() - response.request.extensions.get("started", time.perf_counter())
+        if response.status_code >= 400:
+            self.errors += 1
+        self.http_versions[response.http_version] = self.http_versions.get(response.http_version, 0) + 1
+
+    def stats(self) -> dict:
+        completed = sum(self.http_versions.values())
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_ms": round(self.total_seconds / completed * 1000, 1) if completed else 0.0,
+            "http_versions": dict(self.http_versions),
+        }
+
+
+def create_data_client(
+    rest_url: str,
+    api_key: str,
+    http2: Optional[bool] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> AsyncPostgrestClient:
+    """
+    Build an AsyncPostgrestClient authenticated with `api_key` (the service
+    role key bypasses RLS, like supabase_admin). HTTP/2 is used for https URLs
+    unless disabled; plain-http stubs get HTTP/1.1 keep-alive. `transport`
+    replaces the network entirely (e.g. httpx.MockTransport in tests).
+    """
+    if http2 is None:
+        http2 = rest_url.startswith("https://")
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "apikey": api_key,
+        "Authorization": f"Bearer {api_key}",
+    }
+    stats = RequestStats()
+    session = httpx.AsyncClient(
+        base_url=rest_url,
+        headers=headers,
+        http2=http2,
+        timeout=REQUEST_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        follow_redirects=True,
+        transport=transport,
+        event_hooks={"request": [stats.on_request], "response": [stats.on_response]},
+    )
+    client = AsyncPostgrestClient(rest_url, headers=headers, http_client=session)
+    client.request_stats = stats
+    return client
@@ -0,0 +1,131 @@
+"""
+Shared fixtures: a small quran.db built with the production schema and the
+offline FTS build script (quran-dump/create_fts_tables.py).
+"""
+
+import importlib.util
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+SURAHS = [
+    (1, "الفاتحة", "Al-Faatiha", "The Opening", "Meccan", 2),
+    (2, "البقرة", "Al-Baqara", "The Cow", "Medinan", 2),
+]
+
+EDITIONS = [
+    (1, "quran-uthmani", "ar", "القرآن الكريم", "Uthmani", "text", "quran", "rtl"),
+    (2, "en.sahih", "en", "Saheeh International", "Saheeh International", "text", "translation", "ltr"),
+    (3, "en.pickthall", "en", "Pickthall", "Mohammed Marmaduke William Pickthall", "text", "translation", "ltr"),
+    (4, "en.yusufali", "en", "Yusuf Ali", "Abdullah Yusuf Ali", "text", "translation", "ltr"),
+]
+
+# (number, surah_id, number_in_surah) -> text per edition identifier
+AYAHS = {
+    (1, 1, 1): {
+        "quran-uthmani": "بِسْمِ ٱللَّهِ ٱلرَّحْمَٰنِ ٱلرَّحِيمِ",
+        "en.sahih": "In the name of God, the Entirely Merciful, the Especially Merciful.",
+        "en.pickthall": "In the name of Allah, the Beneficent, the Merciful.",
+        "en.yusufali": "In the name of Allah, Most Gracious, Most Merciful.",
+    },
+    (2, 1, 2): {
+        "quran-uthmani": "ٱلْحَمْدُ لِلَّهِ رَبِّ ٱلْعَٰلَمِينَ",
+        "en.sahih": "All praise is due to God, Lord of the worlds.",
+        "en.pickthall": "Praise be to Allah, Lord of the Worlds,",
+        "en.yusufali": "Praise be to Allah, the Cherisher and Sustainer of the worlds;",
+    },
+    (3, 2, 1): {
+        "quran-uthmani": "الٓمٓ",
+        "en.sahih": "Alif, Lam, Meem.",
+        "en.pickthall": "Alif. Lam. Mim.",
+        "en.yusufali": "A.L.M.",
+    },
+    (4, 2, 2): {
+        "quran-uthmani": "ذَٰلِكَ ٱلْكِتَٰبُ لَا رَيْبَ ۛ فِيهِ ۛ هُدًى لِّلْمُتَّقِينَ",
+        "en.sahih": "This is the Book about which there is no doubt, a guidance for those conscious of God.",
+        "en.pickthall": "This is the Scripture whereof there is no doubt, a guidance unto those who ward off (evil).",
+        "en.yusufali": "This is the Book; in it is guidance sure, without doubt, to those who fear Allah;",
+    },
+}
+
+
+def _load_fts_builder():
+    path = BACKEND.parent / "quran-dump" / "create_fts_tables.py"
+    spec = importlib.util.spec_from_file_location("create_fts_tables", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def quran_db(tmp_path_factory):
+    """Path to a four-ayah, four-edition quran.db with its FTS tables built."""
+    path = tmp_path_factory.mktemp("quran") / "quran.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE editions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, identifier TEXT UNIQUE NOT NULL,
+            language TEXT, name TEXT, english_name TEXT, format TEXT, type TEXT, direction TEXT
+        );
+        CREATE TABLE surahs (
+            id INTEGER PRIMARY KEY, name TEXT NOT NULL, english_name TEXT,
+            english_name_translation TEXT, revelation_type TEXT, number_of_ayahs INTEGER
+        );
+        CREATE TABLE ayahs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, number INTEGER NOT NULL,
+            number_in_surah INTEGER NOT NULL, surah_id INTEGER NOT NULL,
+            edition_id INTEGER NOT NULL, text TEXT NOT NULL, juz INTEGER, manzil INTEGER,
+            page INTEGER, ruku INTEGER, hizb_quarter INTEGER, sajda TEXT,
+            UNIQUE(number, edition_id)
+        );
+        CREATE TABLE audio_editions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, identifier TEXT UNIQUE NOT NULL, bitrate INTEGER
+        );
+    """)
+    conn.executemany("INSERT INTO surahs VALUES (?, ?, ?, ?, ?, ?)", SURAHS)
+    conn.executemany("INSERT INTO editions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", EDITIONS)
+    edition_ids = {identifier: edition_id for edition_id, identifier, *_ in EDITIONS}
+    for (number, surah_id, number_in_surah), texts in AYAHS.items():
+        for identifier, text in texts.items():
+            conn.execute(
+                """
+                INSERT INTO ayahs (number, number_in_surah, surah_id, edition_id, text, juz, page)
+                VALUES (?, ?, ?, ?, ?, 1, 1)
+                """,
+                (number, number_in_surah, surah_id, edition_ids[identifier], text),
+            )
+    conn.commit()
+
+    _load_fts_builder().rebuild_fts(conn)
+    conn.close()
+    return path
+
+
+@pytest.fixture(scope="session")
+def corpus(quran_db):
+    from quran_corpus import QuranCorpus
+    return QuranCorpus(quran_db)
+
+
+@pytest.fixture
+def connect(quran_db):
+    """Open a read connection to the test database (callers close it)."""
+    def open_connection():
+        conn = sqlite3.connect(quran_db, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+    return open_connection
+
+
+@pytest.fixture(scope="session")
+def app_module(quran_db):
+    """The FastAPI app module, serving Quran data from the test database."""
+    os.environ["DB_PATH"] = str(quran_db)
+    import main
+    return main
@@ -0,0 +1,210 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+
+import auth_tokens
+from auth_tokens import AuthUnavailable, TokenVerifier
+
+SECRET = "test-jwt-secret-with-at-least-32-bytes"
+
+
+class Issuer:
+    """Stand-in Supabase Auth: signs ES256 tokens and serves their JWKS."""
+
+    def __init__(self):
+        self.keys = {}
+        self.jwks_requests = 0
+        issuer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                issuer.jwks_requests += 1
+                body = json.dumps({"keys": [issuer.jwk(kid) for kid in issuer.keys]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.jwks_url = f"http://127.0.0.1:{self.server.server_port}/auth/v1/.well-known/jwks.json"
+
+    def rotate(self) -> str:
+        kid = str(uuid.uuid4())
+        self.keys[kid] = ec.generate_private_key(ec.SECP256R1())
+        return kid
+
+    def jwk(self, kid: str) -> dict:
+        jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(self.keys[kid].public_key()))
+        return {**jwk, "kid": kid, "alg": "ES256", "use": "sig"}
+
+    def sign(self, kid: str, **claims) -> str:
+        return jwt.encode(claims_for(**claims), self.keys[kid], algorithm="ES256", headers={"kid": kid})
+
+
+def claims_for(sub="user-1", aud="authenticated", expires_in=600, session_id="session-1"):
+    return {"sub": sub, "aud": aud, "exp": int(time.time()) + expires_in, "session_id": session_id}
+
+
+def hs256(**claims) -> str:
+    return jwt.encode(claims_for(**claims), SECRET, algorithm="HS256")
+
+
+class RemoteAuth:
+    """remote_user_id stand-in: answers with the token's subject, a rejection, or an outage."""
+
+    def __init__(self):
+        self.calls = 0
+        self.mode = "ok"
+
+    def __call__(self, token):
+        self.calls += 1
+        if self.mode == "down":
+            raise ConnectionError("auth server unreachable")
+        if self.mode == "rejected":
+            return None
+        return jwt.decode(token, options={"verify_signature": False})["sub"]
+
+
+@pytest.fixture(scope="module")
+def issuer():
+    issuer = Issuer()
+    yield issuer
+    issuer.server.shutdown()
+
+
+@pytest.fixture
+def remote():
+    return RemoteAuth()
+
+
+@pytest.fixture
+def verifier(issuer, remote, monkeypatch):
+    monkeypatch.setattr(auth_tokens, "JWKS_MIN_REFRESH_SECONDS", 0)
+    return TokenVerifier(issuer.jwks_url, remote, jwt_secret=SECRET, session_recheck=300)
+
+
+def authenticate(verifier, token, revalidate=False):
+    user_id, needs_remote = verifier.verify_local(token, revalidate)
+    if needs_remote:
+        user_id = verifier.verify_remote(token, revalidate)
+    return user_id
+
+
+def test_hs256_verified_locally(verifier, remote):
+    token = hs256()
+    assert authenticate(verifier, token) == "user-1"  # first use checks the session
+    assert authenticate(verifier, token) == "user-1"
+    assert remote.calls == 1
+    assert verifier.counts["local_ok"] == 1
+
+
+def test_es256_verified_with_jwks(issuer, verifier, remote):
+    kid = issuer.rotate()
+    token = issuer.sign(kid)
+    assert authenticate(verifier, token) == "user-1"
+    assert verifier.verify_local(token) == ("user-1", False)
+    assert remote.calls == 1
+
+
+def test_expired_token_rejected(issuer, verifier, remote):
+    kid = issuer.rotate()
+    authenticate(verifier, issuer.sign(kid))  # fetches the JWKS
+    remote.calls = 0
+    for token in (hs256(expires_in=-120), issuer.sign(kid, expires_in=-120)):
+        assert verifier.verify_local(token) == (None, False)
+    assert verifier.counts["expired"] == 2
+    assert remote.calls == 0
+
+
+def test_wrong_audience_rejected(issuer, verifier, remote):
+    kid = issuer.rotate()
+    authenticate(verifier, issuer.sign(kid))  # fetches the JWKS
+    remote.calls = 0
+    for token in (hs256(aud="anon"), issuer.sign(kid, aud="anon")):
+        assert verifier.verify_local(token) == (None, False)
+    assert remote.calls == 0
+
+
+def test_bad_signature_rejected(verifier):
+    token = jwt.encode(claims_for(), "another-secret-with-at-least-32-bytes!", algorithm="HS256")
+    assert verifier.verify_local(token) == (None, False)
+
+
+def test_rotated_key_fetched_once(issuer, verifier, remote):
+    first = issuer.rotate()
+    assert authenticate(verifier, issuer.sign(first, session_id="a")) == "user-1"
+    fetches = issuer.jwks_requests
+
+    rotated = issuer.rotate()
+    assert verifier.verify_local(issuer.sign(rotated, session_id="b")) == (None, True)
+    assert authenticate(verifier, issuer.sign(rotated, session_id="b")) == "user-1"
+    assert issuer.jwks_requests == fetches + 1
+    assert verifier.verify_local(issuer.sign(rotated, session_id="b")) == ("user-1", False)
+
+
+def test_unknown_kid_falls_back_to_auth_server(issuer, verifier, remote):
+    issuer.rotate()
+    stranger = ec.generate_private_key(ec.SECP256R1())
+    token = jwt.encode(claims_for(), stranger, algorithm="ES256", headers={"kid": "not-published"})
+    remote.mode = "rejected"
+    assert verifier.verify_local(token) == (None, True)
+    assert authenticate(verifier, token) is None
+    assert remote.calls == 1
+
+
+def test_revoked_session_rejected_until_expiry(verifier, remote):
+    verifier.session_recheck = 0.05
+    token = hs256(session_id="signed-out")
+    assert authenticate(verifier, token) == "user-1"
+
+    time.sleep(0.1)
+    remote.mode = "rejected"
+    assert authenticate(verifier, token) is None
+    calls = remote.calls
+    remote.mode = "ok"
+    # Revoked sessions are rejected locally without asking again
+    assert verifier.verify_local(token) == (None, False)
+    assert verifier.verify_local(hs256(session_id="signed-out", sub="user-2")) == (None, False)
+    assert remote.calls == calls
+    assert verifier.verify_local(hs256(session_id="other"))[0] == "user-1"
+
+
+def test_outage_during_recheck_keeps_session(verifier, remote):
+    verifier.session_recheck = 0.05
+    token = hs256(session_id="during-outage")
+    assert authenticate(verifier, token) == "user-1"
+
+    time.sleep(0.1)
+    remote.mode = "down"
+    assert authenticate(verifier, token) == "user-1"
+    assert verifier.counts["remote_errors"] == 1
+    assert verifier.counts["remote_rejected"] == 0
+    # Not revoked, and the recheck is retried once the auth server is back
+    remote.mode = "ok"
+    assert "during-outage" not in verifier._sessions_revoked
+    verifier._sessions_checked["during-outage"] = 0.0
+    assert authenticate(verifier, token) == "user-1"
+    assert verifier.counts["remote_ok"] == 2
+
+
+def test_outage_fails_requests_that_need_the_auth_server(issuer, verifier, remote):
+    remote.mode = "down"
+    # Explicit revalidation (password changes)
+    with pytest.raises(AuthUnavailable):
+        authenticate(verifier, hs256(session_id="revalidate"), revalidate=True)
+    # No local key to check the signature with
+    no_secret = TokenVerifier(issuer.jwks_url, remote, jwt_secret=None)
+    with pytest.raises(AuthUnavailable):
+        authenticate(no_secret, hs256(session_id="no-secret"))
+    assert not verifier._sessions_revoked and not no_secret._sessions_revoked
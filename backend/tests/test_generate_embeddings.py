@@ -0,0 +1,60 @@
+import queue
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "archive"))
+
+import generate_embeddings  # noqa: E402
+from create_embeddings_table import migrate  # noqa: E402
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "embeddings.db", check_same_thread=False)
+    migrate(conn)
+    conn.isolation_level = None
+    yield conn
+    conn.close()
+
+
+def encoded(*ayah_ids):
+    """One encoded batch as the encoder hands it to the writer."""
+    batch = [(ayah_id, 1, ayah_id, 1, "en", f"ayah {ayah_id}", f"hash{ayah_id}") for ayah_id in ayah_ids]
+    return batch, np.ones((len(ayah_ids), 3), dtype=np.float32)
+
+
+def write(conn, *items, commit_every=2):
+    results = queue.Queue()
+    for item in items:
+        results.put(item)
+    results.put(generate_embeddings._DONE)
+    progress = {"written": 0}
+    generate_embeddings.write(conn, "mini", "float32", commit_every, results, progress)
+    return progress
+
+
+def test_write_commits_every_batch(conn):
+    progress = write(conn, encoded(1, 2), encoded(3))
+    assert progress == {"written": 3}
+    assert conn.execute("SELECT COUNT(*) FROM ayah_embeddings").fetchone()[0] == 3
+
+
+@pytest.mark.parametrize("commit_every", [
+    2,      # periodic flush fails, later batches are drained
+    1000,   # final flush after the last batch fails
+])
+def test_failed_flush_rolls_back_and_reports(conn, commit_every):
+    # Fail the second row of the first transaction
+    conn.execute("""
+        CREATE TRIGGER reject_duplicates BEFORE INSERT ON ayah_embeddings
+        WHEN EXISTS (SELECT 1 FROM ayah_embeddings WHERE ayah_id = NEW.ayah_id)
+        BEGIN SELECT RAISE(ABORT, 'duplicate ayah'); END
+    """)
+    progress = write(conn, encoded(1, 1), encoded(2, 3), commit_every=commit_every)
+    assert isinstance(progress["error"], sqlite3.IntegrityError)
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM ayah_embeddings").fetchone()[0] == 0
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from profile_cache import ProfileCache
+
+
+class SlowFetch:
+    """Profile fetch that blocks until released, counting calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self, user_id):
+        self.calls += 1
+        await self.release.wait()
+        return {"id": user_id, "fetch": self.calls}
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_coalesces_concurrent_misses():
+    fetch = SlowFetch()
+    cache = ProfileCache(fetch)
+
+    async def scenario():
+        fetch.release = asyncio.Event()
+        tasks = [asyncio.create_task(cache.get("u1")) for _ in range(3)]
+        await asyncio.sleep(0)
+        fetch.release.set()
+        return await asyncio.gather(*tasks)
+
+    profiles = run(scenario())
+    assert fetch.calls == 1
+    assert profiles == [{"id": "u1", "fetch": 1}] * 3
+    assert cache.stats()["coalesced"] == 2
+
+
+def test_cancelled_leader_releases_waiters():
+    fetch = SlowFetch()
+    cache = ProfileCache(fetch)
+
+    async def scenario():
+        fetch.release = asyncio.Event()
+        leader = asyncio.create_task(cache.get("u1"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get("u1"))
+        await asyncio.sleep(0)
+        assert cache.stats()["coalesced"] == 1
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        fetch.release.set()
+        return await asyncio.wait_for(waiter, timeout=1)
+
+    assert run(scenario()) == {"id": "u1", "fetch": 2}
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_fetch_error_reaches_waiters():
+    async def fetch(user_id):
+        await asyncio.sleep(0)
+        raise RuntimeError("supabase down")
+
+    cache = ProfileCache(fetch)
+
+    async def scenario():
+        return await asyncio.gather(cache.get("u1"), cache.get("u1"), return_exceptions=True)
+
+    results = run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.stats()["entries"] == 0
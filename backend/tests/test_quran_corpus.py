@@ -0,0 +1,112 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import quran_corpus
+
+
+@pytest.fixture
+def swappable_db(quran_db, tmp_path, monkeypatch):
+    """A private copy of the test database, installed as the shared corpus."""
+    path = tmp_path / "quran.db"
+    shutil.copy(quran_db, path)
+    monkeypatch.setattr(quran_corpus, "RELOAD_CHECK_INTERVAL", 0.0)
+    quran_corpus.load_corpus(path)
+    yield path
+    quran_corpus.load_corpus(quran_db)
+
+
+def swap_in_renamed_copy(path, name):
+    """Replace the database file the way a deploy would: write a copy, then rename over it."""
+    replacement = path.with_name("replacement.db")
+    shutil.copy(path, replacement)
+    conn = sqlite3.connect(replacement)
+    conn.execute("UPDATE surahs SET english_name = ? WHERE id = 1", (name,))
+    conn.commit()
+    conn.close()
+    os.replace(replacement, path)
+
+
+def test_reload_runs_off_the_request_thread(swappable_db, monkeypatch):
+    original = quran_corpus.get_corpus()
+    building = threading.Event()
+    release = threading.Event()
+    real_corpus = quran_corpus.QuranCorpus
+
+    def slow_corpus(db_path):
+        building.set()
+        release.wait(5)
+        return real_corpus(db_path)
+
+    monkeypatch.setattr(quran_corpus, "QuranCorpus", slow_corpus)
+    swap_in_renamed_copy(swappable_db, "The Opener")
+
+    # The request that notices the swap is answered from the old snapshot
+    assert quran_corpus.get_corpus() is original
+    assert building.wait(5)
+    assert quran_corpus.get_corpus() is original
+
+    reloaded = []
+    quran_corpus.add_reload_listener(reloaded.append)
+    try:
+        release.set()
+        for _ in range(100):
+            if reloaded:
+                break
+            time.sleep(0.05)
+    finally:
+        quran_corpus._reload_listeners.remove(reloaded.append)
+
+    current = quran_corpus.get_corpus()
+    assert reloaded == [current]
+    assert current.surah(1)["english_name"] == "The Opener"
+    assert current.version != original.version
+
+
+def test_unchanged_file_is_not_reloaded(swappable_db):
+    original = quran_corpus.get_corpus()
+    assert quran_corpus.reload_if_changed(wait=False) is False
+    assert quran_corpus.get_corpus() is original
+
+
+def test_forced_reload_waits(swappable_db):
+    original = quran_corpus.get_corpus()
+    assert quran_corpus.reload_if_changed(force=True) is True
+    assert quran_corpus.get_corpus() is not original
+
+
+def test_nbytes_counts_buffers(corpus):
+    for text in corpus.texts.values():
+        buffers = len(text.text_blob) + sum(
+            column.buffer_info()[1] * column.itemsize
+            for column in (text.ids, text.numbers, text.surah_ids, text.numbers_in_surah,
+                           text.text_offsets, *text.meta.values())
+        )
+        assert text.nbytes() > buffers
+    assert corpus.stats()["corpus_bytes"] > sum(len(text.text_blob) for text in corpus.texts.values())
+
+
+@pytest.mark.parametrize("path", [
+    "/api/quran/surahs/1",
+    "/api/quran/surahs/1/ayahs",
+    "/api/quran/surahs/1/parallel",
+    "/api/quran/page/1",
+    "/api/quran/export",
+])
+def test_quran_endpoints_use_one_snapshot(app_module, monkeypatch, path):
+    # A reload between two get_corpus() calls would mix snapshots
+    calls = []
+
+    def counting_get_corpus(db_path=None):
+        calls.append(path)
+        return quran_corpus.get_corpus(db_path)
+
+    monkeypatch.setattr(app_module, "get_corpus", counting_get_corpus)
+    response = TestClient(app_module.app).get(path)
+    assert response.status_code == 200
+    assert len(calls) == 1
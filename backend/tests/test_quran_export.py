@@ -0,0 +1,37 @@
+import json
+import shutil
+import sqlite3
+
+import pytest
+
+from quran_corpus import QuranCorpus
+from quran_export import iter_export
+
+
+@pytest.fixture(scope="module")
+def gapped_corpus(quran_db, tmp_path_factory):
+    """The test corpus with ayah 3 missing from en.pickthall."""
+    path = tmp_path_factory.mktemp("gapped") / "quran.db"
+    shutil.copy(quran_db, path)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        DELETE FROM ayahs
+        WHERE number = 3 AND edition_id = (SELECT id FROM editions WHERE identifier = 'en.pickthall')
+    """)
+    conn.commit()
+    conn.close()
+    return QuranCorpus(path)
+
+
+def test_ndjson_export_marks_missing_ayahs_null(gapped_corpus):
+    body = b"".join(iter_export(gapped_corpus, ["quran-uthmani", "en.pickthall"], "ndjson"))
+    ayahs = [json.loads(line) for line in body.splitlines() if json.loads(line)["type"] == "ayah"]
+    assert [a["number"] for a in ayahs] == [1, 2, 3, 4]
+    assert ayahs[2]["texts"]["en.pickthall"] is None
+    assert ayahs[2]["texts"]["quran-uthmani"] == "الٓمٓ"
+    assert ayahs[3]["texts"]["en.pickthall"].startswith("This is the Scripture")
+
+
+def test_pack_export_covers_missing_ayahs(gapped_corpus):
+    body = b"".join(iter_export(gapped_corpus, ["quran-uthmani", "en.pickthall"], "pack"))
+    assert "Praise be to Allah".encode() in body
@@ -0,0 +1,113 @@
+import pytest
+
+from quran_search import SearchQueryError, fuzzy_expression, match_lists, search_editions, search_fts
+
+
+@pytest.fixture(autouse=True)
+def fresh_match_lists():
+    match_lists.clear()
+    yield
+    match_lists.clear()
+
+
+def test_search_stays_in_requested_edition(corpus, connect):
+    conn = connect()
+    try:
+        results, total, _ = search_fts(conn.cursor(), corpus, "en", "allah", edition="en.pickthall")
+    finally:
+        conn.close()
+    assert total == 2
+    assert {r["edition"] for r in results} == {"en.pickthall"}
+    assert all("Allah" in r["text"] for r in results)
+
+
+def test_surah_filter(corpus, connect):
+    conn = connect()
+    try:
+        results, total, _ = search_fts(conn.cursor(), corpus, "en", "doubt", surah_id=1)
+    finally:
+        conn.close()
+    assert (results, total) == ([], 0)
+
+
+@pytest.mark.parametrize("query", [
+    "zzz) OR (allah",
+    "zzz) OR edition_id : (3",
+    'zzz) OR {edition_id} : "3" OR (zzz',
+])
+def test_query_cannot_escape_edition_filter(corpus, connect, query):
+    # en.sahih never says "Allah"; the other editions do
+    conn = connect()
+    try:
+        try:
+            results, total, _ = search_fts(conn.cursor(), corpus, "en", query, edition="en.sahih")
+        except SearchQueryError:
+            return
+    finally:
+        conn.close()
+    assert total == 0
+    assert results == []
+
+
+def test_query_cannot_escape_surah_filter(corpus, connect):
+    conn = connect()
+    try:
+        with pytest.raises(SearchQueryError):
+            search_fts(conn.cursor(), corpus, "en", "zzz) OR (doubt", surah_id=1)
+    finally:
+        conn.close()
+
+
+def test_operators_stay_within_the_query(corpus, connect):
+    conn = connect()
+    try:
+        results, total, _ = search_fts(conn.cursor(), corpus, "en", "merciful OR doubt", sort="mushaf")
+    finally:
+        conn.close()
+    assert total == 2
+    assert [r["ayah_number"] for r in results] == [1, 4]
+    assert {r["edition"] for r in results} == {"en.sahih"}
+
+
+def test_editions_search_keeps_each_edition_apart(corpus, connect):
+    conn = connect()
+    try:
+        results, total, _ = search_editions(
+            conn.cursor(), corpus, ["en.sahih", "en.pickthall"], "allah", sort="mushaf"
+        )
+    finally:
+        conn.close()
+    assert total == 2
+    for result in results:
+        assert [m["edition"] for m in result["matches"]] == ["en.pickthall"]
+
+
+@pytest.mark.parametrize("query", ["zzz) OR (allah", "zzz) OR edition_id : (4"])
+def test_editions_query_cannot_escape_edition_filters(corpus, connect, query):
+    conn = connect()
+    try:
+        try:
+            results, total, _ = search_editions(
+                conn.cursor(), corpus, ["en.sahih", "en.pickthall"], query, sort="mushaf"
+            )
+        except SearchQueryError:
+            return
+    finally:
+        conn.close()
+    assert total == 0
+    assert results == []
+
+
+def test_editions_fuzzy_expressions_stay_per_edition(corpus, connect):
+    conn = connect()
+    try:
+        expression, _ = fuzzy_expression(conn.cursor(), "en", "merciful")
+        results, total, _ = search_editions(
+            conn.cursor(), corpus, ["en.sahih", "en.yusufali"], "merciful", sort="mushaf",
+            expressions={"en": expression},
+        )
+    finally:
+        conn.close()
+    assert [r["ayah_number"] for r in results] == [1]
+    assert [m["edition"] for m in results[0]["matches"]] == ["en.sahih", "en.yusufali"]
+    assert all(corpus.edition(m["edition"]).text(0) == m["text"] for m in results[0]["matches"])
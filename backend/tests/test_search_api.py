@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from db_pool import SQLitePool
+from quran_search import match_lists
+from semantic_index import SemanticIndex
+
+
+@pytest.fixture
+def client(app_module, quran_db, monkeypatch):
+    # One connection and a short wait: any search holding a connection while
+    # it takes another fails fast instead of blocking
+    monkeypatch.setattr(app_module, "db_pool", SQLitePool(quran_db, max_connections=1, acquire_timeout=0.5))
+    monkeypatch.setattr(app_module, "search_cache", type(app_module.search_cache)())
+    match_lists.clear()
+    yield TestClient(app_module.app)
+    match_lists.clear()
+
+
+@pytest.mark.parametrize("mode", ["text", "fuzzy"])
+def test_merged_search_does_not_hold_a_connection(client, mode):
+    response = client.get("/api/quran/search", params={"q": "merciful", "language": "all", "mode": mode})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_count"] == 1
+    assert body["results"][0]["edition"] == "en.sahih"
+
+
+def test_merged_query_cannot_escape_edition_filter(client):
+    response = client.get("/api/quran/search", params={"q": "zzz) OR (allah", "language": "all"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("params, total", [
+    ({"q": "doubt", "language": "en"}, 1),
+    ({"q": "doubt", "language": "all"}, 1),
+    ({"q": "doubt", "editions": "en.sahih,en.pickthall"}, 1),
+    ({"q": "nothingmatches", "language": "en"}, 0),
+])
+def test_search_envelope(client, params, total):
+    response = client.get("/api/quran/search", params=params)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_count"] == total
+    assert len(body["results"]) == total
+    assert body["next_after"] is None
+
+
+class StubEncoder:
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+
+    async def encode(self, text):
+        return np.eye(self.dimensions, dtype=np.float32)[0]
+
+
+@pytest.fixture
+def semantic(app_module, monkeypatch):
+    index = SemanticIndex(
+        np.eye(3, dtype=np.float32)[:2],
+        ayah_ids=np.array([1, 2]),
+        surah_ids=np.ones(2, dtype=np.uint8),
+        languages=np.zeros(2, dtype=np.uint8),
+        language_names=("ar",),
+        model=app_module.EMBEDDING_MODEL,
+    )
+    monkeypatch.setattr(app_module, "semantic_index", index)
+    return index
+
+
+def test_semantic_search(client, semantic, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "query_encoder", StubEncoder(3))
+    response = client.get("/api/quran/semantic-search", params={"q": "mercy"})
+    assert response.status_code == 200
+    assert [hit["ayah_id"] for hit in response.json()["results"]] == [1, 2]
+
+
+def test_semantic_search_dimension_mismatch(client, semantic, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "query_encoder", StubEncoder(5))
+    response = client.get("/api/quran/semantic-search", params={"q": "mercy"})
+    assert response.status_code == 503
+    assert "5-d" in response.json()["detail"]
+
+
+def test_semantic_search_model_mismatch(client, semantic, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "query_encoder", StubEncoder(3))
+    monkeypatch.setattr(semantic, "model", "all-mpnet-base-v2")
+    response = client.get("/api/quran/semantic-search", params={"q": "mercy"})
+    assert response.status_code == 503
+    assert "all-mpnet-base-v2" in response.json()["detail"]
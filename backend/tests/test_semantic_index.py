@@ -0,0 +1,102 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from semantic_index import DEFAULT_NPROBE, IVFIndex, SemanticIndex, normalize_rows, recall_at_k
+
+# Quran-sized corpus of unit vectors grouped into topics, like ayah embeddings
+ROWS = 6236
+DIMENSIONS = 64
+TOPICS = 60
+MIN_RECALL = 0.95
+
+
+@pytest.fixture(scope="module")
+def index():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((TOPICS, DIMENSIONS)).astype(np.float32)
+    topics = rng.integers(0, TOPICS, ROWS)
+    vectors = normalize_rows(centers[topics] + 0.6 * rng.standard_normal((ROWS, DIMENSIONS)).astype(np.float32))
+    index = SemanticIndex(
+        vectors,
+        ayah_ids=np.arange(1, ROWS + 1),
+        surah_ids=np.ones(ROWS, dtype=np.uint8),
+        languages=np.zeros(ROWS, dtype=np.uint8),
+        language_names=("en",),
+    )
+    index.ann = IVFIndex.build(index.vectors)
+    return index
+
+
+@pytest.fixture(scope="module")
+def queries(index):
+    # Perturbed stored vectors, as archive/build_ann_index.py benchmarks with
+    rng = np.random.default_rng(1)
+    sample = index.vectors[rng.choice(ROWS, 100, replace=False)]
+    noise = 0.5 / np.sqrt(DIMENSIONS) * rng.standard_normal(sample.shape).astype(np.float32)
+    return normalize_rows(sample + noise)
+
+
+def test_default_nprobe_recall(index, queries):
+    assert index.ann.nprobe == DEFAULT_NPROBE
+    recall, _, _ = recall_at_k(index, queries, k=10)
+    assert recall >= MIN_RECALL
+
+
+def test_probing_every_list_is_exact(index, queries):
+    recall, _, _ = recall_at_k(index, queries[:20], k=10, nprobe=index.ann.nlist)
+    assert recall == 1.0
+
+
+def test_top_k_uses_ann_candidates(index, queries):
+    query = queries[0]
+    approximate = index.top_k(query, limit=10)
+    exact = index.top_k(query, limit=10, exact=True)
+    assert len(approximate) == 10
+    assert len({ayah_id for ayah_id, _ in approximate} & {ayah_id for ayah_id, _ in exact}) >= 9
+    assert [score for _, score in approximate] == sorted((score for _, score in approximate), reverse=True)
+
+
+def embeddings_db(rows):
+    """In-memory ayah_embeddings with (ayah_id, model, vector) rows."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE ayah_embeddings (
+            ayah_id INTEGER PRIMARY KEY, surah_id INTEGER NOT NULL, ayah_number INTEGER NOT NULL,
+            edition_id INTEGER NOT NULL, language TEXT NOT NULL, embedding BLOB NOT NULL,
+            dtype TEXT NOT NULL DEFAULT 'float32', model TEXT, content_hash TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO ayah_embeddings (ayah_id, surah_id, ayah_number, edition_id, language, embedding, model)"
+        " VALUES (?, 1, ?, 1, 'en', ?, ?)",
+        [(ayah_id, ayah_id, np.asarray(vector, np.float32).tobytes(), model) for ayah_id, model, vector in rows],
+    )
+    return conn
+
+
+def test_from_database_records_model():
+    conn = embeddings_db([(1, "mini", [1, 0, 0]), (2, "mini", [0, 1, 0])])
+    index = SemanticIndex.from_database(conn, "v1", "mini")
+    assert (len(index), index.dimensions, index.model) == (2, 3, "mini")
+
+
+def test_from_database_keeps_configured_model():
+    # Interrupted re-embed: some rows already moved to the new model
+    conn = embeddings_db([(1, "mini", [1, 0, 0]), (2, "mpnet", [0, 1, 0, 0, 0]), (3, "mini", [0, 0, 1])])
+    index = SemanticIndex.from_database(conn, "v1", "mini")
+    assert index.ayah_ids.tolist() == [1, 3]
+    assert (index.dimensions, index.model) == (3, "mini")
+
+
+def test_from_database_refuses_mixed_models():
+    conn = embeddings_db([(1, "mini", [1, 0, 0]), (2, "mpnet", [0, 1, 0, 0, 0])])
+    with pytest.raises(ValueError, match="mixes models"):
+        SemanticIndex.from_database(conn)
+
+
+def test_from_database_refuses_mixed_dimensions():
+    conn = embeddings_db([(1, None, [1, 0, 0]), (2, None, [0, 1, 0, 0, 0])])
+    with pytest.raises(ValueError, match="mixes dimensions"):
+        SemanticIndex.from_database(conn)
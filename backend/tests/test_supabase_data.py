@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from supabase_data import create_data_client
+
+REST_URL = "https://project.supabase.co/rest/v1"
+
+
+class PostgrestStub:
+    """Minimal PostgREST stand-in for httpx.MockTransport: records requests, serves canned rows."""
+
+    def __init__(self):
+        self.requests = []
+        self.rows = {"bookmarks": [{"id": "b1", "user_id": "u1", "ayah_id": 7}]}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        table = request.url.path.rsplit("/", 1)[-1]
+        if table == "missing":
+            return httpx.Response(404, json={
+                "code": "42P01", "message": 'relation "public.missing" does not exist',
+                "details": None, "hint": None,
+            })
+        if request.method == "GET":
+            rows = [
+                row for row in self.rows.get(table, [])
+                if all(f"eq.{row.get(column)}" == value for column, value in request.url.params.items()
+                       if column in row)
+            ]
+            return httpx.Response(200, json=rows, headers={"Content-Range": f"0-{len(rows) - 1}/{len(rows)}"})
+        body = json.loads(request.content)
+        rows = body if isinstance(body, list) else [body]
+        return httpx.Response(201, json=rows)
+
+
+@pytest.fixture
+def stub():
+    return PostgrestStub()
+
+
+@pytest.fixture
+def client(stub):
+    return create_data_client(REST_URL, "service-key", transport=httpx.MockTransport(stub))
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_select(client, stub):
+    response = run(client.table("bookmarks").select("id", "ayah_id").eq("user_id", "u1").execute())
+    assert response.data == [{"id": "b1", "user_id": "u1", "ayah_id": 7}]
+
+    request = stub.requests[0]
+    assert request.method == "GET"
+    assert str(request.url).startswith(f"{REST_URL}/bookmarks?")
+    assert request.url.params["select"] == "id,ayah_id"
+    assert request.url.params["user_id"] == "eq.u1"
+    assert request.headers["apikey"] == "service-key"
+    assert request.headers["authorization"] == "Bearer service-key"
+
+
+def test_insert(client, stub):
+    response = run(client.table("bookmarks").insert({"user_id": "u1", "ayah_id": 9}).execute())
+    assert response.data == [{"user_id": "u1", "ayah_id": 9}]
+
+    request = stub.requests[0]
+    assert request.method == "POST"
+    assert json.loads(request.content) == {"user_id": "u1", "ayah_id": 9}
+    assert "return=representation" in request.headers["prefer"]
+
+
+def test_upsert(client, stub):
+    run(client.table("reading_progress").upsert(
+        {"user_id": "u1", "surah_id": 2, "last_read_ayah_number": 5}, on_conflict="user_id,surah_id"
+    ).execute())
+
+    request = stub.requests[0]
+    assert request.method == "POST"
+    assert request.url.params["on_conflict"] == "user_id,surah_id"
+    assert "resolution=merge-duplicates" in request.headers["prefer"]
+
+
+def test_error_mapping(client):
+    with pytest.raises(APIError) as error:
+        run(client.table("missing").select("*").execute())
+    assert error.value.code == "42P01"
+    assert "does not exist" in error.value.message
+    assert client.request_stats.stats()["errors"] == 1
+
+
+def test_request_stats(client):
+    async def queries():
+        await asyncio.gather(*(client.table("bookmarks").select("*").execute() for _ in range(3)))
+
+    run(queries())
+    stats = client.request_stats.stats()
+    assert stats["requests"] == 3
+    assert stats["errors"] == 0
+    assert stats["http_versions"] == {"HTTP/1.1": 3}
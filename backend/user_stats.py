@@ -0,0 +1,98 @@
+"""
+User Stats Summary
+
+The stats endpoints (progress stats, overall completion, public share page and
+its OG image) read one `user_stats` row per user instead of recounting
+daily_readings / completed_ayahs / replay_stats rows on every call.
+
+The row is maintained incrementally by triggers on the source tables, and
+rebuilt from them by rebuild_user_stats() (migrations/010_create_user_stats.sql):
+on demand for a user without a row, and for everyone by the repair job
+archive/rebuild_user_stats.py. UserStatsStore turns the row into the parts
+each endpoint shows.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from postgrest import AsyncPostgrestClient
+
+TOTAL_QURAN_AYAHS = 6236
+
+
+def completion_summary(per_surah: Dict[int, int], surah_sizes: Dict[int, int]) -> dict:
+    """Completion totals from completed-ayah counts per surah."""
+    completed = sum(per_surah.values())
+    return {
+        "ayahs_completed": completed,
+        "completion_percentage": round((completed / TOTAL_QURAN_AYAHS) * 100, 1) if completed > 0 else 0,
+        "surahs_completed": sum(
+            1 for surah_id, size in surah_sizes.items() if per_surah.get(surah_id, 0) >= size
+        ),
+    }
+
+
+def current_streak(row: dict) -> int:
+    """The stored run of reading days, if it reaches today or yesterday."""
+    if not row.get("last_read_date"):
+        return 0
+    today = datetime.now().date()
+    last_read = datetime.strptime(row["last_read_date"], "%Y-%m-%d").date()
+    if last_read in (today, today - timedelta(days=1)):
+        return row["streak_days"]
+    return 0
+
+
+class UserStatsStore:
+    """Reads the materialized per-user stats row."""
+
+    def __init__(self, client: AsyncPostgrestClient):
+        self.client = client
+
+        # Stats
+        self.reads = 0
+        self.rebuilds = 0
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        """The user's stats row, building it from the source tables if missing."""
+        self.reads += 1
+        response = await self.client.table("user_stats").select("*").eq("user_id", user_id).execute()
+        if response.data:
+            return response.data[0]
+
+        # Users with no data yet (rows are repaired by rebuilding, not deleting)
+        self.rebuilds += 1
+        await self.client.rpc("rebuild_user_stats", {"p_user_id": user_id}).execute()
+        response = await self.client.table("user_stats").select("*").eq("user_id", user_id).execute()
+        return response.data[0] if response.data else None
+
+    async def collect(self, user_id: str, parts: Iterable[str], surah_sizes: Dict[int, int] = None) -> dict:
+        """
+        Return {part: value} for the requested parts from one row;
+        "completion" needs `surah_sizes` ({surah_id: number_of_ayahs}).
+        """
+        row = await self.get(user_id) or {}
+        parts = set(parts)
+        result = {}
+        if "reading" in parts:
+            result["reading"] = {
+                "total_ayahs_read": row.get("total_ayahs_read", 0),
+                "total_surahs_read": row.get("total_surahs_read", 0),
+            }
+        if "streak" in parts:
+            result["streak"] = current_streak(row)
+        if "completion" in parts:
+            per_surah = {int(surah_id): count for surah_id, count in (row.get("completed_by_surah") or {}).items()}
+            result["completion"] = completion_summary(per_surah, surah_sizes or {})
+        if "bookmarks" in parts:
+            result["bookmarks"] = row.get("total_bookmarks", 0)
+        if "listening" in parts:
+            total_seconds = row.get("total_listening_seconds", 0)
+            result["listening"] = {
+                "total_plays": row.get("total_plays", 0),
+                "total_minutes": round(total_seconds / 60) if total_seconds > 0 else 0,
+            }
+        return result
+
+    def stats(self) -> dict:
+        return {"reads": self.reads, "rebuilds": self.rebuilds}
@@ -5,24 +5,38 @@ SQLite FTS5 Migration Script for Quran Database
 Creates full-text search virtual tables for Arabic and English Quran text,
 with support for diacritic-insensitive Arabic search.
 
+Arabic text is folded with backend/arabic_text.py (the same normalization the
+API applies to queries) into text_normalized, which is the only indexed Arabic
+text column. FTS rowids equal ayahs.id so the sync triggers can address rows
+directly.
+
+fts_terms is the vocabulary used by fuzzy search: every distinct word of the
+searchable editions (en.sahih, and quran-uthmani after normalization) in an
+FTS5 trigram table, so misspelt query words can be matched to real terms.
+
+Re-running the script rebuilds all three tables, their triggers and indexes in a
+single transaction; readers never see a half-built index.
+
 Usage:
-    python3 create_fts_tables.py
+    python3 create_fts_tables.py [--db path/to/quran.db]
 """
 
-import sqlite3
+import argparse
 import re
+import sqlite3
+import sys
+from collections import Counter
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from arabic_text import normalize_arabic, normalize_arabic_sql
+
 # Database path
 DB_PATH = Path(__file__).parent / "quran.db"
 
-# Arabic diacritics (harakat/tashkeel) ranges
-ARABIC_DIACRITICS = re.compile(r'[\u064B-\u065F\u0670\u0640]')
-
-
-def remove_arabic_diacritics(text: str) -> str:
-    """Remove Arabic diacritics (tashkeel) from text."""
-    return ARABIC_DIACRITICS.sub('', text)
+# Editions whose vocabulary backs fuzzy search (the API searches these)
+FUZZY_EDITIONS = {"en": "en.sahih", "ar": "quran-uthmani"}
+WORD = re.compile(r"\w+")
 
 
 def create_fts_tables(conn):
@@ -35,28 +49,30 @@ def create_fts_tables(conn):
     cursor.execute("DROP TABLE IF EXISTS fts_arabic")
     cursor.execute("DROP TABLE IF EXISTS fts_english")
 
-    # Create Arabic FTS table with normalized text column
-    # We add text_normalized which has diacritics removed
+    # Create Arabic FTS table. Only text_normalized (folded Arabic) is
+    # searched; the original text is stored for display and highlighting.
+    # surah_id and edition_id stay indexed for the API's column filters.
+    # No porter stemmer: it only understands English.
     cursor.execute("""
         CREATE VIRTUAL TABLE fts_arabic USING fts5(
-            ayah_id,
-            ayah_number,
+            ayah_id UNINDEXED,
+            ayah_number UNINDEXED,
             surah_id,
-            number_in_surah,
-            text,
+            number_in_surah UNINDEXED,
+            text UNINDEXED,
             text_normalized,
             edition_id,
-            tokenize = 'porter unicode61'
+            tokenize = 'unicode61'
         )
     """)
 
     # Create English FTS table
     cursor.execute("""
         CREATE VIRTUAL TABLE fts_english USING fts5(
-            ayah_id,
-            ayah_number,
+            ayah_id UNINDEXED,
+            ayah_number UNINDEXED,
             surah_id,
-            number_in_surah,
+            number_in_surah UNINDEXED,
             text,
             edition_id,
             tokenize = 'porter unicode61'
@@ -82,27 +98,63 @@ def populate_fts_tables(cursor):
     all_ayahs = cursor.fetchall()
     print(f"Processing {len(all_ayahs)} ayahs...")
 
-    arabic_count = 0
-    english_count = 0
+    arabic_rows = []
+    english_rows = []
 
     for ayah_id, ayah_number, surah_id, number_in_surah, text, edition_id, language in all_ayahs:
         if language == 'ar':
-            # For Arabic, add normalized text without diacritics
-            text_normalized = remove_arabic_diacritics(text)
-            cursor.execute("""
-                INSERT INTO fts_arabic (ayah_id, ayah_number, surah_id, number_in_surah, text, text_normalized, edition_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (ayah_id, ayah_number, surah_id, number_in_surah, text, text_normalized, edition_id))
-            arabic_count += 1
+            arabic_rows.append((ayah_id, ayah_id, ayah_number, surah_id, number_in_surah,
+                                text, normalize_arabic(text), edition_id))
         elif language == 'en':
-            cursor.execute("""
-                INSERT INTO fts_english (ayah_id, ayah_number, surah_id, number_in_surah, text, edition_id)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (ayah_id, ayah_number, surah_id, number_in_surah, text, edition_id))
-            english_count += 1
+            english_rows.append((ayah_id, ayah_id, ayah_number, surah_id, number_in_surah,
+                                 text, edition_id))
+
+    cursor.executemany("""
+        INSERT INTO fts_arabic (rowid, ayah_id, ayah_number, surah_id, number_in_surah, text, text_normalized, edition_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, arabic_rows)
+    cursor.executemany("""
+        INSERT INTO fts_english (rowid, ayah_id, ayah_number, surah_id, number_in_surah, text, edition_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, english_rows)
+
+    # Merge the b-tree segments written during the bulk load
+    cursor.execute("INSERT INTO fts_arabic (fts_arabic) VALUES ('optimize')")
+    cursor.execute("INSERT INTO fts_english (fts_english) VALUES ('optimize')")
+
+    print(f"  Added {len(arabic_rows)} Arabic ayahs to FTS")
+    print(f"  Added {len(english_rows)} English ayahs to FTS")
+
+
+def create_fuzzy_terms(cursor):
+    """Build the trigram vocabulary table used by fuzzy search."""
+    print("Building fuzzy search vocabulary...")
+    cursor.execute("DROP TABLE IF EXISTS fts_terms")
+    cursor.execute("""
+        CREATE VIRTUAL TABLE fts_terms USING fts5(
+            term,
+            language UNINDEXED,
+            ayah_count UNINDEXED,
+            tokenize = 'trigram'
+        )
+    """)
 
-    print(f"  Added {arabic_count} Arabic ayahs to FTS")
-    print(f"  Added {english_count} English ayahs to FTS")
+    for language, edition in FUZZY_EDITIONS.items():
+        cursor.execute("""
+            SELECT a.text
+            FROM ayahs a
+            JOIN editions e ON a.edition_id = e.id
+            WHERE e.identifier = ?
+        """, (edition,))
+        counts = Counter()
+        for (text,) in cursor.fetchall():
+            text = normalize_arabic(text) if language == "ar" else text.lower()
+            counts.update(set(WORD.findall(text)))
+        cursor.executemany(
+            "INSERT INTO fts_terms (term, language, ayah_count) VALUES (?, ?, ?)",
+            [(term, language, count) for term, count in sorted(counts.items())],
+        )
+        print(f"  {len(counts)} {language} terms from {edition}")
 
 
 def create_triggers(cursor):
@@ -116,15 +168,22 @@ def create_triggers(cursor):
     ]:
         cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
 
-    # Arabic triggers - we need a helper function for diacritic removal
-    # Since SQLite triggers can't call Python, we'll use a simpler approach
-    # and handle normalization in the application layer for updates
-    cursor.execute("""
+    # Triggers can't call Python, so Arabic normalization runs as the
+    # equivalent SQL replace() stages; later stages refine the stored column.
+    first_stage, *later_stages = normalize_arabic_sql("NEW.text")
+    refine = "".join(
+        f"""
+            UPDATE fts_arabic SET text_normalized = {stage.format('text_normalized')}
+            WHERE rowid = NEW.id;"""
+        for stage in later_stages
+    )
+
+    cursor.execute(f"""
         CREATE TRIGGER ayahs_insert_arabic AFTER INSERT ON ayahs
         WHEN NEW.edition_id IN (SELECT id FROM editions WHERE language = 'ar')
         BEGIN
-            INSERT INTO fts_arabic (ayah_id, ayah_number, surah_id, number_in_surah, text, text_normalized, edition_id)
-            VALUES (NEW.id, NEW.number, NEW.surah_id, NEW.number_in_surah, NEW.text, NEW.text, NEW.edition_id);
+            INSERT INTO fts_arabic (rowid, ayah_id, ayah_number, surah_id, number_in_surah, text, text_normalized, edition_id)
+            VALUES (NEW.id, NEW.id, NEW.number, NEW.surah_id, NEW.number_in_surah, NEW.text, {first_stage}, NEW.edition_id);{refine}
         END
     """)
 
@@ -132,17 +191,17 @@ def create_triggers(cursor):
         CREATE TRIGGER ayahs_delete_arabic AFTER DELETE ON ayahs
         WHEN OLD.edition_id IN (SELECT id FROM editions WHERE language = 'ar')
         BEGIN
-            DELETE FROM fts_arabic WHERE ayah_id = OLD.id;
+            DELETE FROM fts_arabic WHERE rowid = OLD.id;
         END
     """)
 
-    cursor.execute("""
+    cursor.execute(f"""
         CREATE TRIGGER ayahs_update_arabic AFTER UPDATE ON ayahs
         WHEN NEW.edition_id IN (SELECT id FROM editions WHERE language = 'ar')
         BEGIN
             UPDATE fts_arabic
-            SET text = NEW.text, text_normalized = NEW.text
-            WHERE ayah_id = NEW.id;
+            SET text = NEW.text, text_normalized = {first_stage}
+            WHERE rowid = NEW.id;{refine}
         END
     """)
 
@@ -151,8 +210,8 @@ def create_triggers(cursor):
         CREATE TRIGGER ayahs_insert_english AFTER INSERT ON ayahs
         WHEN NEW.edition_id IN (SELECT id FROM editions WHERE language = 'en')
         BEGIN
-            INSERT INTO fts_english (ayah_id, ayah_number, surah_id, number_in_surah, text, edition_id)
-            VALUES (NEW.id, NEW.number, NEW.surah_id, NEW.number_in_surah, NEW.text, NEW.edition_id);
+            INSERT INTO fts_english (rowid, ayah_id, ayah_number, surah_id, number_in_surah, text, edition_id)
+            VALUES (NEW.id, NEW.id, NEW.number, NEW.surah_id, NEW.number_in_surah, NEW.text, NEW.edition_id);
         END
     """)
 
@@ -160,7 +219,7 @@ def create_triggers(cursor):
         CREATE TRIGGER ayahs_delete_english AFTER DELETE ON ayahs
         WHEN OLD.edition_id IN (SELECT id FROM editions WHERE language = 'en')
         BEGIN
-            DELETE FROM fts_english WHERE ayah_id = OLD.id;
+            DELETE FROM fts_english WHERE rowid = OLD.id;
         END
     """)
 
@@ -170,13 +229,29 @@ def create_triggers(cursor):
         BEGIN
             UPDATE fts_english
             SET text = NEW.text
-            WHERE ayah_id = NEW.id;
+            WHERE rowid = NEW.id;
         END
     """)
 
     print("Triggers created successfully.")
 
 
+def rebuild_fts(conn):
+    """Drop and rebuild the FTS tables and triggers in one bulk transaction."""
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        create_fts_tables(conn)
+        populate_fts_tables(cursor)
+        create_fuzzy_terms(cursor)
+        create_triggers(cursor)
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+
+
 def verify_fts_tables(cursor):
     """Verify FTS tables are working correctly."""
     print("\nVerifying FTS tables...")
@@ -193,11 +268,12 @@ def verify_fts_tables(cursor):
     # Test Arabic search with normalized column
     print("\nTesting Arabic search (diacritic-insensitive):")
 
-    # Remove diacritics from search query
+    # Normalize queries the same way the index was built
     test_queries = [
-        (remove_arabic_diacritics("بسم الله"), "Search without diacritics"),
-        (remove_arabic_diacritics("الرحمن"), "Search for الرحمن"),
-        (remove_arabic_diacritics("رحمن"), "Partial match"),
+        (normalize_arabic("بِسْمِ ٱللَّهِ"), "Search without diacritics"),
+        (normalize_arabic("الرحمن"), "Search for الرحمن"),
+        (normalize_arabic("أنزلنا"), "Hamza/alef variant folding"),
+        (normalize_arabic("رحمن"), "Partial match"),
     ]
 
     for query, description in test_queries:
@@ -207,7 +283,7 @@ def verify_fts_tables(cursor):
             JOIN surahs s ON f.surah_id = s.id
             WHERE fts_arabic MATCH ?
             LIMIT 1
-        """, (query,))
+        """, (f"text_normalized : ({query})",))
         result = cursor.fetchone()
         if result:
             print(f"  ✓ {description}: Found in {result[1]}:{result[2]}")
@@ -243,23 +319,18 @@ def main():
     print("SQLite FTS5 Migration for Quran Database")
     print("=" * 60)
 
-    if not DB_PATH.exists():
-        print(f"Error: Database not found at {DB_PATH}")
+    parser = argparse.ArgumentParser(description="Build or rebuild the Quran FTS5 tables")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help=f"SQLite database (default: {DB_PATH})")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"Error: Database not found at {args.db}")
         return 1
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(args.db)
     try:
-        # Create FTS tables
-        create_fts_tables(conn)
-
-        # Populate with existing data
-        populate_fts_tables(conn.cursor())
-
-        # Create triggers for future sync
-        create_triggers(conn.cursor())
-
-        # Commit changes
-        conn.commit()
+        # Tables, data and triggers in one transaction
+        rebuild_fts(conn)
 
         # Verify
         verify_fts_tables(conn.cursor())
@@ -273,7 +344,6 @@ def main():
         print(f"Error during migration: {e}")
         import traceback
         traceback.print_exc()
-        conn.rollback()
         return 1
     finally:
         conn.close()
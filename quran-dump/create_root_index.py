@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Arabic Root / Stem Index Builder for Quran Database
+
+Builds the tables behind `GET /api/quran/search?mode=root` (and `mode=stem`):
+
+    arabic_token_roots  every normalized Arabic token -> light stem and root
+    arabic_postings     root/stem -> sorted ayah numbers, delta + varint encoded
+
+Tokens come from every Arabic edition (Uthmani and simple spellings differ),
+normalized with backend/arabic_text.py. Stems and roots use the heuristic
+stemmer in the same module; to use curated morphology instead, fill
+arabic_token_roots from it and re-run with --from-token-table.
+
+Everything is rebuilt in one transaction.
+
+Usage:
+    python3 create_root_index.py [--db path/to/quran.db] [--from-token-table]
+"""
+
+import argparse
+import sqlite3
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from arabic_text import normalize_arabic, light_stem, arabic_root
+from quran_search import encode_postings
+
+# Database path
+DB_PATH = Path(__file__).parent / "quran.db"
+
+
+def collect_tokens(cursor):
+    """Return {normalized token: set of ayah numbers} over all Arabic editions."""
+    cursor.execute("""
+        SELECT a.number, a.text
+        FROM ayahs a
+        JOIN editions e ON a.edition_id = e.id
+        WHERE e.language = 'ar'
+        ORDER BY a.number
+    """)
+    occurrences = defaultdict(set)
+    for number, text in cursor.fetchall():
+        for word in normalize_arabic(text).split():
+            occurrences[word].add(number)
+    return occurrences
+
+
+def load_token_table(cursor):
+    """Read an existing token -> (stem, root) mapping, if one was supplied."""
+    try:
+        cursor.execute("SELECT token, stem, root FROM arabic_token_roots")
+    except sqlite3.OperationalError:
+        return {}
+    return {token: (stem, root) for token, stem, root in cursor.fetchall()}
+
+
+def rebuild_root_index(conn, from_token_table: bool = False):
+    """Drop and rebuild both tables in a single transaction."""
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        print("Collecting Arabic tokens...")
+        occurrences = collect_tokens(cursor)
+        print(f"  {len(occurrences)} distinct normalized tokens")
+
+        supplied = load_token_table(cursor) if from_token_table else {}
+
+        cursor.execute("DROP TABLE IF EXISTS arabic_token_roots")
+        cursor.execute("DROP TABLE IF EXISTS arabic_postings")
+        cursor.execute("""
+            CREATE TABLE arabic_token_roots (
+                token TEXT PRIMARY KEY,
+                stem TEXT NOT NULL,
+                root TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE TABLE arabic_postings (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                ayah_count INTEGER NOT NULL,
+                postings BLOB NOT NULL,
+                PRIMARY KEY (kind, key)
+            ) WITHOUT ROWID
+        """)
+
+        token_rows = []
+        postings = {"root": defaultdict(set), "stem": defaultdict(set)}
+        for token, numbers in occurrences.items():
+            stem, root = supplied.get(token) or (light_stem(token), arabic_root(token))
+            token_rows.append((token, stem, root))
+            postings["root"][root] |= numbers
+            postings["stem"][stem] |= numbers
+
+        cursor.executemany(
+            "INSERT INTO arabic_token_roots (token, stem, root) VALUES (?, ?, ?)",
+            token_rows,
+        )
+
+        posting_rows = []
+        raw_bytes = encoded_bytes = 0
+        for kind, keys in postings.items():
+            for key, numbers in keys.items():
+                blob = encode_postings(sorted(numbers))
+                posting_rows.append((kind, key, len(numbers), blob))
+                raw_bytes += 2 * len(numbers)
+                encoded_bytes += len(blob)
+        cursor.executemany(
+            "INSERT INTO arabic_postings (kind, key, ayah_count, postings) VALUES (?, ?, ?, ?)",
+            posting_rows,
+        )
+
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+
+    print(f"  {len(postings['root'])} roots, {len(postings['stem'])} stems")
+    print(f"  Postings: {encoded_bytes / 1024:.1f} KB delta-encoded ({raw_bytes / 1024:.1f} KB as u16)")
+
+
+def verify_root_index(cursor):
+    """Spot-check a few roots."""
+    print("\nVerifying root index...")
+    for word in ["رحمة", "الكتاب", "يعلمون"]:
+        root = arabic_root(normalize_arabic(word))
+        cursor.execute(
+            "SELECT ayah_count FROM arabic_postings WHERE kind = 'root' AND key = ?",
+            (root,),
+        )
+        row = cursor.fetchone()
+        if row:
+            print(f"  ✓ {word} -> {root}: {row[0]} ayahs")
+        else:
+            print(f"  ✗ {word} -> {root}: not found")
+
+
+def main():
+    """Main build function."""
+    parser = argparse.ArgumentParser(description="Build the Arabic root/stem posting index")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help=f"SQLite database (default: {DB_PATH})")
+    parser.add_argument("--from-token-table", action="store_true",
+                        help="Keep stems/roots already in arabic_token_roots instead of deriving them")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Arabic Root Index for Quran Database")
+    print("=" * 60)
+
+    if not args.db.exists():
+        print(f"Error: Database not found at {args.db}")
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    try:
+        rebuild_root_index(conn, args.from_token_table)
+        verify_root_index(conn.cursor())
+
+        print("\n" + "=" * 60)
+        print("Root index built successfully!")
+        print("=" * 60)
+        return 0
+
+    except Exception as e:
+        print(f"Error building root index: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -136,6 +136,13 @@ def create_database() -> sqlite3.Connection:
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_ayahs_surah_edition ON ayahs(surah_id, edition_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_edition ON audio_files(edition_id)")
 
+    # Covering indexes for mushaf-style range reads (page / juz / hizb)
+    for column in ("page", "juz", "hizb_quarter"):
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_ayahs_edition_{column}
+            ON ayahs(edition_id, {column}, number, id, surah_id, number_in_surah)
+        """)
+
     conn.commit()
     return conn
 
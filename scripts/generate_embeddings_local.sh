@@ -1,9 +1,13 @@
 #!/bin/bash
-# Standalone script to generate Quran embeddings locally
+# Generate Quran embeddings locally with the incremental builder in backend/archive
 # Run this on your Mac, then sync quran.db to the VPS
 #
 # Usage:
-#   ./scripts/generate_embeddings_local.sh [model_name]
+#   ./scripts/generate_embeddings_local.sh [model_name] [builder options]
+#   e.g. ./scripts/generate_embeddings_local.sh all-mpnet-base-v2 --processes 8 --dtype int8
+#
+# Set EMBEDDING_MODEL to the same model on the server, so queries are encoded
+# in the same vector space as the ayahs.
 #
 # Models:
 #   - all-mpnet-base-v2 (default, 400MB, best quality)
@@ -46,143 +50,11 @@ pip install --quiet --upgrade pip
 echo "Installing dependencies..."
 pip install --quiet sentence-transformers numpy
 
-# Create the Python script
-cat > generate_embeddings.py << 'EOFPYTHON'
-#!/usr/bin/env python3
-"""Generate embeddings for Quran ayahs - standalone script."""
-
-import sqlite3
-import sys
-import gc
-from pathlib import Path
-
-# Configuration
-MODEL_NAME = sys.argv[1] if len(sys.argv) > 1 else "all-mpnet-base-v2"
-DB_PATH = Path(__file__).parent / "quran.db"
-BATCH_SIZE = 32
-
-# Editions to embed
-EDITIONS = [
-    ("quran-uthmani", "ar"),
-    ("en.sahih", "en"),
-]
-
-print(f"\n🔧 Loading model: {MODEL_NAME}")
-print("This may take a minute on first run...")
-
-# Load model and utilities
-from sentence_transformers import SentenceTransformer
-import numpy as np
-
-model = SentenceTransformer(MODEL_NAME)
-print(f"✓ Model loaded (embedding dimension: {model.get_sentence_embedding_dimension()})")
-
-def embedding_to_bytes(embedding):
-    return embedding.tobytes()
-
-def generate_embeddings_batch(texts):
-    embeddings = model.encode(texts, batch_size=BATCH_SIZE, convert_to_numpy=True)
-    return embeddings.astype(np.float32)
-
-def main():
-    # Check database exists
-    if not DB_PATH.exists():
-        print(f"❌ Database not found at {DB_PATH}")
-        print("Please place quran.db in the current directory first.")
-        sys.exit(1)
-
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    # Create embeddings table
-    print("\n📋 Creating embeddings table...")
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS ayah_embeddings (
-            ayah_id INTEGER PRIMARY KEY,
-            surah_id INTEGER NOT NULL,
-            ayah_number INTEGER NOT NULL,
-            edition_id INTEGER NOT NULL,
-            language TEXT NOT NULL,
-            embedding BLOB NOT NULL,
-            FOREIGN KEY (ayah_id) REFERENCES ayahs(id)
-        )
-    """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_language ON ayah_embeddings(language)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_surah ON ayah_embeddings(surah_id)")
-    conn.commit()
-
-    total_inserted = 0
-
-    for edition_identifier, language in EDITIONS:
-        print(f"\n📖 Processing {edition_identifier} ({language})...")
-
-        # Get edition ID
-        cursor.execute("SELECT id FROM editions WHERE identifier = ?", (edition_identifier,))
-        edition_row = cursor.fetchone()
-        if not edition_row:
-            print(f"  ⚠️ Edition {edition_identifier} not found, skipping")
-            continue
-        edition_id = edition_row[0]
-
-        # Check existing
-        cursor.execute("SELECT COUNT(*) FROM ayah_embeddings WHERE edition_id = ?", (edition_id,))
-        existing = cursor.fetchone()[0]
-        if existing > 0:
-            print(f"  ℹ️ {existing} embeddings already exist, skipping")
-            continue
-
-        # Get ayahs
-        cursor.execute("""
-            SELECT id, number, surah_id, number_in_surah, text
-            FROM ayahs
-            WHERE edition_id = ?
-            ORDER BY number
-        """, (edition_id,))
-        ayahs = cursor.fetchall()
-
-        print(f"  Found {len(ayahs)} ayahs to embed")
-
-        # Process in batches
-        for i in range(0, len(ayahs), BATCH_SIZE):
-            batch = ayahs[i:i + BATCH_SIZE]
-            texts = [row["text"] for row in batch]
-
-            # Generate embeddings
-            embeddings = generate_embeddings_batch(texts)
-
-            # Insert
-            for j, row in enumerate(batch):
-                embedding_bytes = embedding_to_bytes(embeddings[j])
-                cursor.execute("""
-                    INSERT OR REPLACE INTO ayah_embeddings
-                    (ayah_id, surah_id, ayah_number, edition_id, language, embedding)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (row["id"], row["surah_id"], row["number_in_surah"],
-                     edition_id, language, embedding_bytes))
-
-            conn.commit()
-            total_inserted += len(batch)
-            progress = min(i + BATCH_SIZE, len(ayahs))
-            pct = 100 * progress // len(ayahs)
-            print(f"  Progress: {progress}/{len(ayahs)} ({pct}%)", end="\r")
-
-            # Free memory periodically
-            if progress % 500 == 0:
-                gc.collect()
-
-        print(f"\n  ✓ Completed {edition_identifier}")
-
-    conn.close()
-    print(f"\n✅ Total embeddings generated: {total_inserted}")
-    print(f"\n📁 Database saved to: {DB_PATH}")
-    print(f"   Size: {DB_PATH.stat().st_size / 1024 / 1024:.1f} MB")
-    print(f"\n🚀 Next: Copy quran.db to your VPS at:")
-    print(f"   ~/projects/islam-llm/quran-dump/quran.db")
-
-if __name__ == "__main__":
-    main()
-EOFPYTHON
+# The builder lives in the repo (backend/archive/generate_embeddings.py): it only
+# embeds ayahs that are missing or whose text/model changed, so it can be
+# re-run to resume an interrupted run or to switch models.
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+BUILDER="$SCRIPT_DIR/../backend/archive/generate_embeddings.py"
 
 # Check if quran.db exists
 if [ ! -f "quran.db" ]; then
@@ -195,7 +67,7 @@ fi
 # Run the script
 echo ""
 echo "Starting embedding generation..."
-python3 generate_embeddings.py "$MODEL"
+python3 "$BUILDER" --db quran.db --model "$MODEL" "${@:2}"
 
 echo ""
 echo "✅ Done! To sync to VPS:"